@@ -4,78 +4,219 @@
 Modèle IA V3 - CORRIGÉ ET ROBUSTE
 Gradient Boosting avec preprocessing amélioré
 Garantit un R² positif et des prédictions réalistes
+
+Imports différés: pandas et scikit-learn ne sont chargés qu'à la préparation
+et à l'entraînement. Un cache de prédiction touché ou l'inférence seule
+(--inference: artefact compact du store, lu par memmap) n'importent ni pandas
+ni scikit-learn.
 """
 
+import contextlib
+import copy
 import json
+import os
 import sys
 import glob
+import importlib
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.preprocessing import RobustScaler
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-def load_data():
-    """Charge les données collectées"""
-    import os
-    
-    data_files = glob.glob("data_*.json")
-    
-    if not data_files:
-        raise Exception("Aucun fichier de données trouvé")
-    
-    # ✅ CORRIGÉ: Prendre le fichier le plus RÉCENT (par date de modification)
-    latest_file = max(data_files, key=lambda x: os.path.getmtime(x))
-    print(f"📂 Chargement: {latest_file}")
-    
-    with open(latest_file, 'r') as f:
-        data = json.load(f)
+from model_store import ModelStore
+from prediction_cache import input_key
+from feature_engine import FEATURE_COLS, IncrementalFeatureEngine
+from single_flight import SingleFlight
+import payload_codec
+from ohlc_store import as_columns
+import instrumentation
+
+# Version du pipeline (à incrémenter si les features ou le modèle changent)
+MODEL_VERSION = 'gb-v3'
+
+# ✅ Hyperparamètres optimisés du Gradient Boosting
+MODEL_PARAMS = {
+    'n_estimators': 200,        # Plus d'arbres
+    'learning_rate': 0.05,      # Learning rate plus faible
+    'max_depth': 4,             # Moins profond (évite overfitting)
+    'min_samples_split': 10,    # Plus conservateur
+    'min_samples_leaf': 4,      # Plus conservateur
+    'subsample': 0.8,           # Bagging
+    'loss': 'huber',            # Plus robuste aux outliers que 'squared_error'
+    'alpha': 0.9,               # Pour Huber loss
+    'random_state': 42
+}
+
+# ✅ Backend histogramme (multi-thread, bien plus rapide quand les échantillons augmentent)
+# Pas de loss huber pour HistGradientBoostingRegressor: absolute_error est l'option robuste la plus proche
+HIST_PARAMS = {
+    'max_iter': 200,
+    'learning_rate': 0.05,
+    'max_depth': 4,
+    'min_samples_leaf': 4,
+    'loss': 'absolute_error',
+    'early_stopping': False,
+    'random_state': 42
+}
+
+# Backends: nom → (estimateur, hyperparamètres, paramètre du nombre d'arbres, attribut ajusté)
+# L'estimateur est un chemin 'module:classe', importé au premier entraînement (get_backend)
+MODEL_BACKENDS = {
+    'gbr': ('sklearn.ensemble:GradientBoostingRegressor', MODEL_PARAMS, 'n_estimators', 'n_estimators_'),
+    'hist': ('sklearn.ensemble:HistGradientBoostingRegressor', HIST_PARAMS, 'max_iter', 'n_iter_'),
+}
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'gbr')
+
+# Réglages persistés par tuning.py (par crypto et par défaut), relus s'ils changent
+MODEL_PARAMS_FILE = os.environ.get('MODEL_PARAMS_FILE', 'model_params.json')
+_reglages = {'mtime': None, 'data': {}}
+
+# ✅ Réentraînement incrémental: entre deux refits complets, les nouvelles données
+# ajoutent quelques arbres (warm start) au dernier modèle de la crypto
+WARM_START_TREES = int(os.environ.get('MODEL_WARM_TREES', 20))
+WARM_START_MAX_UPDATES = int(os.environ.get('MODEL_WARM_MAX_UPDATES', 7))
+# Refit complet si MAE, RMSE ou MAPE test dérivent de plus de 25% vs le dernier refit
+DRIFT_TOLERANCE = float(os.environ.get('MODEL_DRIFT_TOLERANCE', 0.25))
+
+training_stats = {'full': 0, 'warm': 0, 'drift_refits': 0}
+
+# ✅ Multi-horizons (jours): mêmes features et même scaler, un modèle par horizon
+HORIZONS = (1, 3, 7, 14, 30)
+DEFAULT_HORIZON = 7
+# Horizons secondaires: modèle réduit (fraction des arbres, learning rate compensé),
+# N horizons coûtent ~1 + (N-1) × fraction entraînements complets au lieu de N
+HORIZON_TREE_FRACTION = float(os.environ.get('MODEL_HORIZON_TREE_FRACTION', 0.25))
+# Paires d'entraînement minimum pour servir un horizon (sinon ignoré)
+MIN_HORIZON_SAMPLES = int(os.environ.get('MODEL_MIN_HORIZON_SAMPLES', 20))
+
+def _lire_payload(raw, origine):
+    """Décode une collecte (format binaire compact ou JSON)"""
+    if payload_codec.est_binaire(raw):
+        return payload_codec.decoder(raw)
+    try:
+        return json.loads(raw)
+    except ValueError:
+        raise Exception(f"Données illisibles: {origine}")
+
+@instrumentation.timed()
+def load_data(source=None):
+    """Charge les données collectées
+    
+    source: dict déjà en mémoire, '-' (stdin), chemin de fichier (.bin ou .json)
+    ou coin_id (data_<coin>.bin puis data_<coin>.json). Sans source, ancien
+    comportement: fichier data_* le plus récent (non fiable en concurrence).
+    """
+    if isinstance(source, dict):
+        data = source
+    elif source == '-':
+        print("📂 Chargement: stdin")
+        data = _lire_payload(sys.stdin.buffer.read(), 'stdin')
+    else:
+        if source is None:
+            data_files = glob.glob("data_*.bin") + glob.glob("data_*.json")
+            if not data_files:
+                raise Exception("Aucun fichier de données trouvé")
+            print("⚠️  Aucune crypto indiquée: fichier de données le plus récent utilisé")
+            path = max(data_files, key=lambda x: os.path.getmtime(x))
+        elif os.path.isfile(source):
+            path = source
+        else:
+            candidats = [f"data_{source.lower()}.bin", f"data_{source.lower()}.json"]
+            path = next((c for c in candidats if os.path.isfile(c)), None)
+            if path is None:
+                raise Exception(f"Aucune donnée collectée pour {source}")
+        
+        print(f"📂 Chargement: {path}")
+        if path.endswith('.bin'):
+            data = payload_codec.charger(path)
+        else:
+            with open(path, 'rb') as f:
+                data = _lire_payload(f.read(), path)
     
     coin_id = data.get('coin_id', 'unknown')
     ohlc_data = data.get('ohlc', [])
     market_data = data.get('market_data', {})
-    source = data.get('source', 'unknown')
+    source_name = data.get('source', 'unknown')
     
     if len(ohlc_data) < 30:
         raise Exception(f"Pas assez de données ({len(ohlc_data)} jours, minimum 30)")
     
     print(f"✅ {len(ohlc_data)} jours chargés")
-    print(f"📊 Source: {source.upper()}")
+    print(f"📊 Source: {source_name.upper()}")
     
     return ohlc_data, market_data, coin_id
 
+# En dessous (pas de lissage), la boucle numpy bat le coût fixe de pandas.ewm
+WILDER_LOOP_MAX = 512
+
+def wilder_averages(prices, period=14):
+    """Moyennes de Wilder (hausses, baisses) du RSI, calculées sur le dernier axe
+    
+    La récurrence up[i] = (up[i-1] * (period-1) + gain[i]) / period est une EMA
+    d'alpha 1/period (adjust=False) amorcée par la moyenne initiale: pandas la
+    calcule en code compilé, colonne par colonne, pour plusieurs cryptos à la fois.
+    Séries courtes (cas courant, 30 jours): simple boucle sur le temps, vectorisée
+    sur les cryptos, sans pandas.
+    Retourne (up, down) de forme (..., len(prices) - period + 1): l'indice 0 est
+    l'amorce (jours < period), l'indice k correspond au jour period - 1 + k.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    deltas = np.diff(prices, axis=-1)
+    
+    seed = deltas[..., :period+1]
+    up_seed = np.where(seed >= 0, seed, 0.).sum(axis=-1) / period
+    down_seed = -np.where(seed < 0, seed, 0.).sum(axis=-1) / period
+    
+    steps = deltas[..., period-1:]
+    gains = np.concatenate([up_seed[..., None], np.maximum(steps, 0.)], axis=-1)
+    losses = np.concatenate([down_seed[..., None], np.maximum(-steps, 0.)], axis=-1)
+    
+    if gains.shape[-1] <= WILDER_LOOP_MAX:
+        def smooth(values):
+            if values.ndim == 1:
+                # Une seule crypto: floats Python (pas de surcoût numpy par pas)
+                out = values.tolist()
+                for i in range(1, len(out)):
+                    out[i] = (out[i-1] * (period - 1) + out[i]) / period
+                return np.array(out)
+            out = values.copy()
+            for i in range(1, out.shape[-1]):
+                out[..., i] = (out[..., i-1] * (period - 1) + values[..., i]) / period
+            return out
+        
+        return smooth(gains), smooth(losses)
+    
+    import pandas as pd
+    
+    def smooth(values):
+        flat = values.reshape(-1, values.shape[-1]).T
+        ewm = pd.DataFrame(flat).ewm(alpha=1. / period, adjust=False).mean()
+        return ewm.to_numpy().T.reshape(values.shape)
+    
+    return smooth(gains), smooth(losses)
+
 def calculate_rsi(prices, period=14):
-    """Calcule le RSI (Relative Strength Index)"""
-    deltas = np.diff(prices)
-    seed = deltas[:period+1]
-    up = seed[seed >= 0].sum() / period
-    down = -seed[seed < 0].sum() / period
-    rs = up / down if down != 0 else 0
-    rsi = np.zeros_like(prices)
-    rsi[:period] = 100. - 100. / (1. + rs)
+    """Calcule le RSI (Relative Strength Index)
     
-    for i in range(period, len(prices)):
-        delta = deltas[i-1]
-        if delta > 0:
-            upval = delta
-            downval = 0.
-        else:
-            upval = 0.
-            downval = -delta
-        
-        up = (up * (period - 1) + upval) / period
-        down = (down * (period - 1) + downval) / period
-        
-        rs = up / down if down != 0 else 0
-        rsi[i] = 100. - 100. / (1. + rs)
+    Accepte une série (n,) ou un tableau (n_coins, n) de séries de même longueur.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    up, down = wilder_averages(prices, period)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.where(down != 0, up / down, 0.)
+    values = 100. - 100. / (1. + rs)
+    
+    rsi = np.zeros_like(prices)
+    rsi[..., :period] = values[..., :1]
+    rsi[..., period:] = values[..., 1:]
     
     return rsi
 
 def calculate_macd(prices, fast=12, slow=26, signal=9):
     """Calcule le MACD"""
+    import pandas as pd
+    
     ema_fast = pd.Series(prices).ewm(span=fast, adjust=False).mean().values
     ema_slow = pd.Series(prices).ewm(span=slow, adjust=False).mean().values
     macd = ema_fast - ema_slow
@@ -83,18 +224,24 @@ def calculate_macd(prices, fast=12, slow=26, signal=9):
     macd_hist = macd - macd_signal
     return macd, macd_signal, macd_hist
 
-def prepare_data(ohlc_data):
+def build_supervised(features, targets, horizon=7):
+    """Paires (features[i], targets[i+horizon]) construites par découpage, sans boucle"""
+    n_samples = max(len(features) - horizon, 0)
+    return features[:n_samples], targets[horizon:horizon + n_samples]
+
+@instrumentation.timed()
+def prepare_data(ohlc_data, horizon=7):
     """Prépare les données avec nettoyage robuste"""
-    print("🔧 Préparation des données avec nettoyage robuste...")
+    import pandas as pd
     
-    ohlc = np.array(ohlc_data)
+    print("🔧 Préparation des données avec nettoyage robuste...")
     
-    # Extraire OHLCV
-    timestamps = ohlc[:, 0]
-    open_prices = ohlc[:, 1]
-    high_prices = ohlc[:, 2]
-    low_prices = ohlc[:, 3]
-    close_prices = ohlc[:, 4]
+    # Extraire OHLCV (colonnes lues directement si stockage colonnaire)
+    ohlc = as_columns(ohlc_data)
+    timestamps = ohlc.timestamp
+    open_prices, high_prices, low_prices, close_prices = (
+        np.asarray(column, dtype=np.float64) for column in (ohlc.open, ohlc.high, ohlc.low, ohlc.close)
+    )
     
     # ✅ VALIDATION: Supprimer les valeurs invalides
     valid_mask = (close_prices > 0) & np.isfinite(close_prices)
@@ -173,32 +320,18 @@ def prepare_data(ohlc_data):
             df[col] = df[col].fillna(df[col].median())
     
     # Features pour le modèle
-    feature_cols = [
-        'open', 'high', 'low', 'close',
-        'sma_7', 'sma_14', 'sma_30',
-        'rsi', 'macd', 'macd_signal', 'macd_hist',
-        'bb_upper', 'bb_lower', 'bb_width',
-        'volatility', 'momentum_7', 'momentum_14',
-        'atr', 'price_to_sma7', 'price_to_sma30'
-    ]
+    feature_cols = list(FEATURE_COLS)
     
     # ✅ PRÉDICTION 7 JOURS: Utiliser les données actuelles pour prédire +7 jours
     # On ne shift PAS le target, on utilise les dernières données pour prédire le futur
+    features = df[feature_cols].to_numpy(dtype=np.float64)
     
-    # Pour l'entraînement: on crée des paires (features[i], price[i+7])
-    X_train = []
-    y_train = []
-    
-    # On garde les 7 derniers jours pour la prédiction finale
-    for i in range(len(df) - 7):
-        X_train.append(df[feature_cols].iloc[i].values)
-        y_train.append(df['close'].iloc[i + 7])
-    
-    X_train = np.array(X_train)
-    y_train = np.array(y_train)
+    # Pour l'entraînement: on crée des paires (features[i], price[i+horizon])
+    # On garde les derniers jours (sans futur connu) pour la prédiction finale
+    X_train, y_train = build_supervised(features, df['close'].to_numpy(dtype=np.float64), horizon)
     
     # Features pour la prédiction (dernières données)
-    X_predict = df[feature_cols].iloc[-1:].values
+    X_predict = features[-1:]
     
     print(f"   ✅ {len(X_train)} samples d'entraînement")
     print(f"   ✅ {len(feature_cols)} features")
@@ -208,41 +341,15 @@ def prepare_data(ohlc_data):
     
     return X_train, y_train, X_predict, feature_cols, close_prices, df
 
-def train_model(X, y):
-    """Entraîne le modèle avec validation robuste"""
-    print("🤖 Entraînement du modèle...")
-    
-    # ✅ Split temporel: 80% train, 20% test
+def _split(X, y):
+    """Split temporel: 80% train, 20% test"""
     split_idx = int(len(X) * 0.80)
+    return X[:split_idx], X[split_idx:], y[:split_idx], y[split_idx:]
+
+def _evaluer(model, X_train_scaled, X_test_scaled, y_train, y_test):
+    """Métriques train/test du modèle"""
+    from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
     
-    X_train = X[:split_idx]
-    X_test = X[split_idx:]
-    y_train = y[:split_idx]
-    y_test = y[split_idx:]
-    
-    print(f"   Train: {len(X_train)} samples | Test: {len(X_test)} samples")
-    
-    # ✅ RobustScaler (meilleur que StandardScaler pour les outliers)
-    scaler = RobustScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    # ✅ Gradient Boosting avec hyperparamètres optimisés
-    model = GradientBoostingRegressor(
-        n_estimators=200,        # Plus d'arbres
-        learning_rate=0.05,      # Learning rate plus faible
-        max_depth=4,             # Moins profond (évite overfitting)
-        min_samples_split=10,    # Plus conservateur
-        min_samples_leaf=4,      # Plus conservateur
-        subsample=0.8,           # Bagging
-        loss='huber',            # Plus robuste aux outliers que 'squared_error'
-        alpha=0.9,               # Pour Huber loss
-        random_state=42
-    )
-    
-    model.fit(X_train_scaled, y_train)
-    
-    # Prédictions
     y_train_pred = model.predict(X_train_scaled)
     y_test_pred = model.predict(X_test_scaled)
     
@@ -266,7 +373,7 @@ def train_model(X, y):
         print(f"   ⚠️  WARNING: R² négatif détecté!")
         print(f"   ℹ️  Le modèle sera quand même utilisé avec prudence")
     
-    return model, scaler, {
+    return {
         'r2_train': r2_train,
         'r2_test': max(0, r2_test),  # Forcer à 0 minimum pour l'affichage
         'mae': mae_test,
@@ -274,9 +381,194 @@ def train_model(X, y):
         'mape': mape_test
     }
 
-def make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id, metrics):
-    """Génère une prédiction réaliste pour 7 jours"""
-    print("🎯 Génération de la prédiction 7 jours...")
+def get_backend(backend=None, load=True):
+    """(nom, (estimateur, params, param nb arbres, attribut nb arbres)) du backend choisi
+    
+    load=False: l'estimateur reste un chemin 'module:classe' (pas d'import de scikit-learn).
+    """
+    backend = backend or MODEL_BACKEND
+    if backend not in MODEL_BACKENDS:
+        raise Exception(f"Backend de modèle inconnu: {backend} (disponibles: {', '.join(MODEL_BACKENDS)})")
+    estimator, *reste = MODEL_BACKENDS[backend]
+    if load:
+        module, classe = estimator.split(':')
+        estimator = getattr(importlib.import_module(module), classe)
+    return backend, (estimator, *reste)
+
+def preload(backend=None):
+    """Importe d'avance la pile d'entraînement (processus persistants: la
+    première requête ne paie pas l'import de pandas et scikit-learn)"""
+    import pandas  # noqa: F401
+    import sklearn.metrics  # noqa: F401
+    import sklearn.preprocessing  # noqa: F401
+    get_backend(backend)
+
+def _charger_reglages():
+    """Contenu de MODEL_PARAMS_FILE (rechargé quand le fichier est modifié)"""
+    try:
+        mtime = os.path.getmtime(MODEL_PARAMS_FILE)
+    except OSError:
+        return {}
+    
+    if mtime != _reglages['mtime']:
+        try:
+            with open(MODEL_PARAMS_FILE, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Réglages {MODEL_PARAMS_FILE} illisibles ({e}), valeurs par défaut")
+            data = {}
+        _reglages['mtime'], _reglages['data'] = mtime, data
+    return _reglages['data']
+
+def model_params(coin_id=None, backend=None):
+    """Hyperparamètres effectifs: défauts du backend + réglages de tuning.py
+    (ceux de la crypto, sinon ceux par défaut)"""
+    backend, (_, params, _, _) = get_backend(backend, load=False)
+    tuned = _charger_reglages().get(backend, {})
+    override = tuned.get('coins', {}).get(coin_id) or tuned.get('default') or {}
+    return dict(params, **override.get('params', {}))
+
+def horizon_params(params, backend=None):
+    """Hyperparamètres d'un horizon secondaire: HORIZON_TREE_FRACTION des arbres,
+    learning rate divisé d'autant (plafonné à 0.3)"""
+    if HORIZON_TREE_FRACTION >= 1:
+        return params
+    _, (_, _, n_trees_param, _) = get_backend(backend, load=False)
+    return dict(params, **{
+        n_trees_param: max(10, int(round(params[n_trees_param] * HORIZON_TREE_FRACTION))),
+        'learning_rate': min(0.3, params['learning_rate'] / HORIZON_TREE_FRACTION),
+    })
+
+@instrumentation.timed()
+def train_model(X, y, backend=None, params=None, scaler=None):
+    """Entraîne le modèle avec validation robuste"""
+    from sklearn.preprocessing import RobustScaler
+    
+    backend, (estimator, default_params, _, n_trees) = get_backend(backend)
+    params = params or default_params
+    print(f"🤖 Entraînement du modèle ({backend})...")
+    
+    X_train, X_test, y_train, y_test = _split(X, y)
+    
+    print(f"   Train: {len(X_train)} samples | Test: {len(X_test)} samples")
+    
+    # ✅ RobustScaler (meilleur que StandardScaler pour les outliers)
+    # Un scaler déjà ajusté (partagé entre horizons) est réutilisé tel quel
+    if scaler is None:
+        scaler = RobustScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+    else:
+        X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    # ✅ Gradient Boosting avec hyperparamètres optimisés
+    model = estimator(**params)
+    
+    model.fit(X_train_scaled, y_train)
+    
+    metrics = _evaluer(model, X_train_scaled, X_test_scaled, y_train, y_test)
+    
+    # Référence pour la détection de dérive des mises à jour incrémentales
+    metrics['training'] = {
+        'mode': 'full',
+        'version': MODEL_VERSION,
+        'backend': backend,
+        'params': params,
+        'warm_updates': 0,
+        'n_estimators': getattr(model, n_trees),
+        'reference': {k: metrics[k] for k in ('mae', 'rmse', 'mape')},
+    }
+    
+    return model, scaler, metrics
+
+@instrumentation.timed()
+def update_model(X, y, model, scaler, metrics, backend=None, params=None):
+    """Mise à jour warm start d'un modèle existant sur de nouvelles données
+    
+    Ajoute WARM_START_TREES arbres ajustés sur les résidus du modèle précédent
+    (scaler inchangé). Retourne None si un refit complet s'impose: modèle
+    incompatible, trop de mises à jour, ou dérive des métriques test.
+    """
+    backend, (estimator, default_params, n_trees_param, n_trees) = get_backend(backend)
+    training = metrics.get('training') or {}
+    if training.get('version') != MODEL_VERSION or training.get('backend', 'gbr') != backend:
+        return None
+    if training.get('params') != (params or default_params):
+        return None  # hyperparamètres modifiés (tuning): refit complet
+    if not isinstance(model, estimator):
+        return None
+    if getattr(model, 'n_features_in_', None) != X.shape[1]:
+        return None
+    if training['warm_updates'] >= WARM_START_MAX_UPDATES:
+        print(f"🔁 {training['warm_updates']} mises à jour incrémentales: refit complet")
+        return None
+    
+    print(f"🌱 Mise à jour incrémentale (+{WARM_START_TREES} arbres)...")
+    
+    X_train, X_test, y_train, y_test = _split(X, y)
+    X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    # Copie: l'ancien modèle peut servir des prédictions en parallèle
+    model = copy.deepcopy(model)
+    model.set_params(warm_start=True, **{n_trees_param: getattr(model, n_trees) + WARM_START_TREES})
+    model.fit(X_train_scaled, y_train)
+    
+    updated = _evaluer(model, X_train_scaled, X_test_scaled, y_train, y_test)
+    
+    reference = training['reference']
+    derive = {k: updated[k] / reference[k] - 1 for k in reference if reference[k] > 0}
+    pire = max(derive, key=derive.get, default=None)
+    if pire is not None and derive[pire] > DRIFT_TOLERANCE:
+        print(f"   ⚠️  Dérive {pire.upper()} {derive[pire]*100:+.1f}% (> {DRIFT_TOLERANCE*100:.0f}%): refit complet")
+        training_stats['drift_refits'] += 1
+        return None
+    
+    updated['training'] = dict(
+        training,
+        mode='warm',
+        warm_updates=training['warm_updates'] + 1,
+        n_estimators=getattr(model, n_trees),
+    )
+    
+    return model, scaler, updated
+
+# Seuil de variation (%) des signaux ACHETER / VENDRE
+SIGNAL_THRESHOLD = 3
+
+def clip_prediction(predicted_price_raw, current_price, close_prices, horizon=7):
+    """Contraint une prédiction brute à une plage réaliste
+    
+    Retourne (prix contraint, volatilité quotidienne, prix min, prix max).
+    """
+    # 1. Volatilité historique (écart-type des changements sur 30 jours)
+    # (pct_change().std() de pandas en numpy: mêmes opérations, résultat identique)
+    recent = np.asarray(close_prices[-30:], dtype=np.float64)
+    recent_returns = recent[1:] / recent[:-1] - 1
+    volatility = float(np.std(recent_returns, ddof=1)) if len(recent_returns) > 1 else float('nan')
+    max_change = volatility * np.sqrt(horizon) * 2  # 2 écarts-types sur l'horizon
+    
+    # 2. Limiter le changement à ±20% ou ±2*volatilité (le plus petit)
+    max_change_pct = min(0.20, max_change)
+    
+    min_price = current_price * (1 - max_change_pct)
+    max_price = current_price * (1 + max_change_pct)
+    
+    return np.clip(predicted_price_raw, min_price, max_price), volatility, min_price, max_price
+
+def signal_from_change(price_change):
+    """Signal de trading selon la variation prédite (%)"""
+    if price_change > SIGNAL_THRESHOLD:
+        return "ACHETER"
+    if price_change < -SIGNAL_THRESHOLD:
+        return "VENDRE"
+    return "ATTENDRE"
+
+@instrumentation.timed()
+def make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id, metrics,
+                    horizon=DEFAULT_HORIZON):
+    """Génère une prédiction réaliste à horizon jours (7 par défaut)"""
+    print(f"🎯 Génération de la prédiction {horizon} jours...")
     
     # Normaliser les features
     X_predict_scaled = scaler.transform(X_predict)
@@ -284,26 +576,25 @@ def make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id
     # Prédiction brute
     predicted_price_raw = float(model.predict(X_predict_scaled)[0])
     
+    model_type = ('Histogram Gradient Boosting V3'
+                  if getattr(model, 'estimator_name', type(model).__name__) == 'HistGradientBoostingRegressor'
+                  else 'Gradient Boosting V3')
+    return build_prediction(predicted_price_raw, close_prices, market_data, coin_id, metrics,
+                            horizon=horizon, model_type=model_type)
+
+def build_prediction(predicted_price_raw, close_prices, market_data, coin_id, metrics,
+                     horizon=DEFAULT_HORIZON, model_type='Gradient Boosting V3'):
+    """Prédiction finale (JSON) à partir d'un prix brut: contraintes, signal, confiance"""
     # Prix actuel (depuis market_data pour avoir le prix temps réel)
     current_price = float(market_data.get('current_price', close_prices[-1]))
     
     print(f"   💰 Prix actuel: ${current_price:,.2f}")
     print(f"   🎯 Prédiction brute: ${predicted_price_raw:,.2f}")
     
-    # ✅ CONTRAINTES RÉALISTES
-    # 1. Volatilité historique (écart-type des changements sur 30 jours)
-    recent_returns = pd.Series(close_prices[-30:]).pct_change().dropna()
-    volatility = recent_returns.std()
-    max_change_7d = volatility * np.sqrt(7) * 2  # 2 écarts-types sur 7 jours
-    
-    # 2. Limiter le changement à ±20% ou ±2*volatilité (le plus petit)
-    max_change_pct = min(0.20, max_change_7d)
-    
-    min_price = current_price * (1 - max_change_pct)
-    max_price = current_price * (1 + max_change_pct)
-    
-    # Clipper la prédiction
-    predicted_price = np.clip(predicted_price_raw, min_price, max_price)
+    # ✅ CONTRAINTES RÉALISTES: ±20% ou ±2 écarts-types sur l'horizon
+    predicted_price, volatility, min_price, max_price = clip_prediction(
+        predicted_price_raw, current_price, close_prices, horizon=horizon
+    )
     
     print(f"   📊 Volatilité: {volatility*100:.2f}%")
     print(f"   📊 Range réaliste: ${min_price:,.2f} - ${max_price:,.2f}")
@@ -313,12 +604,7 @@ def make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id
     price_change = ((predicted_price - current_price) / current_price) * 100
     
     # Signal
-    if price_change > 3:
-        signal = "ACHETER"
-    elif price_change < -3:
-        signal = "VENDRE"
-    else:
-        signal = "ATTENDRE"
+    signal = signal_from_change(price_change)
     
     # Données historiques (7 derniers jours + prédiction)
     historical_data = []
@@ -328,9 +614,9 @@ def make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id
             'price': float(price)
         })
     
-    # Ajouter la prédiction (jour +7)
+    # Ajouter la prédiction (jour +horizon)
     historical_data.append({
-        'day': 7,
+        'day': horizon,
         'price': float(predicted_price)
     })
     
@@ -347,7 +633,10 @@ def make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id
         'current_price': current_price,
         'predicted_price': predicted_price,
         'price_change': price_change,
-        'timeframe': '7 days',
+        # Plage de contrainte (sert aussi à invalider les caches sur dérive du prix)
+        'min_price': float(min_price),
+        'max_price': float(max_price),
+        'timeframe': f'{horizon} days',
         'signal': signal,
         'market_data': {
             'high_24h': float(market_data.get('high_24h', current_price * 1.05)),
@@ -358,25 +647,195 @@ def make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id
         },
         'historical_data': historical_data,
         'r_squared': confidence,
-        'model_type': 'Gradient Boosting V3',
+        'model_type': model_type,
         'features_count': 20,
         'model_metrics': {
             'r2_score': metrics['r2_test'],
             'mae': metrics['mae'],
             'rmse': metrics['rmse'],
-            'mape': metrics['mape']
+            'mape': metrics['mape'],
+            'training': (metrics.get('training') or {}).get('mode', 'full')
         },
         'timestamp': datetime.now().isoformat()
     }
     
     print(f"   💰 Prix actuel: ${current_price:,.2f}")
-    print(f"   🎯 Prix prédit 7j: ${predicted_price:,.2f}")
+    print(f"   🎯 Prix prédit {horizon}j: ${predicted_price:,.2f}")
     print(f"   📊 Variation: {price_change:+.2f}%")
     print(f"   🚦 Signal: {signal}")
     print(f"   📈 Confiance: {confidence*100:.1f}%")
     
     return prediction
 
+# Entraînements simultanés sur les mêmes données → un seul fit partagé
+_training_flight = SingleFlight()
+
+def get_model(X_train, y_train, ohlc_data, coin_id, store=None, backend=None,
+              horizon=DEFAULT_HORIZON, scaler=None):
+    """Retourne (model, scaler, metrics) depuis le store ou par entraînement
+    
+    Hors horizon par défaut, le modèle (réduit, horizon_params) est rangé sous
+    '<coin>.h<horizon>' pour ne pas évincer celui à 7 jours. La clé ne porte
+    que sur les bougies clôturées (input_key): les rafraîchissements de la
+    bougie du jour réutilisent le modèle, une mise à jour n'a lieu qu'avec une
+    nouvelle bougie.
+    """
+    backend, _ = get_backend(backend, load=False)
+    params = model_params(coin_id, backend)
+    key_params = dict(params, backend=backend)
+    store_id = coin_id
+    if horizon != DEFAULT_HORIZON:
+        params = horizon_params(params, backend)
+        key_params = dict(params, backend=backend, horizon=horizon)
+        store_id = f"{coin_id}.h{horizon}"
+    key = input_key(ohlc_data, key_params, MODEL_VERSION)
+    return _training_flight.do((store_id, key), _load_or_train, X_train, y_train, store_id, key,
+                               store, backend, params, scaler)
+
+def _load_or_train(X_train, y_train, coin_id, key, store, backend, params, scaler=None):
+    # ✅ Modèle déjà entraîné sur ces mêmes OHLC? → inférence pure
+    cached = store.get(coin_id, key) if store is not None else None
+    
+    if cached is not None:
+        print("⚡ Modèle en cache (données inchangées), pas de réentraînement")
+        return cached
+    
+    # ✅ Nouvelles données: mise à jour incrémentale du dernier modèle si possible
+    previous = store.latest(coin_id) if store is not None else None
+    updated = update_model(X_train, y_train, *previous[1], backend=backend, params=params) if previous is not None else None
+    
+    if updated is not None:
+        model, scaler, metrics = updated
+        training_stats['warm'] += 1
+    else:
+        model, scaler, metrics = train_model(X_train, y_train, backend, params, scaler)
+        training_stats['full'] += 1
+    
+    if store is not None:
+        store.put(coin_id, key, (model, scaler, metrics))
+    
+    return model, scaler, metrics
+
+def train_horizons(features, close_prices, ohlc_data, coin_id, horizons, store=None, backend=None):
+    """Un modèle par horizon sur une seule matrice de features et un scaler commun
+    
+    Retourne ({horizon: (model, scaler, metrics)}, {horizon ignoré: raison}).
+    """
+    possibles = [h for h in sorted(set(horizons)) if len(features) - h >= MIN_HORIZON_SAMPLES]
+    skipped = {
+        h: f"{max(len(features) - h, 0)} paires d'entraînement (minimum {MIN_HORIZON_SAMPLES})"
+        for h in sorted(set(horizons)) if h not in possibles
+    }
+    if not possibles:
+        return {}, skipped
+    
+    from sklearn.preprocessing import RobustScaler
+    
+    # Scaler commun ajusté une fois sur la partie train de l'horizon le plus long:
+    # le plus petit préfixe, inclus dans la partie train de chaque modèle (pas de fuite du test)
+    scaler = RobustScaler().fit(features[:int((len(features) - possibles[-1]) * 0.80)])
+    
+    models = {}
+    for h in possibles:
+        X_train, y_train = build_supervised(features, close_prices, h)
+        models[h] = get_model(X_train, y_train, ohlc_data, coin_id, store, backend, horizon=h, scaler=scaler)
+    return models, skipped
+
+@instrumentation.timed()
+def forecast_curve(models, X_predict, close_prices, market_data):
+    """Courbe de prévision: prix contraint par horizon"""
+    current_price = float(market_data.get('current_price', close_prices[-1]))
+    
+    forecast = []
+    for h, (model, scaler, metrics) in sorted(models.items()):
+        raw = float(model.predict(scaler.transform(X_predict))[0])
+        price, _, min_price, max_price = clip_prediction(raw, current_price, close_prices, horizon=h)
+        forecast.append({
+            'horizon_days': h,
+            'predicted_price': float(price),
+            'price_change': (price - current_price) / current_price * 100,
+            'min_price': float(min_price),
+            'max_price': float(max_price),
+            'r_squared': max(0, min(1, metrics['r2_test'])),
+            'mape': metrics['mape'],
+        })
+    return forecast
+
+def run_pipeline(ohlc_data, market_data, coin_id, store=None, backend=None, horizons=None, cache=None, refresh=False):
+    """Enchaîne préparation, entraînement et prédiction sur des données déjà chargées
+    
+    horizons (ex: [1, 3, 7, 14, 30]): ajoute une courbe 'forecast' calculée sur
+    les mêmes features; la prédiction principale reste à 7 jours.
+    cache (PredictionCache): résultat resservi tant que les entrées et le prix n'ont pas bougé.
+    refresh: recalcule sans lire le cache (le résultat y est quand même écrit).
+    """
+    inconnus = [h for h in horizons or [] if h not in HORIZONS]
+    if inconnus:
+        raise Exception(f"Horizons non supportés: {inconnus} (disponibles: {list(HORIZONS)})")
+    
+    key = None
+    if cache is not None and market_data.get('current_price'):
+        backend, _ = get_backend(backend, load=False)
+        key_params = dict(model_params(coin_id, backend), backend=backend, horizons=sorted(set(horizons or [])))
+        key = input_key(ohlc_data, key_params, MODEL_VERSION)
+        cached = None if refresh else cache.get(coin_id, key, float(market_data['current_price']))
+        if cached is not None:
+            print("⚡ Prédiction en cache (entrées et prix inchangés)")
+            return cached
+    
+    prediction, close_prices = _predire(ohlc_data, market_data, coin_id, store, backend, horizons)
+    
+    if key is not None:
+        # Plage de contrainte à 7 jours autour du prix de référence
+        current_price = prediction['current_price']
+        _, _, min_price, max_price = clip_prediction(current_price, current_price, close_prices)
+        cache.put(coin_id, key, prediction, min_price, max_price)
+    return prediction
+
+def _predire(ohlc_data, market_data, coin_id, store, backend, horizons):
+    """Retourne (prédiction, clôtures nettoyées)"""
+    X_train, y_train, X_predict, feature_cols, close_prices, df = prepare_data(ohlc_data)
+    
+    if not horizons:
+        model, scaler, metrics = get_model(X_train, y_train, ohlc_data, coin_id, store, backend)
+        return make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id, metrics), close_prices
+    
+    features = df[feature_cols].to_numpy(dtype=np.float64)
+    models, skipped = train_horizons(
+        features, close_prices, ohlc_data, coin_id, set(horizons) | {DEFAULT_HORIZON}, store, backend
+    )
+    if DEFAULT_HORIZON not in models:
+        raise Exception(f"Pas assez de données pour l'horizon {DEFAULT_HORIZON} jours")
+    
+    prediction = make_prediction(*models[DEFAULT_HORIZON][:2], X_predict, close_prices,
+                                 market_data, coin_id, models[DEFAULT_HORIZON][2])
+    prediction['forecast'] = forecast_curve(
+        {h: m for h, m in models.items() if h in horizons}, X_predict, close_prices, market_data
+    )
+    prediction['skipped_horizons'] = {str(h): raison for h, raison in skipped.items()}
+    return prediction, close_prices
+
+@instrumentation.timed()
+def infer(ohlc_data, market_data, coin_id, store=None):
+    """Inférence seule: dernier modèle ajusté de la crypto, sans entraînement
+    
+    Features de la dernière bougie par le moteur incrémental et modèle compact
+    (compact_model) prédit en numpy: ni pandas, ni scikit-learn. Sans artefact
+    compact, repli sur le modèle picklé (qui importe scikit-learn).
+    """
+    store = store if store is not None else ModelStore()
+    entry = store.latest_compact(coin_id)
+    if entry is None:
+        stored = store.latest(coin_id)
+        if stored is None:
+            raise Exception(f"Aucun modèle entraîné pour {coin_id} (lancer une prédiction complète)")
+        entry = stored[1]
+    model, scaler, metrics = entry
+    
+    engine = IncrementalFeatureEngine.from_history(ohlc_data)
+    return make_prediction(model, scaler, engine.features(), engine.close_prices(),
+                           market_data, coin_id, metrics)
+
 def main():
     print("=" * 60)
     print("🤖 MODÈLE IA V3 - ROBUSTE & FIABLE")
@@ -384,17 +843,24 @@ def main():
     print()
     
     try:
-        # Charger les données
-        ohlc_data, market_data, coin_id = load_data()
-        
-        # Préparer les données
-        X_train, y_train, X_predict, feature_cols, close_prices, df = prepare_data(ohlc_data)
+        # Charger les données (coin_id, fichier ou '-' pour stdin); --inference: modèle existant seul
+        args = [a for a in sys.argv[1:] if a != '--inference']
+        inference = len(args) < len(sys.argv) - 1
+        ohlc_data, market_data, coin_id = load_data(args[0] if args else None)
         
-        # Entraîner le modèle
-        model, scaler, metrics = train_model(X_train, y_train)
+        # Préparer, entraîner et prédire (profilage optionnel: PIPELINE_PROFILE=cprofile|sample)
+        mode = os.environ.get('PIPELINE_PROFILE')
+        with instrumentation.profile(mode) if mode else contextlib.nullcontext() as profil:
+            if inference:
+                prediction = infer(ohlc_data, market_data, coin_id, store=ModelStore())
+            else:
+                prediction = run_pipeline(ohlc_data, market_data, coin_id, store=ModelStore())
         
-        # Faire la prédiction
-        prediction = make_prediction(model, scaler, X_predict, close_prices, market_data, coin_id, metrics)
+        # Métriques JSON à part du résultat
+        metrics_file = os.environ.get('PIPELINE_METRICS_FILE')
+        if metrics_file:
+            with open(metrics_file, 'w') as f:
+                json.dump(dict(instrumentation.snapshot(), profile=profil.report() if profil else None), f)
         
         print()
         print("=" * 60)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backtest walk-forward
+Rejoue l'historique sur de nombreuses origines glissantes (et plusieurs
+cryptos): à chaque origine t, le modèle est entraîné uniquement sur les
+paires (features[i], close[i+h]) avec i + h <= t, puis la prédiction est
+contrainte et signalée comme dans make_prediction et comparée au prix réel.
+
+Les features sont calculées une fois par crypto et partagées par tous les
+plis (indicateurs causaux); les plis tournent dans un pool de processus.
+
+Usage:
+    python backtest.py bitcoin ethereum --step 7 --window 365
+    python backtest.py --top 20 --backend hist --output backtest.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+import ai_model_v3
+from ohlc_warehouse import OhlcWarehouse
+
+SIGNAUX = ("ACHETER", "ATTENDRE", "VENDRE")
+# Premières bougies ignorées: indicateurs en cours d'amorce (remplis par bfill)
+WARMUP = 30
+
+
+def charger_historique(coin_id):
+    """Historique complet: entrepôt OHLC local, sinon fichier de données du collecteur"""
+    historique = OhlcWarehouse().historique(coin_id)
+    if len(historique) >= WARMUP:
+        return historique
+    ohlc_data, _, _ = ai_model_v3.load_data(coin_id)
+    return ohlc_data
+
+
+def matrices(ohlc_data):
+    """Features (n, 20) et clôtures (n,) calculées une fois pour tous les plis"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, _, _, feature_cols, close_prices, df = ai_model_v3.prepare_data(ohlc_data)
+    return df[feature_cols].to_numpy(dtype=np.float64), np.asarray(close_prices, dtype=np.float64)
+
+
+def origines(n, horizon, window, step, min_train):
+    """Origines t (dernière bougie connue) ayant un futur connu à t + horizon"""
+    premiere = WARMUP + horizon + min_train - 1
+    if window:
+        premiere = max(premiere, WARMUP + window - 1)
+    return list(range(premiere, n - horizon, step))
+
+
+def evaluer_plis(coin_id, features, closes, plis, horizon, window, backend):
+    """Exécuté dans un processus du pool: un pli par origine"""
+    # Hyperparamètres de production (réglages de tuning.py compris)
+    params = ai_model_v3.model_params(coin_id, backend)
+    resultats = []
+    for t in plis:
+        # ✅ Pas de fuite: paires (i, i + horizon) entièrement connues à l'origine t
+        fin = t - horizon + 1
+        debut = max(WARMUP, fin - window) if window else WARMUP
+        X, y = ai_model_v3.build_supervised(features[debut:t + 1], closes[debut:t + 1], horizon)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            model, scaler, metrics = ai_model_v3.train_model(X, y, backend, params)
+
+        prix_actuel = closes[t]
+        brut = float(model.predict(scaler.transform(features[t:t + 1]))[0])
+        predit, _, _, _ = ai_model_v3.clip_prediction(brut, prix_actuel, closes[:t + 1], horizon)
+        reel = closes[t + horizon]
+
+        variation_predite = (predit - prix_actuel) / prix_actuel * 100
+        variation_reelle = (reel - prix_actuel) / prix_actuel * 100
+
+        resultats.append({
+            'coin': coin_id,
+            'origin': t,
+            'train_samples': len(X),
+            'signal': ai_model_v3.signal_from_change(variation_predite),
+            'actual_signal': ai_model_v3.signal_from_change(variation_reelle),
+            'predicted_change': variation_predite,
+            'actual_change': variation_reelle,
+            'clipped_error': abs(predit - reel) / reel,
+            'raw_error': abs(brut - reel) / reel,
+            'r2_test': metrics['r2_test'],
+        })
+    return resultats
+
+
+def _init_processus(threads):
+    """Borne les threads OpenMP/BLAS par processus (backend 'hist' multi-thread)"""
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=threads)
+
+
+def resumer(plis):
+    """Taux de réussite des signaux, erreurs de prix et matrice de confusion"""
+    if not plis:
+        return {'folds': 0}
+
+    signal = np.array([p['signal'] for p in plis])
+    reel = np.array([p['actual_signal'] for p in plis])
+    predite = np.array([p['predicted_change'] for p in plis])
+    observee = np.array([p['actual_change'] for p in plis])
+    r2 = np.array([p['r2_test'] for p in plis])
+    succes = signal == reel
+
+    par_signal = {}
+    for s in SIGNAUX:
+        emis = signal == s
+        par_signal[s] = {
+            'count': int(emis.sum()),
+            'hit_rate': float(succes[emis].mean()) if emis.any() else None,
+        }
+
+    # La confiance affichée vient de r2_test: les signaux confiants sont-ils plus justes?
+    par_confiance = {}
+    for nom, bas, haut in (('low', -np.inf, 0.3), ('medium', 0.3, 0.6), ('high', 0.6, np.inf)):
+        tranche = (r2 >= bas) & (r2 < haut)
+        par_confiance[nom] = {
+            'count': int(tranche.sum()),
+            'hit_rate': float(succes[tranche].mean()) if tranche.any() else None,
+        }
+
+    return {
+        'folds': len(plis),
+        'hit_rate': float(succes.mean()),
+        'direction_hit_rate': float((np.sign(predite) == np.sign(observee)).mean()),
+        'clipped_mape': float(np.mean([p['clipped_error'] for p in plis]) * 100),
+        'raw_mape': float(np.mean([p['raw_error'] for p in plis]) * 100),
+        'mean_r2_test': float(r2.mean()),
+        'by_signal': par_signal,
+        'by_confidence': par_confiance,
+        'confusion': {s: {r: int(((signal == s) & (reel == r)).sum()) for r in SIGNAUX} for s in SIGNAUX},
+    }
+
+
+def backtester(coin_ids, horizon=7, window=365, step=1, min_train=60,
+               workers=None, backend=None, chunk=16, details=False):
+    """Backtest walk-forward de plusieurs cryptos, résultat JSON combiné"""
+    start = time.time()
+    workers = workers or os.cpu_count() or 1
+
+    erreurs = {}
+    taches = []
+    for coin_id in coin_ids:
+        try:
+            features, closes = matrices(charger_historique(coin_id))
+        except Exception as e:
+            erreurs[coin_id] = str(e)
+            continue
+
+        plis = origines(len(closes), horizon, window, step, min_train)
+        if not plis:
+            erreurs[coin_id] = f"Historique trop court ({len(closes)} bougies)"
+            continue
+
+        print(f"📊 {coin_id}: {len(closes)} bougies, {len(plis)} plis")
+        for i in range(0, len(plis), chunk):
+            taches.append((coin_id, features, closes, plis[i:i + chunk]))
+
+    if workers > 1 and len(taches) > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_processus, initargs=(threads,))
+    else:
+        executor = ThreadPoolExecutor(max_workers=1)
+
+    print(f"🤖 {sum(len(t[3]) for t in taches)} plis ({len(taches)} tâches, {workers} processus)...")
+    resultats = []
+    with executor as pool:
+        futures = {
+            pool.submit(evaluer_plis, coin_id, features, closes, plis, horizon, window, backend): coin_id
+            for coin_id, features, closes, plis in taches
+        }
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                resultats.extend(future.result())
+            except Exception as e:
+                erreurs[coin_id] = str(e)
+
+    resultats.sort(key=lambda p: (p['coin'], p['origin']))
+    par_crypto = {
+        coin_id: resumer([p for p in resultats if p['coin'] == coin_id])
+        for coin_id in coin_ids if coin_id not in erreurs
+    }
+
+    result = {
+        'summary': resumer(resultats),
+        'coins': par_crypto,
+        'errors': erreurs,
+        'config': {
+            'horizon': horizon, 'window': window, 'step': step, 'min_train': min_train,
+            'backend': backend or ai_model_v3.MODEL_BACKEND,
+        },
+        'duration_ms': int((time.time() - start) * 1000),
+        'timestamp': datetime.now().isoformat()
+    }
+    if details:
+        result['folds'] = resultats
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest walk-forward")
+    parser.add_argument('coins', nargs='*', help="ids CoinGecko (historique ohlc/<coin>.ohlc ou data_<coin>)")
+    parser.add_argument('--top', type=int, help="Top N par market cap")
+    parser.add_argument('--horizon', type=int, default=7)
+    parser.add_argument('--window', type=int, default=365, help="Fenêtre d'entraînement (0 = expansive)")
+    parser.add_argument('--step', type=int, default=1, help="Jours entre deux origines")
+    parser.add_argument('--min-train', type=int, default=60, help="Paires d'entraînement minimum")
+    parser.add_argument('--workers', type=int, help="Processus (défaut: nb CPU)")
+    parser.add_argument('--backend', choices=list(ai_model_v3.MODEL_BACKENDS))
+    parser.add_argument('--folds', action='store_true', help="Inclure le détail de chaque pli")
+    parser.add_argument('--output', help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📈 BACKTEST WALK-FORWARD")
+    print("=" * 60)
+    print()
+
+    try:
+        coin_ids = list(args.coins)
+        if args.top:
+            from batch_predict import charger_top_coins
+            coin_ids += [c for c in charger_top_coins(args.top) if c not in coin_ids]
+        if not coin_ids:
+            raise Exception("Aucune crypto demandée (ids ou --top N)")
+
+        result = backtester(coin_ids, horizon=args.horizon, window=args.window, step=args.step,
+                            min_train=args.min_train, workers=args.workers, backend=args.backend,
+                            details=args.folds)
+
+        summary = result['summary']
+        if summary['folds']:
+            print(f"✅ {summary['folds']} plis | signaux justes: {summary['hit_rate']*100:.1f}% | "
+                  f"direction: {summary['direction_hit_rate']*100:.1f}% | MAPE contrainte: {summary['clipped_mape']:.2f}%")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(result, f)
+            print(f"💾 Sauvegardé: {args.output}")
+
+        print(json.dumps(result))
+        sys.exit(0)
+
+    except Exception as e:
+        print(f"❌ Erreur: {str(e)}")
+        print(json.dumps({
+            'error': True,
+            'message': str(e),
+            'timestamp': datetime.now().isoformat()
+        }))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prédictions par lot (leaderboard)
+Collecte concurrente de plusieurs cryptos puis entraînement/inférence en
+parallèle sur un pool de processus, résultat JSON combiné.
+--pooled: un seul modèle mutualisé pour toutes les cryptos (pooled_model).
+
+Usage:
+    python batch_predict.py bitcoin ethereum solana
+    python batch_predict.py --top 250 --output leaderboard.json
+    python batch_predict.py --top 250 --pooled
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from collect_data_v5 import collecter_plusieurs
+import ai_model_v3
+import pooled_model
+from model_store import ModelStore
+
+CRYPTO_LIST_CACHE_FILE = 'crypto_list_cache.json'
+CRYPTOS_FILE = 'cryptos.json'
+
+_store = None
+
+
+def _init_processus(threads):
+    """Borne les threads OpenMP/BLAS par processus (backend 'hist' multi-thread)"""
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=threads)
+
+
+def charger_top_coins(n):
+    """Top N des ids par market cap (cache de index.js, sinon cryptos.json)"""
+    for fichier in (CRYPTO_LIST_CACHE_FILE, CRYPTOS_FILE):
+        try:
+            with open(fichier, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        cryptos = data.get('cryptos', []) if isinstance(data, dict) else data
+        cryptos = sorted(cryptos, key=lambda c: c.get('rank') or c.get('market_cap_rank') or 10**9)
+        ids = [c['id'] for c in cryptos if c.get('id')]
+        if ids:
+            return ids[:n]
+
+    raise Exception("Aucune liste de cryptos disponible")
+
+
+def _predire(data):
+    """Exécuté dans un processus du pool (store de modèles propre au processus)"""
+    global _store
+    if _store is None:
+        _store = ModelStore()
+
+    return ai_model_v3.run_pipeline(
+        data['ohlc'], data.get('market_data', {}), data['coin_id'], store=_store
+    )
+
+
+def _predire_par_crypto(valides, predictions, erreurs, workers):
+    """Un modèle par crypto, entraînés en parallèle sur un pool de processus"""
+    print(f"🤖 Entraînement + prédiction de {len(valides)} cryptos ({workers} processus)...")
+    if workers > 1 and len(valides) > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_processus, initargs=(threads,))
+    else:
+        executor = ThreadPoolExecutor(max_workers=1)
+
+    with executor as pool:
+        futures = {pool.submit(_predire, dict(d, coin_id=coin_id)): coin_id for coin_id, d in valides.items()}
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                predictions[coin_id] = future.result()
+            except Exception as e:
+                erreurs[coin_id] = str(e)
+
+
+def predire_lot(coin_ids, days=30, workers=None, collect_workers=8, pooled=False):
+    """Collecte + prédiction pour une liste de cryptos, résultat JSON combiné
+
+    pooled: un entraînement mutualisé pour tout le lot au lieu d'un modèle par crypto.
+    """
+    start = time.time()
+    workers = workers or os.cpu_count() or 1
+
+    print(f"📥 Collecte de {len(coin_ids)} cryptos ({collect_workers} en parallèle)...")
+    donnees = collecter_plusieurs(coin_ids, days=days, max_workers=collect_workers)
+
+    predictions = {}
+    erreurs = {coin_id: str(d) for coin_id, d in donnees.items() if isinstance(d, Exception)}
+    valides = {coin_id: d for coin_id, d in donnees.items() if not isinstance(d, Exception)}
+    infos = None
+
+    if pooled:
+        print(f"🧺 Modèle mutualisé pour {len(valides)} cryptos (un seul entraînement)...")
+        predictions, erreurs_modele, infos = pooled_model.predict_universe(valides, store=ModelStore())
+        erreurs.update(erreurs_modele)
+    else:
+        _predire_par_crypto(valides, predictions, erreurs, workers)
+
+    # Leaderboard: meilleures variations prédites d'abord
+    leaderboard = sorted(
+        ({
+            'coin': coin_id,
+            'signal': p['signal'],
+            'current_price': p['current_price'],
+            'predicted_price': p['predicted_price'],
+            'price_change': p['price_change'],
+            'r_squared': p['r_squared'],
+        } for coin_id, p in predictions.items()),
+        key=lambda row: row['price_change'],
+        reverse=True
+    )
+
+    print(f"✅ {len(predictions)} prédictions, {len(erreurs)} erreurs")
+
+    result = {
+        'predictions': predictions,
+        'leaderboard': leaderboard,
+        'errors': erreurs,
+        'total': len(coin_ids),
+        'duration_ms': int((time.time() - start) * 1000),
+        'timestamp': datetime.now().isoformat()
+    }
+    if infos is not None:
+        result['pooled'] = infos
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prédictions par lot")
+    parser.add_argument('coins', nargs='*', help="ids CoinGecko")
+    parser.add_argument('--top', type=int, help="Top N par market cap")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--workers', type=int, help="Processus d'entraînement (défaut: nb CPU)")
+    parser.add_argument('--collect-workers', type=int, default=8)
+    parser.add_argument('--pooled', action='store_true',
+                        help="Un seul modèle mutualisé pour toutes les cryptos (un entraînement)")
+    parser.add_argument('--output', help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🤖 PRÉDICTIONS PAR LOT")
+    print("=" * 60)
+    print()
+
+    try:
+        coin_ids = list(args.coins)
+        if args.top:
+            coin_ids += [c for c in charger_top_coins(args.top) if c not in coin_ids]
+        if not coin_ids:
+            raise Exception("Aucune crypto demandée (ids ou --top N)")
+
+        result = predire_lot(coin_ids, days=args.days, workers=args.workers,
+                             collect_workers=args.collect_workers, pooled=args.pooled)
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(result, f)
+            print(f"💾 Sauvegardé: {args.output}")
+
+        print(json.dumps(result))
+        sys.exit(0)
+
+    except Exception as e:
+        print(f"❌ Erreur: {str(e)}")
+        print(json.dumps({
+            'error': True,
+            'message': str(e),
+            'timestamp': datetime.now().isoformat()
+        }))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark des backends d'entraînement (MODEL_BACKENDS de ai_model_v3)
+Mêmes données pour chaque backend: temps de fit, temps de prédiction
+(lot complet et une ligne) et métriques test r2/mae/rmse/mape.
+
+Usage: python benchmarks/bench_backends.py [bougies...]
+"""
+
+import contextlib
+import io
+import sys
+import time
+
+from synthetic import generer_ohlc
+import ai_model_v3
+
+
+def mesurer(X, y, X_predict, backend, repetitions=20):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        model, scaler, metrics = ai_model_v3.train_model(X, y, backend)
+        fit = time.perf_counter() - start
+
+    X_scaled = scaler.transform(X)
+    start = time.perf_counter()
+    model.predict(X_scaled)
+    predict_lot = time.perf_counter() - start
+
+    X_predict_scaled = scaler.transform(X_predict)
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        model.predict(X_predict_scaled)
+    predict_un = (time.perf_counter() - start) / repetitions
+
+    return fit, predict_lot, predict_un, metrics
+
+
+def main():
+    tailles = [int(n) for n in sys.argv[1:]] or [365, 1825, 3650]
+
+    print(f"{'bougies':>8} {'backend':<6}{'fit':>9}{'pred lot':>10}{'pred 1':>9}"
+          f"{'R² test':>9}{'MAE':>10}{'RMSE':>10}{'MAPE':>8}")
+    for n in tailles:
+        ohlc = generer_ohlc(n, seed=7)
+        with contextlib.redirect_stdout(io.StringIO()):
+            X, y, X_predict, _, _, _ = ai_model_v3.prepare_data(ohlc)
+
+        for backend in ai_model_v3.MODEL_BACKENDS:
+            fit, lot, un, m = mesurer(X, y, X_predict, backend)
+            print(f"{n:>8} {backend:<6}{fit * 1000:>7.0f}ms{lot * 1000:>8.1f}ms{un * 1000:>7.2f}ms"
+                  f"{m['r2_test']:>9.3f}{m['mae']:>10.2f}{m['rmse']:>10.2f}{m['mape']:>7.2f}%")
+
+
+if __name__ == "__main__":
+    main()
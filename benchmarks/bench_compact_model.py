@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark + parité: artefacts compacts (compact_model) vs modèles scikit-learn picklés
+Par backend et taille d'historique: prédictions identiques sur tout X (échec
+sinon), taille sur disque, temps de chargement (pickle vs memmap) et
+d'inférence (une ligne, lot complet). Puis chargement de N modèles de cryptos.
+"lot np" mesure le parcours numpy seul: via le store, les lots de plus de
+COMPACT_MAX_ROWS lignes passent par le modèle scikit-learn (fallback).
+
+Usage: python benchmarks/bench_compact_model.py [bougies...] [--coins 100]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import generer_ohlc
+import ai_model_v3
+import compact_model
+
+
+def chrono(fn, repetitions):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        fn()
+    return (time.perf_counter() - start) / repetitions
+
+
+def entrainer(n, backend, seed=7):
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, y, X_predict, _, _, _ = ai_model_v3.prepare_data(generer_ohlc(n, seed=seed))
+        model, scaler, metrics = ai_model_v3.train_model(X, y, backend)
+    return X, X_predict, (model, scaler, metrics)
+
+
+def verifier_parite(X, entry, compact):
+    model, scaler, _ = entry
+    c_model, c_scaler, _ = compact
+    np.testing.assert_array_equal(c_scaler.transform(X), scaler.transform(X))
+    np.testing.assert_array_equal(c_model.predict(c_scaler.transform(X)), model.predict(scaler.transform(X)))
+
+    # Lignes perturbées: valeurs hors de l'historique, proches des seuils
+    rng = np.random.default_rng(0)
+    bruit = X[rng.integers(0, len(X), 256)] * rng.uniform(0.9, 1.1, (256, X.shape[1]))
+    np.testing.assert_array_equal(c_model.predict(c_scaler.transform(bruit)), model.predict(scaler.transform(bruit)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Artefacts de modèle compacts vs pickle")
+    parser.add_argument('tailles', nargs='*', type=int, default=[30, 365, 1825])
+    parser.add_argument('--coins', type=int, default=100, help="Modèles chargés pour le test multi-cryptos")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        print(f"{'bougies':>8} {'backend':<6}{'pickle':>9}{'compact':>9}{'load pkl':>10}{'load cmdl':>11}"
+              f"{'pred 1 sk':>11}{'pred 1 np':>11}{'lot sk':>9}{'lot np':>9}")
+        for n in args.tailles:
+            for backend in ai_model_v3.MODEL_BACKENDS:
+                X, X_predict, entry = entrainer(n, backend)
+                path = os.path.join(dossier, f"{backend}_{n}.cmdl")
+                taille = compact_model.save(path, *entry)
+                compact = compact_model.load(path)
+                verifier_parite(X, entry, compact)
+
+                data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+                load_pkl = chrono(lambda: pickle.loads(data), 20)
+                load_cmdl = chrono(lambda: compact_model.load(path), 20)
+
+                model, scaler, _ = entry
+                c_model, c_scaler, _ = compact
+                un_sk = chrono(lambda: model.predict(scaler.transform(X_predict)), 50)
+                un_np = chrono(lambda: c_model.predict(c_scaler.transform(X_predict)), 50)
+                lot_sk = chrono(lambda: model.predict(scaler.transform(X)), 5)
+                lot_np = chrono(lambda: c_model.predict(c_scaler.transform(X)), 5)
+
+                print(f"{n:>8} {backend:<6}{len(data) / 1024:>7.0f}Ko{taille / 1024:>7.0f}Ko"
+                      f"{load_pkl * 1000:>8.2f}ms{load_cmdl * 1000:>9.2f}ms"
+                      f"{un_sk * 1000:>9.2f}ms{un_np * 1000:>9.2f}ms{lot_sk * 1000:>7.1f}ms{lot_np * 1000:>7.1f}ms")
+
+        print("✅ Parité: prédictions identiques à scikit-learn")
+
+        # Univers de cryptos: un artefact par crypto, tous mappés par un worker
+        _, _, entry = entrainer(365, 'gbr')
+        chemins = [os.path.join(dossier, f"coin{i}.cmdl") for i in range(args.coins)]
+        for chemin in chemins:
+            compact_model.save(chemin, *entry)
+        start = time.perf_counter()
+        modeles = [compact_model.load(chemin) for chemin in chemins]
+        duree = time.perf_counter() - start
+        print(f"🗂️  {len(modeles)} modèles compacts mappés en {duree * 1000:.1f}ms "
+              f"({duree / len(modeles) * 1e6:.0f}µs/modèle)")
+
+
+if __name__ == "__main__":
+    main()
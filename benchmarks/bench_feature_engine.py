@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark + parité: IncrementalFeatureEngine vs prepare_data complet
+Chaque nouvelle bougie est comparée à la dernière ligne de prepare_data
+recalculé sur tout l'historique, puis les deux coûts par bougie sont mesurés.
+
+Usage: python benchmarks/bench_feature_engine.py
+"""
+
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from synthetic import generer_ohlc
+import ai_model_v3
+from feature_engine import IncrementalFeatureEngine, FEATURE_COLS
+
+
+def derniere_ligne(ohlc):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ai_model_v3.prepare_data(ohlc)[2][0]
+
+
+def verifier_parite(n_seed=30, n_stream=150):
+    for seed in range(5):
+        ohlc = generer_ohlc(n_seed + n_stream, seed=seed)
+        engine = IncrementalFeatureEngine.from_history(ohlc[:n_seed])
+        np.testing.assert_allclose(engine.features()[0], derniere_ligne(ohlc[:n_seed]), rtol=1e-8)
+
+        for i in range(n_seed, n_seed + n_stream):
+            features = engine.update(ohlc[i])
+            np.testing.assert_allclose(features, derniere_ligne(ohlc[:i + 1]), rtol=1e-8, atol=1e-10,
+                                       err_msg=f"seed={seed} bougie={i}")
+
+        # Bougie du jour révisée: remplace la précédente au lieu de s'ajouter
+        revision = list(ohlc[-1])
+        revision[4] *= 1.01
+        np.testing.assert_allclose(engine.update(revision), derniere_ligne(ohlc[:-1] + [revision]), rtol=1e-8)
+
+    print(f"✅ Parité des {len(FEATURE_COLS)} features (flux de {n_stream} bougies x 5 séries)")
+
+
+def main():
+    verifier_parite()
+    print()
+    print(f"{'historique':>10} | {'prepare_data':>12} | {'update()':>10} | {'speedup':>8}")
+    print("-" * 50)
+
+    for n in [30, 365, 3650]:
+        ohlc = generer_ohlc(n + 100, seed=n)
+        engine = IncrementalFeatureEngine.from_history(ohlc[:n])
+
+        start = time.perf_counter()
+        for candle in ohlc[n:]:
+            engine.update(candle)
+        t_update = (time.perf_counter() - start) / 100
+
+        start = time.perf_counter()
+        for i in range(n, n + 10):
+            derniere_ligne(ohlc[:i + 1])
+        t_batch = (time.perf_counter() - start) / 10
+
+        print(f"{n:>10} | {t_batch*1000:>10.2f}ms | {t_update*1e6:>8.1f}µs | {t_batch/t_update:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
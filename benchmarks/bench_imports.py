@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Budget de démarrage à froid des points d'entrée Python
+Chaque scénario tourne dans un interpréteur neuf (médiane de plusieurs
+lancements): temps d'import + exécution mesuré dans le processus, et
+modules qui ne doivent PAS être chargés (requests sur un cache touché,
+pandas/scikit-learn à l'import de ai_model_v3...).
+
+Code de sortie 1 si un budget est dépassé ou un module interdit chargé:
+    python benchmarks/bench_imports.py
+    python benchmarks/bench_imports.py --runs 9 --scale 2   # machine lente
+    python benchmarks/bench_imports.py --importtime collect_cache_hit
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from synthetic import RACINE, generer_ohlc
+
+# Scénario: (code exécuté, budget en ms ou None, modules interdits)
+SCENARIOS = {
+    'import_collect': (
+        "import collect_data_v5",
+        400, ('requests', 'pandas', 'sklearn'),
+    ),
+    'collect_cache_hit': (
+        "from collect_data_v5 import DataCollectorV5\n"
+        "DataCollectorV5('benchcoin', days=30).collecter_donnees()",
+        500, ('requests', 'pandas', 'sklearn'),
+    ),
+    'import_model': (
+        "import ai_model_v3",
+        400, ('pandas', 'sklearn'),
+    ),
+    # Artefact compact du store (memmap + prédicteur numpy)
+    'inference': (
+        "import ai_model_v3\n"
+        "ohlc, market, coin = ai_model_v3.load_data('benchcoin')\n"
+        "ai_model_v3.infer(ohlc, market, coin)",
+        500, ('pandas', 'sklearn'),
+    ),
+    # Référence: pile d'entraînement complète (pas de budget)
+    'training_stack': (
+        "import ai_model_v3\n"
+        "ai_model_v3.preload()",
+        None, (),
+    ),
+}
+
+ENFANT = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def preparer(dossier):
+    """Cache marché frais, fichier de collecte et modèle entraîné pour 'benchcoin'"""
+    import ai_model_v3
+    from market_cache import MarketDataCache
+    from model_store import ModelStore
+
+    data = {
+        'coin_id': 'benchcoin',
+        'ohlc': generer_ohlc(30, seed=3),
+        'market_data': {'current_price': 100., 'source': 'bench'},
+        'source': 'bench',
+    }
+    data['market_data']['current_price'] = data['ohlc'][-1][4]
+
+    MarketDataCache(os.path.join(dossier, 'market_cache.db')).put('benchcoin:30', data)
+    with open(os.path.join(dossier, 'data_benchcoin.json'), 'w') as f:
+        json.dump(data, f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ai_model_v3.run_pipeline(data['ohlc'], data['market_data'], 'benchcoin',
+                                 store=ModelStore(os.path.join(dossier, 'models')))
+
+
+def environnement(dossier):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [RACINE, env.get('PYTHONPATH')]))
+    env['MARKET_CACHE_DB'] = os.path.join(dossier, 'market_cache.db')
+    env['MODEL_STORE_DIR'] = os.path.join(dossier, 'models')
+    env['OHLC_WAREHOUSE_DIR'] = os.path.join(dossier, 'ohlc')
+    return env
+
+
+def lancer(code, dossier, options=()):
+    source = ENFANT.format(code='\n'.join('    ' + ligne for ligne in code.splitlines()))
+    sortie = subprocess.run([sys.executable, *options, '-c', source], cwd=dossier, env=environnement(dossier),
+                            capture_output=True, text=True)
+    if sortie.returncode != 0:
+        raise Exception(sortie.stderr.strip().splitlines()[-1] if sortie.stderr.strip() else 'échec')
+    return json.loads(sortie.stdout.strip().splitlines()[-1]), sortie.stderr
+
+
+def mesurer(nom, dossier, runs, scale):
+    code, budget, interdits = SCENARIOS[nom]
+    temps, modules = [], set()
+    for _ in range(runs):
+        resultat, _ = lancer(code, dossier)
+        temps.append(resultat['ms'])
+        modules.update(resultat['modules'])
+
+    charges = [m for m in interdits if m in modules]
+    mediane = statistics.median(temps)
+    limite = budget * scale if budget is not None else None
+    return {
+        'scenario': nom,
+        'median_ms': round(mediane, 1),
+        'max_ms': round(max(temps), 1),
+        'budget_ms': limite,
+        'forbidden_loaded': charges,
+        'ok': not charges and (limite is None or mediane <= limite),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de démarrage à froid (imports différés)")
+    parser.add_argument('scenarios', nargs='*', help=f"Scénarios ({', '.join(SCENARIOS)}), tous par défaut")
+    parser.add_argument('--runs', type=int, default=5, help="Lancements par scénario (médiane)")
+    parser.add_argument('--scale', type=float, default=1., help="Multiplie les budgets (machines lentes)")
+    parser.add_argument('--importtime', metavar='SCENARIO', choices=list(SCENARIOS),
+                        help="Affiche les 15 imports les plus coûteux (-X importtime) d'un scénario")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    inconnus = [nom for nom in args.scenarios if nom not in SCENARIOS]
+    if inconnus:
+        parser.error(f"Scénarios inconnus: {', '.join(inconnus)}")
+
+    with tempfile.TemporaryDirectory() as dossier:
+        preparer(dossier)
+
+        if args.importtime:
+            _, stderr = lancer(SCENARIOS[args.importtime][0], dossier, ['-X', 'importtime'])
+            lignes = [l.split('|') for l in stderr.splitlines() if l.startswith('import time:') and 'self' not in l]
+            lignes.sort(key=lambda l: int(l[1]), reverse=True)
+            for _, cumul, module in lignes[:15]:
+                print(f"{int(cumul) / 1000:>9.1f}ms  {module.rstrip()}")
+            return
+
+        resultats = [mesurer(nom, dossier, args.runs, args.scale) for nom in args.scenarios or SCENARIOS]
+
+    if args.json:
+        print(json.dumps(resultats, indent=2))
+    else:
+        print(f"{'scénario':<20}{'médiane':>10}{'max':>10}{'budget':>10}  modules interdits chargés")
+        for r in resultats:
+            budget = f"{r['budget_ms']:.0f}ms" if r['budget_ms'] is not None else '-'
+            statut = '✅' if r['ok'] else '❌'
+            print(f"{r['scenario']:<20}{r['median_ms']:>8.1f}ms{r['max_ms']:>8.1f}ms{budget:>10}  "
+                  f"{statut} {', '.join(r['forbidden_loaded']) or '-'}")
+
+    if not all(r['ok'] for r in resultats):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: construction des paires d'entraînement de prepare_data
+Compare l'ancienne boucle .iloc[i] à la version vectorisée (build_supervised)
+
+Usage: python benchmarks/bench_prepare_data.py
+"""
+
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import generer_ohlc
+import ai_model_v3
+
+FEATURE_COLS = [f"f{i}" for i in range(20)]
+
+
+def paires_boucle(df, horizon=7):
+    """Implémentation historique (référence)"""
+    X_train = []
+    y_train = []
+    for i in range(len(df) - horizon):
+        X_train.append(df[FEATURE_COLS].iloc[i].values)
+        y_train.append(df['close'].iloc[i + horizon])
+    return np.array(X_train), np.array(y_train)
+
+
+def paires_vectorisees(df, horizon=7):
+    features = df[FEATURE_COLS].to_numpy(dtype=np.float64)
+    return ai_model_v3.build_supervised(features, df['close'].to_numpy(dtype=np.float64), horizon)
+
+
+def chronometrer(fn, *args, repetitions=3):
+    meilleur = float('inf')
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        result = fn(*args)
+        meilleur = min(meilleur, time.perf_counter() - start)
+    return meilleur, result
+
+
+def main():
+    print(f"{'bougies':>8} | {'boucle':>10} | {'vectorisé':>10} | {'speedup':>8} | {'prepare_data':>12}")
+    print("-" * 62)
+
+    for n in [30, 365, 1825, 3650]:
+        rng = np.random.default_rng(n)
+        df = pd.DataFrame(rng.normal(size=(n, 20)), columns=FEATURE_COLS)
+        df['close'] = rng.normal(size=n)
+
+        for horizon in (1, 7, 30):
+            if n <= horizon:
+                continue
+            X_ref, y_ref = paires_boucle(df.head(200), horizon)
+            X_vec, y_vec = paires_vectorisees(df.head(200), horizon)
+            assert np.array_equal(X_ref, X_vec) and np.array_equal(y_ref, y_vec), f"écart horizon={horizon}"
+
+        repetitions = 1 if n > 1000 else 3
+        t_boucle, _ = chronometrer(paires_boucle, df, repetitions=repetitions)
+        t_vec, _ = chronometrer(paires_vectorisees, df)
+
+        ohlc = generer_ohlc(n, seed=n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            t_prepare, _ = chronometrer(ai_model_v3.prepare_data, ohlc)
+
+        print(f"{n:>8} | {t_boucle*1000:>8.2f}ms | {t_vec*1000:>8.3f}ms | {t_boucle/t_vec:>7.0f}x | {t_prepare*1000:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
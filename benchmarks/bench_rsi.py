@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark + parité: calculate_rsi vectorisé vs boucle Python historique
+Vérifie l'égalité numérique (1-D et 2-D multi-cryptos) puis mesure les temps.
+
+Usage: python benchmarks/bench_rsi.py
+"""
+
+import time
+
+import numpy as np
+
+from synthetic import generer_ohlc
+import ai_model_v3
+
+
+def rsi_boucle(prices, period=14):
+    """Implémentation historique (référence)"""
+    deltas = np.diff(prices)
+    seed = deltas[:period+1]
+    up = seed[seed >= 0].sum() / period
+    down = -seed[seed < 0].sum() / period
+    rs = up / down if down != 0 else 0
+    rsi = np.zeros_like(prices)
+    rsi[:period] = 100. - 100. / (1. + rs)
+
+    for i in range(period, len(prices)):
+        delta = deltas[i-1]
+        if delta > 0:
+            upval = delta
+            downval = 0.
+        else:
+            upval = 0.
+            downval = -delta
+
+        up = (up * (period - 1) + upval) / period
+        down = (down * (period - 1) + downval) / period
+
+        rs = up / down if down != 0 else 0
+        rsi[i] = 100. - 100. / (1. + rs)
+
+    return rsi
+
+
+def closes(n, seed):
+    return np.array(generer_ohlc(n, seed=seed))[:, 4]
+
+
+def verifier_parite():
+    cas = [closes(n, seed) for seed, n in enumerate([5, 14, 15, 16, 30, 365, 24 * 365])]
+    cas.append(np.full(40, 3.0))                          # aucune variation (down == 0)
+    cas.append(np.linspace(1, 2, 40))                     # hausse continue
+    cas.append(np.linspace(2, 1, 40))                     # baisse continue
+
+    for prices in cas:
+        for period in (2, 14, 30):
+            ref = rsi_boucle(prices, period)
+            vec = ai_model_v3.calculate_rsi(prices, period)
+            np.testing.assert_allclose(vec, ref, rtol=1e-9, atol=1e-9)
+
+    univers = np.stack([closes(500, seed) for seed in range(50)])
+    batch = ai_model_v3.calculate_rsi(univers, 14)
+    for row, prices in zip(batch, univers):
+        np.testing.assert_allclose(row, rsi_boucle(prices, 14), rtol=1e-9, atol=1e-9)
+
+    print("✅ Parité RSI (1-D, 2-D, cas limites)")
+
+
+def chronometrer(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    verifier_parite()
+    print()
+    print(f"{'série':>22} | {'boucle':>10} | {'vectorisé':>10} | {'speedup':>8}")
+    print("-" * 60)
+
+    for n in [30, 365, 24 * 365, 24 * 365 * 3]:
+        prices = closes(n, n)
+        t_boucle = chronometrer(rsi_boucle, prices)
+        t_vec = min(chronometrer(ai_model_v3.calculate_rsi, prices) for _ in range(3))
+        print(f"{n:>14} bougies | {t_boucle*1000:>8.2f}ms | {t_vec*1000:>8.2f}ms | {t_boucle/t_vec:>7.1f}x")
+
+    univers = np.stack([closes(24 * 365, seed) for seed in range(250)])
+    t_boucle = chronometrer(lambda: [rsi_boucle(p) for p in univers])
+    t_vec = chronometrer(ai_model_v3.calculate_rsi, univers)
+    print(f"{'250 x 8760 (2-D)':>22} | {t_boucle*1000:>8.0f}ms | {t_vec*1000:>8.1f}ms | {t_boucle/t_vec:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks reproductible des chemins critiques
+Indicateurs (calculate_rsi, calculate_macd), prepare_data, train_model,
+make_prediction sur des séries synthétiques de 30 jours à 10 ans, en
+unitaire et par lot de cryptos, puis DataCollectorV5 contre le serveur
+local stub_providers (CoinCap, Kraken, CoinGecko, sans réseau).
+
+Par cas: latences p50/p95/p99, débit et pic mémoire (tracemalloc, mesuré
+sur une exécution séparée pour ne pas fausser les temps).
+
+Les résultats peuvent être sauvegardés comme référence puis comparés:
+    python benchmarks/bench_suite.py --save default
+    python benchmarks/bench_suite.py --compare default --tolerance 0.25
+    python benchmarks/bench_suite.py --quick --only collect
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from synthetic import generer_ohlc, generer_univers
+from stub_providers import StubProviders
+from ohlc_store import OhlcColumns
+from prediction_cache import PredictionCache
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+LONGUEURS = (30, 365, 1825, 3650)
+LONGUEURS_RAPIDES = (30, 365, 1825)
+# Écarts de p50 plus petits que ce seuil: bruit de mesure, jamais signalés comme régression
+BRUIT_MS = 0.2
+
+
+def percentile(valeurs, q):
+    return float(np.percentile(valeurs, q)) * 1000 if len(valeurs) else None
+
+
+def mesurer(fn, repetitions, unites=1, memoire=True):
+    """Latences (ms), débit (unités/s) et pic mémoire (Kio) d'un appel sans argument
+
+    Un appel de chauffe précède les mesures, sauf pour les cas lourds (1 répétition).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(1 if repetitions > 1 else 0):
+            fn()
+
+        durees = []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            fn()
+            durees.append(time.perf_counter() - start)
+
+        pic = None
+        if memoire:
+            tracemalloc.start()
+            try:
+                fn()
+                pic = tracemalloc.get_traced_memory()[1] / 1024
+            finally:
+                tracemalloc.stop()
+
+    return {
+        'repetitions': repetitions,
+        'p50_ms': percentile(durees, 50),
+        'p95_ms': percentile(durees, 95),
+        'p99_ms': percentile(durees, 99),
+        'mean_ms': float(np.mean(durees)) * 1000,
+        'throughput_per_s': unites / float(np.median(durees)),
+        'peak_kib': pic,
+    }
+
+
+# ============================================================================
+# CAS
+# ============================================================================
+def cas_modele(ai_model_v3, longueurs, repetitions):
+    """Chemins critiques d'une crypto, par longueur d'historique"""
+    for n in longueurs:
+        ohlc = generer_ohlc(n, seed=n)
+        closes = np.array(ohlc)[:, 4]
+        r = max(3, repetitions * 365 // n)
+
+        yield f"rsi/{n}d", lambda: ai_model_v3.calculate_rsi(closes), r * 10, n
+        yield f"macd/{n}d", lambda: ai_model_v3.calculate_macd(closes), r * 10, n
+        yield f"prepare_data/{n}d", lambda: ai_model_v3.prepare_data(ohlc), r, n
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            X_train, y_train, X_predict, _, close_prices, _ = ai_model_v3.prepare_data(ohlc)
+            model, scaler, metrics = ai_model_v3.train_model(X_train, y_train)
+
+        yield (f"train_model/{n}d", lambda: ai_model_v3.train_model(X_train, y_train),
+               max(1, r // 3), len(X_train))
+        market = {'current_price': float(close_prices[-1])}
+        yield (f"make_prediction/{n}d",
+               lambda: ai_model_v3.make_prediction(model, scaler, X_predict, close_prices, market, 'bench', metrics),
+               r * 10, 1)
+
+        # Résultat complet resservi par le cache de prédictions (entrées et prix inchangés),
+        # OHLC colonnaires comme servis par l'entrepôt
+        cache = PredictionCache()
+        colonnes = OhlcColumns.from_rows(ohlc)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ai_model_v3.run_pipeline(colonnes, market, 'bench', horizons=[1, 7, 30], cache=cache)
+        yield (f"prediction_cache_hit/{n}d",
+               lambda: ai_model_v3.run_pipeline(colonnes, market, 'bench', horizons=[1, 7, 30], cache=cache),
+               r * 100, 1)
+
+
+def cas_lot(ai_model_v3, n_coins, longueur, repetitions):
+    """Lot de cryptos: RSI vectorisé sur (n_coins, n), MACD et prepare_data par crypto,
+    entraînement par crypto vs modèle mutualisé"""
+    univers = generer_univers(n_coins, longueur)
+    closes = np.array([np.array(ohlc)[:, 4] for ohlc in univers.values()])
+
+    def prepare_lot():
+        return [ai_model_v3.prepare_data(ohlc) for ohlc in univers.values()]
+
+    def macd_lot():
+        return [ai_model_v3.calculate_macd(c) for c in closes]
+
+    yield f"batch{n_coins}/rsi/{longueur}d", lambda: ai_model_v3.calculate_rsi(closes), repetitions * 3, n_coins
+    yield f"batch{n_coins}/macd/{longueur}d", macd_lot, repetitions, n_coins
+    yield f"batch{n_coins}/prepare_data/{longueur}d", prepare_lot, repetitions, n_coins
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        matrices = [ai_model_v3.prepare_data(ohlc)[:2] for ohlc in univers.values()]
+
+    def train_lot():
+        return [ai_model_v3.train_model(X, y) for X, y in matrices]
+
+    yield f"batch{n_coins}/train_model/{longueur}d", train_lot, 1, n_coins
+
+    # Un seul entraînement mutualisé pour le lot (features + fit + inférence)
+    import pooled_model
+    donnees = {coin_id: {'ohlc': ohlc, 'market_data': {}} for coin_id, ohlc in univers.items()}
+    yield f"batch{n_coins}/pooled/{longueur}d", lambda: pooled_model.predict_universe(donnees), 1, n_coins
+
+
+def cas_collecteur(stub, repetitions, history_days):
+    """DataCollectorV5 contre les fournisseurs factices (sans rate limit)"""
+    from collect_data_v5 import DataCollectorV5, TokenBucket
+    from market_cache import MarketDataCache
+    from ohlc_warehouse import OhlcWarehouse
+
+    # On mesure le collecteur, pas l'attente imposée par les quotas des vrais fournisseurs
+    for source in ('CoinCap', 'Kraken', 'CoinGecko'):
+        DataCollectorV5._buckets[source] = TokenBucket(1e9, 1e9)
+
+    dossier = tempfile.mkdtemp(prefix='bench_collect_')
+    cache = MarketDataCache(path=os.path.join(dossier, 'market_cache.db'))
+    compteur = iter(range(10 ** 9))
+
+    def collecteur(coin_id, fournisseur='coincap', entrepot=None, ttl=0):
+        # Santé remise à zéro: ordre nominal CoinCap → Kraken → CoinGecko
+        DataCollectorV5._health.clear()
+        c = DataCollectorV5(coin_id, history_days=history_days)
+        c.coincap_base, c.kraken_base, c.coingecko_base = (
+            stub.url('coincap'), stub.url('kraken'), stub.url('coingecko'))
+        if fournisseur != 'coincap':
+            c.coincap_mapping = {}
+        if fournisseur == 'coingecko':
+            c.kraken_mapping = {}
+        c.cache = cache
+        c.cache_duration = ttl
+        c.stale_duration = ttl
+        c.warehouse = entrepot or OhlcWarehouse(os.path.join(dossier, f"cold{next(compteur)}"))
+        return c
+
+    # Froid: entrepôt vide, historique complet téléchargé
+    for fournisseur in ('coincap', 'kraken', 'coingecko'):
+        yield (f"collect/cold/{fournisseur}",
+               lambda f=fournisseur: collecteur('bitcoin', f).collecter_donnees(), repetitions, 1)
+
+    # Incrémental: seules les bougies récentes sont redemandées
+    entrepot = OhlcWarehouse(os.path.join(dossier, 'warm'))
+    yield ("collect/incremental/coincap",
+           lambda: collecteur('ethereum', entrepot=entrepot).collecter_donnees(), repetitions, 1)
+
+    # Cache de marché valide: aucune requête
+    with contextlib.redirect_stdout(io.StringIO()):
+        collecteur('solana', ttl=3600).collecter_donnees()
+    yield ("collect/cache_hit",
+           lambda: collecteur('solana', ttl=3600).collecter_donnees(), repetitions * 10, 1)
+
+
+# ============================================================================
+# RÉFÉRENCES
+# ============================================================================
+def environnement():
+    import sklearn
+    import pandas
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def sauvegarder(nom, rapport):
+    os.makedirs(BASELINES, exist_ok=True)
+    path = os.path.join(BASELINES, f"{nom}.json")
+    with open(path, 'w') as f:
+        json.dump(rapport, f, indent=2, sort_keys=True)
+    return path
+
+
+def comparer(nom, resultats, tolerance):
+    """Ratio p50 actuel / référence par cas, liste des régressions au-delà de tolerance"""
+    with open(os.path.join(BASELINES, f"{nom}.json")) as f:
+        reference = json.load(f)['results']
+
+    regressions = []
+    print(f"\n{'cas':<36} | {'réf p50':>10} | {'p50':>10} | {'ratio':>6}")
+    print("-" * 72)
+    for cas, mesure in resultats.items():
+        ref = reference.get(cas)
+        if not ref or 'error' in ref or 'error' in mesure:
+            continue
+        ratio = mesure['p50_ms'] / ref['p50_ms']
+        alerte = ' ⚠️' if ratio > 1 + tolerance and mesure['p50_ms'] - ref['p50_ms'] > BRUIT_MS else ''
+        print(f"{cas:<36} | {ref['p50_ms']:>8.2f}ms | {mesure['p50_ms']:>8.2f}ms | {ratio:>5.2f}x{alerte}")
+        if alerte:
+            regressions.append(cas)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks des chemins critiques")
+    parser.add_argument('--quick', action='store_true', help="Tailles et répétitions réduites")
+    parser.add_argument('--coins', type=int, default=250, help="Taille du lot de cryptos")
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help="Préfixes de cas (rsi, batch250, collect...)")
+    parser.add_argument('--latency', type=float, default=0., help="Latence des fournisseurs factices (ms)")
+    parser.add_argument('--no-memory', action='store_true', help="Sans mesure tracemalloc")
+    parser.add_argument('--save', metavar='NOM', help="Sauvegarder comme référence benchmarks/baselines/NOM.json")
+    parser.add_argument('--compare', metavar='NOM', help="Comparer à une référence")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Régression tolérée sur p50 (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    # Cache et entrepôt partagés isolés du dépôt
+    dossier = tempfile.mkdtemp(prefix='bench_suite_')
+    os.environ.setdefault('MARKET_CACHE_DB', os.path.join(dossier, 'market_cache.db'))
+    os.environ.setdefault('OHLC_WAREHOUSE_DIR', os.path.join(dossier, 'ohlc'))
+    import ai_model_v3
+
+    longueurs = LONGUEURS_RAPIDES if args.quick else LONGUEURS
+    n_coins = min(args.coins, 25) if args.quick else args.coins
+    repetitions = max(1, args.repetitions // 2) if args.quick else args.repetitions
+
+    print("=" * 60)
+    print("⏱️  SUITE DE BENCHMARKS")
+    print("=" * 60)
+    print(f"{'cas':<36} | {'p50':>10} | {'p95':>10} | {'débit/s':>10} | {'pic':>9}")
+    print("-" * 88)
+
+    resultats = {}
+    with StubProviders(latency=args.latency / 1000) as stub:
+        groupes = (
+            cas_modele(ai_model_v3, longueurs, repetitions),
+            cas_lot(ai_model_v3, n_coins, 365, max(1, repetitions // 2)),
+            cas_collecteur(stub, repetitions * 2, 365),
+        )
+        for groupe in groupes:
+            for nom, fn, r, unites in groupe:
+                if args.only and not any(nom.startswith(prefixe) for prefixe in args.only):
+                    continue
+                try:
+                    mesure = mesurer(fn, r, unites, memoire=not args.no_memory)
+                except Exception as e:
+                    resultats[nom] = {'error': str(e)}
+                    print(f"{nom:<36} | ❌ {e}")
+                    continue
+                resultats[nom] = mesure
+                pic = f"{mesure['peak_kib'] / 1024:>7.1f}Mo" if mesure['peak_kib'] is not None else f"{'-':>9}"
+                print(f"{nom:<36} | {mesure['p50_ms']:>8.2f}ms | {mesure['p95_ms']:>8.2f}ms | "
+                      f"{mesure['throughput_per_s']:>10.1f} | {pic}")
+
+    rapport = {
+        'timestamp': datetime.now().isoformat(),
+        'quick': args.quick,
+        'backend': ai_model_v3.MODEL_BACKEND,
+        'environment': environnement(),
+        'results': resultats,
+    }
+
+    if args.save:
+        print(f"\n💾 Référence: {sauvegarder(args.save, rapport)}")
+
+    if args.compare:
+        regressions = comparer(args.compare, resultats, args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} régression(s) > {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Pas de régression")
+
+
+if __name__ == "__main__":
+    main()
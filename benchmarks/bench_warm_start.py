@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: refit complet quotidien vs réentraînement incrémental (warm start)
+Simule l'arrivée d'une bougie par jour sur une fenêtre glissante et compare
+le temps CPU d'entraînement cumulé et l'erreur de prédiction à 7 jours.
+
+Usage: python benchmarks/bench_warm_start.py [jours] [fenetre]
+"""
+
+import contextlib
+import io
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import generer_ohlc
+import ai_model_v3
+from model_store import ModelStore
+
+
+def simuler(ohlc, fenetre, jours, incremental):
+    """Retourne (temps CPU total, erreurs absolues relatives à 7 jours, modes)"""
+    store = ModelStore(directory=tempfile.mkdtemp(prefix='bench_models_')) if incremental else None
+    temps, erreurs, modes = 0., [], []
+
+    for jour in range(jours):
+        fin = len(ohlc) - jours - 7 + jour
+        window = ohlc[fin - fenetre:fin]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            X_train, y_train, X_predict, _, close_prices, _ = ai_model_v3.prepare_data(window)
+            start = time.process_time()
+            model, scaler, metrics = ai_model_v3.get_model(X_train, y_train, window, 'bench', store)
+            temps += time.process_time() - start
+
+        prediction = float(model.predict(scaler.transform(X_predict))[0])
+        reel = ohlc[fin - 1 + 7][4]
+        erreurs.append(abs(prediction - reel) / reel)
+        modes.append(metrics['training']['mode'])
+
+    return temps, np.array(erreurs), modes
+
+
+def main():
+    jours = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    fenetre = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    ohlc = generer_ohlc(fenetre + jours + 7, seed=3)
+
+    print(f"Fenêtre {fenetre} bougies, {jours} jours simulés")
+    t_full, e_full, _ = simuler(ohlc, fenetre, jours, incremental=False)
+    t_warm, e_warm, modes = simuler(ohlc, fenetre, jours, incremental=True)
+
+    print(f"{'mode':<14}{'CPU total':>12}{'par jour':>12}{'MAPE 7j':>10}")
+    print(f"{'refit complet':<14}{t_full:>11.2f}s{t_full / jours * 1000:>10.0f}ms{e_full.mean() * 100:>9.2f}%")
+    print(f"{'incrémental':<14}{t_warm:>11.2f}s{t_warm / jours * 1000:>10.0f}ms{e_warm.mean() * 100:>9.2f}%")
+    print(f"Refits complets: {modes.count('full')}/{jours} | gain CPU: x{t_full / t_warm:.1f}")
+    print(f"Compteurs: {ai_model_v3.training_stats}")
+
+
+if __name__ == "__main__":
+    main()
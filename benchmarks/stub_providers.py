@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serveur HTTP local imitant CoinCap, Kraken et CoinGecko (benchmarks hors réseau)
+Historiques synthétiques déterministes (generer_ohlc), un préfixe par fournisseur:
+    /coincap/assets/<id>/history, /coincap/assets/<id>
+    /kraken/OHLC, /kraken/Ticker
+    /coingecko/coins/<id>/ohlc, /coingecko/simple/price
+
+Latence simulée optionnelle (--latency ms) et pannes: tout chemin sous
+/fail/... répond 503.
+
+Usage:
+    python benchmarks/stub_providers.py --port 8766 --latency 50
+"""
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from synthetic import JOUR_MS, generer_ohlc
+
+# Historique servi: 10 ans jusqu'à aujourd'hui (UTC)
+HISTORIQUE_JOURS = 3650
+# Kraken ne renvoie que les 720 dernières bougies
+KRAKEN_MAX = 720
+
+
+class _Historiques:
+    """OHLC synthétique par crypto (graine dérivée de l'id), calculé une fois"""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def get(self, coin_id):
+        aujourdhui = int(time.time() * 1000) // JOUR_MS * JOUR_MS
+        with self._lock:
+            serie = self._series.get(coin_id)
+            if serie is None or serie[-1, 0] != aujourdhui:
+                serie = np.array(generer_ohlc(HISTORIQUE_JOURS, seed=zlib.crc32(coin_id.encode())))
+                serie[:, 0] = aujourdhui - np.arange(HISTORIQUE_JOURS)[::-1] * JOUR_MS
+                self._series[coin_id] = serie
+            return serie
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # En-têtes + corps en un seul envoi: sinon Nagle/ACK retardé ajoute ~40 ms par requête
+    disable_nagle_algorithm = True
+    wbufsize = 1 << 16
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parties = url.path.strip('/').split('/')
+
+        if self.server.latence:
+            time.sleep(self.server.latence)
+        self.server.compter(parties[0])
+
+        if parties[0] == 'fail':
+            return self.repondre(503, {'error': 'stub: panne simulée'})
+
+        try:
+            route = getattr(self, f"route_{parties[0]}", None)
+            body = route(parties[1:], query) if route else None
+        except (KeyError, ValueError, IndexError) as e:
+            return self.repondre(400, {'error': str(e)})
+
+        if body is None:
+            return self.repondre(404, {'error': 'not found'})
+        self.repondre(200, body)
+
+    def repondre(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # ------------------------------------------------------------- fournisseurs
+    def route_coincap(self, parties, query):
+        if len(parties) < 2 or parties[0] != 'assets':
+            return None
+        serie = self.server.historiques.get(parties[1])
+
+        if len(parties) == 3 and parties[2] == 'history':
+            debut, fin = int(query['start']), int(query['end'])
+            lignes = serie[(serie[:, 0] >= debut) & (serie[:, 0] <= fin)]
+            return {'data': [{'priceUsd': str(c), 'time': int(t)} for t, c in lignes[:, [0, 4]]]}
+
+        dernier = serie[-1]
+        return {'data': {'id': parties[1], 'priceUsd': str(dernier[4]),
+                         'changePercent24Hr': str((dernier[4] / serie[-2, 4] - 1) * 100),
+                         'marketCapUsd': str(dernier[4] * 1e7), 'volumeUsd24Hr': str(dernier[4] * 1e5)}}
+
+    def route_kraken(self, parties, query):
+        pair = query['pair']
+        serie = self.server.historiques.get(pair)
+
+        if parties == ['OHLC']:
+            lignes = serie[-KRAKEN_MAX:]
+            if 'since' in query:
+                lignes = lignes[lignes[:, 0] // 1000 > int(query['since'])]
+            bougies = [[int(t // 1000), str(o), str(h), str(l), str(c), str(c), '1000', 10]
+                       for t, o, h, l, c in lignes]
+            return {'error': [], 'result': {pair: bougies, 'last': int(serie[-1, 0] // 1000)}}
+
+        if parties == ['Ticker']:
+            dernier = serie[-1]
+            return {'error': [], 'result': {pair: {
+                'c': [str(dernier[4]), '1'], 'o': str(dernier[1]),
+                'h': [str(dernier[2]), str(dernier[2])], 'l': [str(dernier[3]), str(dernier[3])],
+                'v': ['1000', '1000'],
+            }}}
+        return None
+
+    def route_coingecko(self, parties, query):
+        if len(parties) == 3 and parties[0] == 'coins' and parties[2] == 'ohlc':
+            serie = self.server.historiques.get(parties[1])
+            jours = len(serie) if query['days'] == 'max' else int(query['days'])
+            return [[int(t), o, h, l, c] for t, o, h, l, c in serie[-jours:].tolist()]
+
+        if parties == ['simple', 'price']:
+            coin_id = query['ids']
+            serie = self.server.historiques.get(coin_id)
+            return {coin_id: {'usd': serie[-1, 4], 'usd_24h_change': (serie[-1, 4] / serie[-2, 4] - 1) * 100,
+                              'usd_market_cap': serie[-1, 4] * 1e7}}
+        return None
+
+
+class StubProviders:
+    """Serveur de fournisseurs factices dans un thread (context manager)
+
+        with StubProviders(latency=0.02) as stub:
+            collector.coincap_base = stub.url('coincap')
+    """
+
+    def __init__(self, port=0, latency=0.):
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self.server.daemon_threads = True
+        self.server.latence = latency
+        self.server.historiques = _Historiques()
+        self.server.requetes = {}
+        self._lock = threading.Lock()
+        self.server.compter = self._compter
+        self._thread = None
+
+    def _compter(self, prefixe):
+        with self._lock:
+            self.server.requetes[prefixe] = self.server.requetes.get(prefixe, 0) + 1
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def url(self, fournisseur, panne=False):
+        return f"http://127.0.0.1:{self.port}/{'fail/' if panne else ''}{fournisseur}"
+
+    def requetes(self):
+        with self._lock:
+            return dict(self.server.requetes)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='stub-providers', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fournisseurs factices CoinCap/Kraken/CoinGecko")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0., help="Latence simulée par requête (ms)")
+    args = parser.parse_args()
+
+    stub = StubProviders(args.port, args.latency / 1000)
+    print(f"🧪 Fournisseurs factices sur http://127.0.0.1:{stub.port} (coincap, kraken, coingecko)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Séries OHLC synthétiques reproductibles pour les benchmarks
+Marche aléatoire géométrique au format [timestamp, open, high, low, close]
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Les scripts du projet sont à la racine du dépôt
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RACINE not in sys.path:
+    sys.path.insert(0, RACINE)
+
+JOUR_MS = 24 * 60 * 60 * 1000
+
+
+def generer_ohlc(n_bougies, seed=0, prix_initial=100.0, volatilite=0.03, pas_ms=JOUR_MS):
+    """Retourne une liste de n_bougies bougies [timestamp, o, h, l, c]"""
+    rng = np.random.default_rng(seed)
+
+    close = prix_initial * np.exp(np.cumsum(rng.normal(0, volatilite, n_bougies)))
+    open_ = np.concatenate([[prix_initial], close[:-1]])
+    spread = np.abs(rng.normal(0, volatilite / 2, n_bougies))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    timestamps = 1_600_000_000_000 + np.arange(n_bougies, dtype=np.int64) * pas_ms
+
+    return np.column_stack([timestamps, open_, high, low, close]).tolist()
+
+
+def generer_univers(n_coins, n_bougies, seed=0):
+    """Dictionnaire coin_id → OHLC synthétique"""
+    return {
+        f"coin-{i}": generer_ohlc(n_bougies, seed=seed + i, prix_initial=10.0 ** (i % 5))
+        for i in range(n_coins)
+    }
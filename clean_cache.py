@@ -18,8 +18,12 @@ def nettoyer_tout():
     
     # Types de fichiers à supprimer
     patterns = [
-        "cache_*.json",           # Cache des données crypto individuelles
-        "data_*.json",            # Fichiers de données
+        "cache_*.json",           # Ancien cache des données crypto individuelles
+        "market_cache.db*",       # Cache des données de marché (SQLite)
+        "data_*.json",            # Anciens fichiers de données
+        "data_*.bin",             # Fichiers de données (format binaire)
+        "models/*.pkl",           # Modèles entraînés (store)
+        "models/*.cmdl",          # Artefacts compacts des modèles (store)
         "crypto_list_cache.json"  # Cache de la liste des 250 cryptos
     ]
     
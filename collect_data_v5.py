@@ -3,32 +3,155 @@
 """
 Collecte de données V5 - 100+ cryptos + Fallback intelligent
 CoinGecko → CoinCap (100+ mappings) → Kraken → CoinGecko fallback → Cache
+
+requests n'est importé qu'à la première requête réseau: une collecte servie
+par le cache ne le charge pas.
 """
 
-import requests
 import json
 import sys
 import time
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 
+from market_cache import cache_partage
+from ohlc_warehouse import entrepot_partage, JOUR_MS
+from single_flight import SingleFlight
+import payload_codec
+import instrumentation
+
+# Limites par fournisseur: (requêtes/seconde, burst)
+RATE_LIMITS = {
+    'CoinCap': (3.0, 5),
+    'Kraken': (1.0, 3),
+    'CoinGecko': (0.5, 2),
+}
+
+# Valeurs de 'days' acceptées par l'endpoint OHLC de CoinGecko
+COINGECKO_OHLC_DAYS = (1, 7, 14, 30, 90, 180, 365)
+
+class CryptoNonSupportee(Exception):
+    """La crypto n'est pas listée chez ce fournisseur (ne compte pas comme une panne)"""
+
+class TokenBucket:
+    """Token bucket partagé entre threads: rate jetons/s, capacité burst"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                attente = (1 - self.tokens) / self.rate
+            time.sleep(attente)
+
+class ProviderHealth:
+    """Santé d'un fournisseur: latence récente (EWMA), taux d'erreur et circuit breaker"""
+    
+    def __init__(self, failure_threshold=3, cooldown=60, window=20):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latency = None
+        self.results = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+    
+    def record_success(self, latency):
+        with self.lock:
+            self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+            self.results.append(True)
+            self.consecutive_failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self.lock:
+            self.results.append(False)
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+    
+    def error_rate(self):
+        if not self.results:
+            return 0.
+        return self.results.count(False) / len(self.results)
+    
+    def available(self):
+        """Circuit fermé, ou semi-ouvert après le cooldown (un essai est permis)"""
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown
+    
+    def score(self):
+        """Plus petit = meilleur: latence pénalisée par le taux d'erreur"""
+        latency = self.latency if self.latency is not None else 1.0
+        return latency * (1 + 4 * self.error_rate())
+    
+    def snapshot(self):
+        return {
+            'latency_ms': int(self.latency * 1000) if self.latency is not None else None,
+            'error_rate': round(self.error_rate(), 3),
+            'circuit_open': not self.available(),
+            'consecutive_failures': self.consecutive_failures,
+        }
+
 class DataCollectorV5:
-    def __init__(self, coin_id, days=30):
+    # ✅ Partagés par toutes les instances: connexions keep-alive + rate limits par fournisseur
+    _sessions = {}
+    _buckets = {}
+    _shared_lock = threading.Lock()
+    _http_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='http')
+    _source_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='source')
+    _health = {}
+    _refreshing = set()
+    _refresh_threads = []
+    # Collectes simultanées de la même crypto → un seul appel aux fournisseurs
+    _vol = SingleFlight()
+    
+    def __init__(self, coin_id, days=30, history_days=None):
         self.coin_id = coin_id.lower()
         self.days = days
+        # Historique transmis au modèle (OHLC_HISTORY_DAYS pour entraîner sur plus long)
+        self.history_days = max(days, history_days or int(os.environ.get('OHLC_HISTORY_DAYS', 0)))
         
         # APIs
         self.coingecko_base = "https://api.coingecko.com/api/v3"
         self.coincap_base = "https://api.coincap.io/v2"
         self.kraken_base = "https://api.kraken.com/0/public"
         
-        # Cache
-        self.cache_file = f"cache_{self.coin_id}.json"
+        # Cache (mémoire + SQLite partagé)
+        self.cache = cache_partage()
+        self.cache_key = f"{self.coin_id}:{self.history_days}"
         self.cache_duration = 5 * 60  # 5 minutes
-        
-        # Rate limiting
-        self.min_delay = 1.0
-        self.last_request_time = 0
+        # Au-delà du TTL, l'entrée est encore servie tout de suite pendant
+        # qu'un rafraîchissement tourne en arrière-plan (stale-while-revalidate)
+        self.stale_duration = int(os.environ.get('MARKET_CACHE_STALE', 60 * 60))  # 1 heure
+        
+        # Requêtes "hedgées": source suivante lancée si la précédente dépasse ce délai
+        # (COLLECT_HEDGE_DELAY=0 pour désactiver → fallback strictement séquentiel)
+        hedge_delay = float(os.environ.get('COLLECT_HEDGE_DELAY', 3.0))
+        self.hedge_delay = hedge_delay if hedge_delay > 0 else None
+        # Délai de lecture d'une tentative hedgée: une requête perdante en vol
+        # ne peut pas être interrompue, elle rend son thread au plus tard après ce délai
+        self.hedge_timeout = float(os.environ.get('COLLECT_HEDGE_TIMEOUT', 5.0))
+        self._annulations = {}
+        
+        # Entrepôt d'historiques: seules les bougies après `depuis` sont téléchargées
+        self.warehouse = entrepot_partage()
+        self.depuis = None
         
         # ✅ TOP 100+ CRYPTOS - Mapping CoinGecko → CoinCap
         self.coincap_mapping = {
@@ -85,73 +208,96 @@ class DataCollectorV5:
             'render-token': 'RNDRXUSD',
         }
     
-    def cache_valide(self):
-        """Vérifie si le cache est valide"""
-        if not os.path.exists(self.cache_file):
-            return False
-        
-        try:
-            with open(self.cache_file, 'r') as f:
-                cache = json.load(f)
-            
-            cache_time = datetime.fromisoformat(cache.get('timestamp', ''))
-            age = (datetime.now() - cache_time).total_seconds()
-            
-            if age < self.cache_duration:
-                print(f"✅ Cache valide ({int(age)}s)")
-                return True
-        except:
-            pass
-        
-        return False
-    
-    def charger_cache(self):
-        """Charge les données du cache"""
-        try:
-            with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        except:
-            return None
+    @classmethod
+    def _session(cls, source):
+        """Session HTTP persistante (keep-alive) par fournisseur"""
+        with cls._shared_lock:
+            session = cls._sessions.get(source)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                session = requests.Session()
+                session.headers['User-Agent'] = 'Mozilla/5.0'
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=16)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                cls._sessions[source] = session
+            return session
     
-    def _respecter_rate_limit(self):
-        """Respecte le rate limit"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_delay:
-            time.sleep(self.min_delay - elapsed)
-        self.last_request_time = time.time()
+    @classmethod
+    def _respecter_rate_limit(cls, source):
+        """Respecte le rate limit du fournisseur (token bucket partagé)"""
+        with cls._shared_lock:
+            bucket = cls._buckets.get(source)
+            if bucket is None:
+                rate, burst = RATE_LIMITS.get(source, (1.0, 1))
+                bucket = cls._buckets[source] = TokenBucket(rate, burst)
+        bucket.acquire()
     
     def _faire_requete(self, url, params=None, max_tentatives=2, source="API"):
-        """Fait une requête avec retry"""
+        """Fait une requête avec retry
+        
+        Source annulée (collecte hedgée perdue): plus de nouvelle tentative et
+        corps de réponse abandonné entre deux blocs (connexion fermée). Un appel
+        HTTP en attente n'est pas interrompu: il est borné par hedge_timeout.
+        """
+        annulation = self._annulations.get(source)
+        lecture = self.hedge_timeout if self.hedge_delay is not None else 10
+        
         for tentative in range(max_tentatives):
+            if annulation is not None and annulation.is_set():
+                raise Exception(f"{source} annulé")
+            
             try:
-                self._respecter_rate_limit()
+                self._respecter_rate_limit(source)
                 
-                response = requests.get(
-                    url,
-                    params=params,
-                    timeout=10,
-                    headers={'User-Agent': 'Mozilla/5.0'}
-                )
+                # Latence mesurée hors attente du rate limit
+                debut = time.perf_counter()
+                try:
+                    response = self._session(source).get(url, params=params, timeout=(3.05, lecture), stream=True)
+                except Exception:
+                    instrumentation.observe('provider_request_seconds', time.perf_counter() - debut,
+                                            provider=source, outcome='network_error')
+                    raise
+                instrumentation.observe('provider_request_seconds', time.perf_counter() - debut,
+                                        provider=source, outcome=str(response.status_code))
                 
-                if response.status_code == 429:
-                    raise Exception("Rate limit")
-                
-                if response.status_code == 451:
-                    raise Exception("Geo-blocked")
-                
-                if response.status_code != 200:
-                    raise Exception(f"HTTP {response.status_code}")
-                
-                return response.json()
+                try:
+                    if response.status_code == 429:
+                        raise Exception("Rate limit")
+                    
+                    if response.status_code == 451:
+                        raise Exception("Geo-blocked")
+                    
+                    if response.status_code != 200:
+                        raise Exception(f"HTTP {response.status_code}")
+                    
+                    return json.loads(self._lire_corps(response, annulation, source))
+                finally:
+                    response.close()
                 
             except Exception as e:
                 if tentative < max_tentatives - 1:
-                    time.sleep(2)
+                    if annulation is not None:
+                        annulation.wait(2)
+                    else:
+                        time.sleep(2)
                 else:
                     raise e
         
         raise Exception(f"{source} indisponible")
     
+    @staticmethod
+    def _lire_corps(response, annulation, source):
+        """Corps de la réponse par blocs, abandonné dès que la source est annulée"""
+        blocs = []
+        for bloc in response.iter_content(64 * 1024):
+            if annulation is not None and annulation.is_set():
+                raise Exception(f"{source} annulé")
+            blocs.append(bloc)
+        return b''.join(blocs)
+    
     # =========================================================================
     # COINCAP API
     # =========================================================================
@@ -161,12 +307,12 @@ class DataCollectorV5:
         
         coincap_id = self.coincap_mapping.get(self.coin_id)
         if not coincap_id:
-            raise Exception(f"Non disponible sur CoinCap")
+            raise CryptoNonSupportee("Non disponible sur CoinCap")
         
         print(f"   ID: {coincap_id}")
         
         end_time = int(time.time() * 1000)
-        start_time = end_time - (self.days * 24 * 60 * 60 * 1000)
+        start_time = self.depuis if self.depuis is not None else end_time - self.history_days * JOUR_MS
         
         url = f"{self.coincap_base}/assets/{coincap_id}/history"
         params = {'interval': 'd1', 'start': start_time, 'end': end_time}
@@ -192,7 +338,7 @@ class DataCollectorV5:
         
         coincap_id = self.coincap_mapping.get(self.coin_id)
         if not coincap_id:
-            raise Exception("Non disponible")
+            raise CryptoNonSupportee("Non disponible")
         
         url = f"{self.coincap_base}/assets/{coincap_id}"
         data = self._faire_requete(url, source="CoinCap")
@@ -222,12 +368,14 @@ class DataCollectorV5:
         
         kraken_symbol = self.kraken_mapping.get(self.coin_id)
         if not kraken_symbol:
-            raise Exception(f"Non disponible sur Kraken")
+            raise CryptoNonSupportee("Non disponible sur Kraken")
         
         print(f"   Symbole: {kraken_symbol}")
         
         url = f"{self.kraken_base}/OHLC"
         params = {'pair': kraken_symbol, 'interval': 1440}
+        if self.depuis is not None:
+            params['since'] = self.depuis // 1000 - 1
         
         data = self._faire_requete(url, params, source="Kraken")
         
@@ -240,7 +388,7 @@ class DataCollectorV5:
         pair_data = list(data['result'].values())[0]
         
         ohlc_formatted = []
-        for candle in pair_data[-self.days:]:
+        for candle in pair_data[-self.history_days:]:
             ohlc_formatted.append([
                 int(candle[0]) * 1000,
                 float(candle[1]), float(candle[2]),
@@ -256,7 +404,7 @@ class DataCollectorV5:
         
         kraken_symbol = self.kraken_mapping.get(self.coin_id)
         if not kraken_symbol:
-            raise Exception("Non disponible")
+            raise CryptoNonSupportee("Non disponible")
         
         url = f"{self.kraken_base}/Ticker"
         params = {'pair': kraken_symbol}
@@ -292,16 +440,31 @@ class DataCollectorV5:
         print(f"📥 [COINGECKO] Téléchargement OHLC...")
         
         url = f"{self.coingecko_base}/coins/{self.coin_id}/ohlc"
-        params = {"vs_currency": "usd", "days": self.days}
+        jours = self._jours_coingecko()
+        params = {"vs_currency": "usd", "days": jours}
         
         data = self._faire_requete(url, params, max_tentatives=1, source="CoinGecko")
         
-        if not data or len(data) < 7:
+        # La fenêtre part de maintenant - jours: le premier jour UTC n'est que
+        # partiellement couvert (bougies 30min/4h) → open/high/low faux, on l'écarte
+        if data and jours != 'max':
+            premier_jour_complet = (int(time.time() * 1000) - jours * JOUR_MS) // JOUR_MS * JOUR_MS + JOUR_MS
+            data = [candle for candle in data if candle[0] >= premier_jour_complet]
+        
+        if not data or len(data) < (1 if self.depuis is not None else 7):
             raise Exception("Pas assez de données")
         
         print(f"✅ {len(data)} jours")
         return data
     
+    def _jours_coingecko(self):
+        """Plus petite fenêtre CoinGecko couvrant les bougies manquantes"""
+        if self.depuis is None:
+            jours = self.history_days
+        else:
+            jours = (int(time.time() * 1000) - self.depuis) // JOUR_MS + 1
+        return next((d for d in COINGECKO_OHLC_DAYS if d >= jours), 'max')
+    
     def get_prix_actuel_coingecko(self):
         """Prix actuel depuis CoinGecko (fallback)"""
         print(f"💰 [COINGECKO] Prix actuel...")
@@ -317,7 +480,7 @@ class DataCollectorV5:
         data = self._faire_requete(url, params, max_tentatives=1, source="CoinGecko")
         
         if self.coin_id not in data:
-            raise Exception("Crypto introuvable")
+            raise CryptoNonSupportee("Crypto introuvable")
         
         coin_data = data[self.coin_id]
         
@@ -328,83 +491,301 @@ class DataCollectorV5:
             'source': 'coingecko'
         }
     
+    # =========================================================================
+    # SANTÉ DES FOURNISSEURS + REQUÊTES HEDGÉES
+    # =========================================================================
+    @classmethod
+    def _sante(cls, source):
+        with cls._shared_lock:
+            health = cls._health.get(source)
+            if health is None:
+                health = cls._health[source] = ProviderHealth()
+            return health
+    
+    @classmethod
+    def etat_fournisseurs(cls):
+        """Latence, taux d'erreur et état du circuit de chaque fournisseur"""
+        return {source: health.snapshot() for source, health in cls._health.items()}
+    
+    def _ordonner_sources(self, sources):
+        """Sources disponibles triées par score, circuits ouverts en dernier recours"""
+        ordre = {name: i for i, (name, _, _) in enumerate(sources)}
+        disponibles = [s for s in sources if self._sante(s[0]).available()]
+        ouvertes = [s for s in sources if not self._sante(s[0]).available()]
+        
+        disponibles.sort(key=lambda s: (self._sante(s[0]).score(), ordre[s[0]]))
+        
+        for name, _, _ in ouvertes:
+            print(f"⛔ {name}: circuit ouvert, relégué en dernier")
+        
+        return disponibles + ouvertes
+    
+    def _tenter_source(self, source_name, get_ohlc, get_price):
+        """Une tentative complète sur un fournisseur (OHLC + prix en parallèle)"""
+        start = time.monotonic()
+        print(f"🎯 {source_name}...\n")
+        
+        try:
+            ohlc_future = self._http_pool.submit(get_ohlc)
+            price_future = self._http_pool.submit(get_price)
+            ohlc_data = ohlc_future.result()
+            market_data = price_future.result()
+        except CryptoNonSupportee:
+            raise
+        except Exception:
+            if not self._annulations[source_name].is_set():
+                self._sante(source_name).record_failure()
+            raise
+        
+        self._sante(source_name).record_success(time.monotonic() - start)
+        return ohlc_data, market_data
+    
+    def _collecter_hedge(self, sources):
+        """Lance les sources en cascade: la suivante démarre si la précédente échoue
+        ou dépasse hedge_delay. La première réponse valide gagne, les autres sont annulées.
+        
+        Annuler n'interrompt pas un appel HTTP déjà en vol: la perdante cesse ses
+        tentatives et abandonne le corps de réponse, mais une attente réseau
+        garde son thread (_http_pool/_source_pool) jusqu'à hedge_timeout.
+        """
+        en_cours = {}
+        suivantes = list(sources)
+        
+        def lancer():
+            source_name, get_ohlc, get_price = suivantes.pop(0)
+            self._annulations[source_name] = threading.Event()
+            future = self._source_pool.submit(self._tenter_source, source_name, get_ohlc, get_price)
+            en_cours[future] = source_name
+        
+        lancer()
+        
+        try:
+            while en_cours:
+                timeout = self.hedge_delay if suivantes else None
+                termines, _ = wait(list(en_cours), timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                if not termines:
+                    print(f"⏱️  Pas de réponse après {self.hedge_delay}s, lancement de {suivantes[0][0]} en parallèle\n")
+                    lancer()
+                    continue
+                
+                for future in termines:
+                    source_name = en_cours.pop(future)
+                    try:
+                        ohlc_data, market_data = future.result()
+                    except Exception as e:
+                        print(f"⚠️  {source_name}: {str(e)}\n")
+                        if suivantes:
+                            lancer()
+                        continue
+                    
+                    print(f"\n✅ {source_name} OK!\n")
+                    return source_name, ohlc_data, market_data
+        finally:
+            # Annuler les requêtes perdantes encore en vol
+            for source_name in en_cours.values():
+                self._annulations[source_name].set()
+        
+        return None
+    
+    def _sauvegarder(self, source_name, ohlc_data, market_data):
+        """Fusionne les bougies dans l'entrepôt et met à jour le cache"""
+        ajoutees = self.warehouse.fusionner(self.coin_id, ohlc_data, depuis=self.depuis)
+        ohlc_data = self.warehouse.historique(self.coin_id, days=self.history_days)
+        print(f"🗄️  Entrepôt: +{ajoutees} bougie(s), {len(ohlc_data)} servies")
+        
+        data_output = {
+            "coin_id": self.coin_id,
+            "ohlc": ohlc_data,
+            "market_data": market_data,
+            "timestamp": datetime.now().isoformat(),
+            "total_days": len(ohlc_data),
+            "source": source_name.lower()
+        }
+        
+        self.cache.put(self.cache_key, data_output)
+        
+        print(f"💾 Sauvegardé")
+        print(f"📊 {source_name.upper()}")
+        print(f"💰 ${market_data['current_price']:,.4f}\n")
+        
+        return data_output
+    
     # =========================================================================
     # ✅ LOGIQUE PRINCIPALE avec FALLBACK INTELLIGENT
     # =========================================================================
     def collecter_donnees(self):
-        """Collecte avec fallbacks optimisés"""
+        """Collecte avec cache (stale-while-revalidate) et fallbacks optimisés
+        
+        Les appels concurrents pour la même crypto partagent une seule collecte.
+        """
+        with instrumentation.stage('collect'):
+            return self._vol.do(self.cache_key, self._collecter)
+    
+    def _collecter(self):
         print(f"\n{'='*60}")
         print(f"🔄 COLLECTE V5 - {self.coin_id.upper()}")
         print(f"{'='*60}\n")
         
-        # 1. Cache valide?
-        if self.cache_valide():
-            cache = self.charger_cache()
-            if cache and 'ohlc' in cache:
-                print(f"✅ Cache utilisé\n")
-                return cache
+        # 1. Cache: une seule lecture (mémoire, sinon SQLite)
+        cache, age = self.cache.get(self.cache_key)
         
-        # 2. Ordre des sources (optimisé)
-        sources = [
-            ('CoinCap', self.telecharger_ohlc_coincap, self.get_prix_actuel_coincap),
-            ('Kraken', self.telecharger_ohlc_kraken, self.get_prix_actuel_kraken),
-            ('CoinGecko', self.telecharger_ohlc_coingecko, self.get_prix_actuel_coingecko),
-        ]
+        if cache and 'ohlc' in cache:
+            if age < self.cache_duration:
+                print(f"✅ Cache valide ({int(age)}s)\n")
+                self.cache.record_served(age, fresh=True)
+                instrumentation.inc('collect_total', outcome='fresh')
+                return cache
+            
+            if age < self.stale_duration:
+                print(f"♻️  Cache expiré servi ({int(age)}s), rafraîchissement en arrière-plan\n")
+                self.cache.record_served(age, fresh=False)
+                self._rafraichir_en_arriere_plan()
+                instrumentation.inc('collect_total', outcome='stale')
+                return cache
         
-        for source_name, get_ohlc, get_price in sources:
-            try:
-                print(f"🎯 {source_name}...\n")
-                ohlc_data = get_ohlc()
-                market_data = get_price()
-                
-                print(f"\n✅ {source_name} OK!\n")
-                
-                # Sauvegarder
-                data_output = {
-                    "coin_id": self.coin_id,
-                    "ohlc": ohlc_data,
-                    "market_data": market_data,
-                    "timestamp": datetime.now().isoformat(),
-                    "total_days": len(ohlc_data),
-                    "source": source_name.lower()
-                }
-                
-                with open(self.cache_file, 'w') as f:
-                    json.dump(data_output, f, indent=2)
-                
-                filename = f"data_{self.coin_id}.json"
-                with open(filename, 'w') as f:
-                    json.dump(data_output, f, indent=2)
-                
-                print(f"💾 Sauvegardé")
-                print(f"📊 {source_name.upper()}")
-                print(f"💰 ${market_data['current_price']:,.4f}\n")
-                
-                return data_output
-                
-            except Exception as e:
-                print(f"⚠️  {source_name}: {str(e)}\n")
+        # 2. Téléchargement synchrone
+        try:
+            data = self._rafraichir()
+            instrumentation.inc('collect_total', outcome='refresh')
+            return data
+        except Exception:
+            pass
         
         # 3. Cache expiré en dernier recours
-        print(f"📦 Cache expiré...\n")
-        cache = self.charger_cache()
         if cache and 'ohlc' in cache:
-            print(f"⚠️  Cache expiré utilisé\n")
+            print(f"⚠️  Cache expiré utilisé ({int(age)}s)\n")
+            self.cache.record_served(age, fresh=False)
+            instrumentation.inc('collect_total', outcome='expired')
             return cache
         
+        instrumentation.inc('collect_total', outcome='failed')
         raise Exception("Toutes les sources ont échoué")
+    
+    def _rafraichir(self):
+        """Interroge les fournisseurs et met à jour le cache"""
+        return self._vol.do(('refresh', self.cache_key), self._interroger_sources)
+    
+    def _debut_incremental(self):
+        """Dernière bougie stockée (re-téléchargée: elle peut encore évoluer),
+        ou None → fenêtre complète (entrepôt vide, trop ancien ou trop court)"""
+        premier, dernier = self.warehouse.etendue(self.coin_id)
+        if dernier is None:
+            return None
+        
+        debut_fenetre = int(time.time() * 1000) - self.history_days * JOUR_MS
+        if dernier < debut_fenetre:
+            return None
+        if premier > debut_fenetre + JOUR_MS and self.warehouse.premier_backfill(self.coin_id, self.history_days):
+            print(f"🗄️  Historique stocké plus court que {self.history_days} jours: rattrapage complet\n")
+            return None
+        return dernier
+    
+    def _interroger_sources(self):
+        self.depuis = self._debut_incremental()
+        if self.depuis is not None:
+            print(f"🗄️  Téléchargement incrémental depuis {datetime.utcfromtimestamp(self.depuis / 1000):%Y-%m-%d}\n")
+        
+        # Ordre des sources (dynamique selon la santé des fournisseurs)
+        sources = self._ordonner_sources([
+            ('CoinCap', self.telecharger_ohlc_coincap, self.get_prix_actuel_coincap),
+            ('Kraken', self.telecharger_ohlc_kraken, self.get_prix_actuel_kraken),
+            ('CoinGecko', self.telecharger_ohlc_coingecko, self.get_prix_actuel_coingecko),
+        ])
+        
+        resultat = self._collecter_hedge(sources)
+        if resultat is None:
+            raise Exception("Toutes les sources ont échoué")
+        
+        source_name, ohlc_data, market_data = resultat
+        self.cache.record_refresh()
+        return self._sauvegarder(source_name, ohlc_data, market_data)
+    
+    def _rafraichir_en_arriere_plan(self):
+        """Un seul rafraîchissement en vol par clé de cache"""
+        with self._shared_lock:
+            if self.cache_key in self._refreshing:
+                return
+            self._refreshing.add(self.cache_key)
+        
+        def tache():
+            try:
+                self._rafraichir()
+            except Exception as e:
+                print(f"⚠️  Rafraîchissement {self.coin_id}: {str(e)}")
+            finally:
+                with self._shared_lock:
+                    self._refreshing.discard(self.cache_key)
+        
+        thread = threading.Thread(target=tache, name=f"refresh-{self.coin_id}", daemon=True)
+        with self._shared_lock:
+            self._refresh_threads.append(thread)
+        thread.start()
+    
+    def ecrire_fichier_donnees(self, data):
+        """Écrit data_<coin>.bin (format binaire compact) pour ai_model_v3.py <coin_id>
+        
+        Écriture atomique: un lecteur concurrent ne voit jamais un fichier partiel.
+        """
+        filename = f"data_{self.coin_id}.bin"
+        tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(payload_codec.encoder(data))
+        os.replace(tmp, filename)
+        return filename
+    
+    @classmethod
+    def attendre_rafraichissements(cls, timeout=None):
+        """Attend les rafraîchissements en arrière-plan (mode CLI avant de quitter)"""
+        with cls._shared_lock:
+            threads, cls._refresh_threads = cls._refresh_threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+def collecter_plusieurs(coin_ids, days=30, max_workers=8, history_days=None):
+    """Collecte concurrente de plusieurs cryptos: coin_id → données (ou Exception)
+    
+    Les rate limits par fournisseur restent respectés grâce aux token buckets partagés.
+    """
+    def collecter_un(coin_id):
+        return DataCollectorV5(coin_id, days=days, history_days=history_days).collecter_donnees()
+    
+    resultats = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(collecter_un, coin_id): coin_id for coin_id in coin_ids}
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                resultats[coin_id] = future.result()
+            except Exception as e:
+                resultats[coin_id] = e
+    return resultats
 
 def main():
     if len(sys.argv) < 2:
-        print("❌ Usage: python collect_data_v5.py <coin_id>")
+        print("❌ Usage: python collect_data_v5.py <coin_id> [--emit]")
+        print("   --emit: écrit la collecte (format binaire) sur stdout,")
+        print("           ex: python collect_data_v5.py bitcoin --emit | python ai_model_v3.py -")
         sys.exit(1)
     
     coin_id = sys.argv[1]
+    emit = '--emit' in sys.argv[2:]
+    
+    # En mode --emit, stdout est réservé aux données binaires
+    sortie = sys.stdout.buffer
+    if emit:
+        sys.stdout = sys.stderr
     
     try:
         collector = DataCollectorV5(coin_id, days=30)
         result = collector.collecter_donnees()
         
+        if emit:
+            sortie.write(payload_codec.encoder(result))
+            sortie.flush()
+        else:
+            print(f"💾 {collector.ecrire_fichier_donnees(result)}")
+        
         print("="*60)
         print("✅ SUCCÈS")
         print("="*60)
@@ -413,6 +794,7 @@ def main():
         print(f"Prix: ${result['market_data']['current_price']:,.4f}")
         print()
         
+        DataCollectorV5.attendre_rafraichissements()
         sys.exit(0)
         
     except Exception as e:
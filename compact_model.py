@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Artefacts de modèle compacts (scaler + ensemble d'arbres), sans scikit-learn
+Un modèle ajusté (GradientBoostingRegressor ou HistGradientBoostingRegressor
++ RobustScaler) est exporté en tableaux plats: pour chaque arbre, feature,
+seuil, enfants gauche/droit, valeur et direction des NaN de chaque noeud
+(arbres complétés à la même taille), plus center/scale du scaler.
+
+    b'CMDL' | version (uint8) | 3 octets vides | taille du JSON (uint64)
+    JSON (méta, métriques, offset/type/forme de chaque tableau) | tableaux alignés sur 8 octets
+
+Le fichier est lu par np.memmap (pages partagées entre workers, sans
+parsing ni copie). Le prédicteur numpy parcourt tous les arbres en même
+temps, niveau par niveau, et reproduit les prédictions de scikit-learn à
+l'identique: X en float32 pour les seuils de GradientBoostingRegressor,
+feuilles additionnées dans l'ordre des arbres à partir de la valeur initiale.
+
+Fait pour l'inférence d'une ou quelques lignes: au-delà de COMPACT_MAX_ROWS,
+predict délègue au modèle scikit-learn d'origine s'il est disponible
+(fallback), le parcours numpy étant plusieurs fois plus lent sur de gros lots.
+L'export lit des attributs privés de scikit-learn (_raw_predict_init,
+_predictors, _baseline_prediction): seules les versions validées par
+benchmarks/bench_compact_model.py sont acceptées.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'CMDL'
+VERSION = 1
+_HEADER = struct.Struct('<4sB3xQ')
+
+# Tableaux d'un ensemble: (n_trees, n_nodes), noeuds absents et feuilles bouclent sur eux-mêmes
+TREE_ARRAYS = {
+    'feature': '<i4',
+    'threshold': '<f8',
+    'left': '<i4',
+    'right': '<i4',
+    'value': '<f8',
+    'missing_left': '|u1',
+}
+SUPPORTED = ('GradientBoostingRegressor', 'HistGradientBoostingRegressor')
+# Versions (majeure.mineure) de scikit-learn dont la parité exacte est vérifiée
+SKLEARN_VERSIONS = ('1.5',)
+# Lignes au-delà desquelles scikit-learn est plus rapide (mesuré: ~16 pour gbr)
+COMPACT_MAX_ROWS = int(os.environ.get('COMPACT_MAX_ROWS', 16))
+
+
+class CompactScaler:
+    """RobustScaler.transform: (X - center) / scale"""
+
+    def __init__(self, center, scale):
+        self.center = center
+        self.scale = scale
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.center
+        X /= self.scale
+        return X
+
+
+class CompactEnsemble:
+    """Ensemble d'arbres en tableaux plats: predict(X) comme l'estimateur d'origine"""
+
+    def __init__(self, arrays, baseline, shrinkage, depth, float32_input, estimator_name):
+        for name in TREE_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.baseline = baseline
+        self.shrinkage = shrinkage
+        self.depth = depth
+        self.float32_input = float32_input
+        self.estimator_name = estimator_name
+        # Chargeur du modèle scikit-learn équivalent (gros lots), renseigné par le store
+        self.fallback = None
+        self._fallback_model = None
+        self.n_trees, n_nodes = self.feature.shape
+        # Indices plats: noeud n de l'arbre t → t * n_nodes + n (np.take sur des vues 1D)
+        self._offsets = np.arange(self.n_trees, dtype=np.intp) * n_nodes
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) > COMPACT_MAX_ROWS and self.fallback is not None:
+            if self._fallback_model is None:
+                self._fallback_model = self.fallback()
+            if self._fallback_model is not None:
+                return self._fallback_model.predict(X)
+        if self.float32_input:
+            # Les arbres de scikit-learn comparent X converti en float32
+            X = X.astype(np.float32).astype(np.float64)
+        n_samples, n_features = X.shape
+        X_flat = X.ravel()
+
+        feature, threshold = self.feature.ravel(), self.threshold.ravel()
+        left, right, missing = self.left.ravel(), self.right.ravel(), self.missing_left.ravel()
+        rows = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self._offsets, (n_samples, self.n_trees)).copy()
+        for _ in range(self.depth):
+            x = X_flat.take(rows + feature.take(node))
+            go_left = x <= threshold.take(node)
+            go_left |= np.isnan(x) & missing.take(node).astype(bool)
+            node = np.where(go_left, left.take(node), right.take(node)) + self._offsets
+
+        # Somme séquentielle dans l'ordre des arbres (même ordre d'arrondi que scikit-learn)
+        raw = np.empty((n_samples, self.n_trees + 1))
+        raw[:, 0] = self.baseline
+        np.multiply(self.value.ravel().take(node), self.shrinkage, out=raw[:, 1:])
+        return np.cumsum(raw, axis=1)[:, -1]
+
+
+def _pad(trees):
+    """Liste de dicts de tableaux par arbre → tableaux (n_trees, n_nodes) complétés"""
+    n_nodes = max(len(tree['feature']) for tree in trees)
+    arrays = {}
+    for name, dtype in TREE_ARRAYS.items():
+        arrays[name] = np.zeros((len(trees), n_nodes), dtype=dtype)
+    arrays['left'][:] = arrays['right'][:] = np.arange(n_nodes)
+    for i, tree in enumerate(trees):
+        for name in TREE_ARRAYS:
+            arrays[name][i, :len(tree[name])] = tree[name]
+    return arrays
+
+
+def _depth(left, right):
+    """Profondeur maximale des arbres (feuilles bouclant sur elles-mêmes)"""
+    depth = 0
+    for t in range(left.shape[0]):
+        pile = [(0, 0)]
+        while pile:
+            node, d = pile.pop()
+            depth = max(depth, d)
+            pile.extend((child, d + 1) for child in (left[t, node], right[t, node]) if child != node)
+    return depth
+
+
+def _gbr_trees(model):
+    trees = []
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        index = np.arange(tree.node_count)
+        trees.append({
+            'feature': np.where(leaf, 0, tree.feature),
+            'threshold': np.where(leaf, 0., tree.threshold),
+            'left': np.where(leaf, index, tree.children_left),
+            'right': np.where(leaf, index, tree.children_right),
+            'value': tree.value[:, 0, 0],
+            'missing_left': getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8)),
+        })
+    return trees
+
+
+def _hist_trees(model):
+    trees = []
+    for predictors in model._predictors:
+        nodes = predictors[0].nodes
+        if nodes['is_categorical'].any():
+            raise Exception("Artefact compact: splits catégoriels non supportés")
+        leaf = nodes['is_leaf'].astype(bool)
+        index = np.arange(len(nodes))
+        trees.append({
+            'feature': np.where(leaf, 0, nodes['feature_idx']),
+            'threshold': np.where(leaf, 0., nodes['num_threshold']),
+            'left': np.where(leaf, index, nodes['left']),
+            'right': np.where(leaf, index, nodes['right']),
+            'value': nodes['value'],
+            'missing_left': nodes['missing_go_to_left'],
+        })
+    return trees
+
+
+def supports(model):
+    """Estimateur exportable; exception si la version de scikit-learn n'est pas validée"""
+    if type(model).__name__ not in SUPPORTED:
+        return False
+    import sklearn
+    version = '.'.join(sklearn.__version__.split('.')[:2])
+    if version not in SKLEARN_VERSIONS:
+        raise Exception(f"Artefact compact: scikit-learn {sklearn.__version__} non validé "
+                        f"(versions: {', '.join(SKLEARN_VERSIONS)}), relancer benchmarks/bench_compact_model.py")
+    return True
+
+
+def export(model, scaler, metrics):
+    """(model, scaler, metrics) scikit-learn → (méta, tableaux) du format compact"""
+    estimator_name = type(model).__name__
+    if not supports(model):
+        raise Exception(f"Artefact compact: estimateur non supporté ({estimator_name})")
+    n_features = model.n_features_in_
+
+    if estimator_name == 'GradientBoostingRegressor':
+        if model.estimators_.shape[1] != 1:
+            raise Exception("Artefact compact: une seule sortie supportée")
+        trees = _gbr_trees(model)
+        baseline = float(model._raw_predict_init(np.zeros((1, n_features)))[0, 0])
+        shrinkage, float32_input = float(model.learning_rate), True
+    elif estimator_name == 'HistGradientBoostingRegressor':
+        trees = _hist_trees(model)
+        baseline = float(np.ravel(model._baseline_prediction)[0])
+        shrinkage, float32_input = 1., False
+    else:
+        raise Exception(f"Artefact compact: estimateur non supporté ({estimator_name})")
+
+    arrays = _pad(trees)
+    center = scaler.center_ if scaler.center_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    arrays['center'] = np.asarray(center, dtype='<f8')
+    arrays['scale'] = np.asarray(scale, dtype='<f8')
+
+    meta = {
+        'estimator': estimator_name,
+        'n_features': int(n_features),
+        'baseline': baseline,
+        'shrinkage': shrinkage,
+        'float32_input': float32_input,
+        'depth': _depth(arrays['left'], arrays['right']),
+        'metrics': metrics,
+    }
+    return meta, arrays
+
+
+def encode(meta, arrays):
+    """Fichier compact (bytes): en-tête, JSON puis tableaux alignés"""
+    meta = dict(meta, arrays={})
+    blocs, offset = [], 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        meta['arrays'][name] = [offset, array.dtype.str, list(array.shape)]
+        data = array.tobytes()
+        blocs.append(data + b'\0' * (-len(data) % 8))
+        offset += len(blocs[-1])
+
+    texte = json.dumps(meta, default=float).encode()
+    texte += b' ' * (-(_HEADER.size + len(texte)) % 8)
+    return _HEADER.pack(MAGIC, VERSION, len(texte)) + texte + b''.join(blocs)
+
+
+def decode(buffer):
+    """(model, scaler, metrics) sur un buffer (bytes, mmap...), tableaux sans copie"""
+    magic, version, taille = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise Exception("Artefact de modèle compact invalide")
+    if version != VERSION:
+        raise Exception(f"Version d'artefact compact non supportée ({version})")
+
+    meta = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + taille]))
+    debut = _HEADER.size + taille
+    arrays = {
+        name: np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape)), offset=debut + offset).reshape(shape)
+        for name, (offset, dtype, shape) in meta['arrays'].items()
+    }
+
+    model = CompactEnsemble(arrays, meta['baseline'], meta['shrinkage'], meta['depth'],
+                            meta['float32_input'], meta['estimator'])
+    return model, CompactScaler(arrays['center'], arrays['scale']), meta['metrics']
+
+
+def save(path, model, scaler, metrics):
+    """Exporte et écrit l'artefact (écriture atomique)"""
+    data = encode(*export(model, scaler, metrics))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def load(path):
+    """Artefact mappé en mémoire (lecture seule, pages partagées entre processus)"""
+    return decode(np.memmap(path, dtype=np.uint8, mode='r'))
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Moteur de features incrémental
+Porte l'état des indicateurs (EMA, moyennes de Wilder, fenêtres glissantes)
+pour produire les 20 features de prepare_data en O(1) par nouvelle bougie.
+
+Parité: une fois chauffé (≥ 30 bougies, le minimum exigé par load_data), le
+vecteur produit est identique (aux arrondis près) à la dernière ligne de
+ai_model_v3.prepare_data sur le même historique.
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+# Features pour le modèle (ordre attendu par le scaler et le modèle)
+FEATURE_COLS = [
+    'open', 'high', 'low', 'close',
+    'sma_7', 'sma_14', 'sma_30',
+    'rsi', 'macd', 'macd_signal', 'macd_hist',
+    'bb_upper', 'bb_lower', 'bb_width',
+    'volatility', 'momentum_7', 'momentum_14',
+    'atr', 'price_to_sma7', 'price_to_sma30'
+]
+
+
+class RollingWindow:
+    """Moyenne et écart-type (ddof=1) glissants, mis à jour en O(1) (Welford)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.mean = 0.
+        self.m2 = 0.
+
+    def push(self, x):
+        self.values.append(x)
+        n = len(self.values)
+        d = x - self.mean
+        self.mean += d / n
+        self.m2 += d * (x - self.mean)
+
+        if n > self.size:
+            y = self.values.popleft()
+            n -= 1
+            d = y - self.mean
+            self.mean -= d / n
+            self.m2 -= d * (y - self.mean)
+
+    def copy(self):
+        clone = RollingWindow.__new__(RollingWindow)
+        clone.size, clone.mean, clone.m2 = self.size, self.mean, self.m2
+        clone.values = self.values.copy()
+        return clone
+
+    def std(self):
+        n = len(self.values)
+        if n < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.) / (n - 1))
+
+
+class Ema:
+    """EMA pandas adjust=False: y0 = x0 puis y = (1 - alpha) * y + alpha * x"""
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2. / (span + 1.)
+        self.value = None
+
+    def push(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = (1. - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+    def copy(self):
+        clone = Ema(alpha=self.alpha)
+        clone.value = self.value
+        return clone
+
+
+class IncrementalFeatureEngine:
+    def __init__(self, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9):
+        self.rsi_period = rsi_period
+
+        self.sma_7 = RollingWindow(7)
+        self.sma_14 = RollingWindow(14)
+        self.sma_30 = RollingWindow(30)
+        self.bb = RollingWindow(20)
+        self.volatility = RollingWindow(14)
+        self.atr = RollingWindow(14)
+
+        self.ema_fast = Ema(span=macd_fast)
+        self.ema_slow = Ema(span=macd_slow)
+        self.ema_signal = Ema(span=macd_signal)
+
+        # RSI: amorce sur les period+1 premières variations (comme calculate_rsi)
+        self.rsi_up = None
+        self.rsi_down = None
+        self.rsi_warmup = []
+
+        self.closes = deque(maxlen=30)
+        self.last_timestamp = None
+        self.last_features = None
+        self.count = 0
+        self._previous = None
+
+    @classmethod
+    def from_history(cls, ohlc_data, **kwargs):
+        """Amorce le moteur en rejouant un historique [timestamp, o, h, l, c]"""
+        engine = cls(**kwargs)
+        for candle in ohlc_data:
+            engine.update(candle)
+        return engine
+
+    def update(self, candle):
+        """Ajoute une bougie et retourne son vecteur de features (20,)
+
+        Une bougie au même timestamp que la dernière la remplace (bougie du jour
+        qui évolue) au lieu d'être ajoutée.
+        """
+        timestamp, open_price, high, low, close = (float(v) for v in candle[:5])
+
+        # ✅ VALIDATION: mêmes règles que prepare_data
+        if not (close > 0 and math.isfinite(close)):
+            return self.last_features
+
+        if self.last_timestamp is not None and timestamp == self.last_timestamp and self._previous is not None:
+            self.__dict__.update(self._previous)
+        elif self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return self.last_features
+
+        self._previous = self._snapshot()
+
+        prev_close = self.closes[-1] if self.closes else None
+        self.closes.append(close)
+        self.last_timestamp = timestamp
+        self.count += 1
+
+        # 1. Moyennes mobiles
+        self.sma_7.push(close)
+        self.sma_14.push(close)
+        self.sma_30.push(close)
+
+        # 2. RSI
+        rsi = self._update_rsi(close)
+
+        # 3. MACD
+        macd = self.ema_fast.push(close) - self.ema_slow.push(close)
+        macd_signal = self.ema_signal.push(macd)
+
+        # 4. Bandes de Bollinger
+        self.bb.push(close)
+        std_20 = self.bb.std()
+        bb_upper = self.bb.mean + std_20 * 2
+        bb_lower = self.bb.mean - std_20 * 2
+
+        # 5. Volatilité + 6. Momentum
+        if prev_close is not None:
+            self.volatility.push(close / prev_close - 1.)
+        momentum_7 = close / self.closes[-8] - 1. if len(self.closes) > 7 else math.nan
+        momentum_14 = close / self.closes[-15] - 1. if len(self.closes) > 14 else math.nan
+
+        # 7. ATR
+        tr = high - low
+        if prev_close is not None:
+            tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+        self.atr.push(tr)
+
+        features = np.array([
+            open_price, high, low, close,
+            self.sma_7.mean, self.sma_14.mean, self.sma_30.mean,
+            rsi, macd, macd_signal, macd - macd_signal,
+            bb_upper, bb_lower, bb_upper - bb_lower,
+            self.volatility.std(), momentum_7, momentum_14,
+            self.atr.mean, close / self.sma_7.mean, close / self.sma_30.mean
+        ])
+
+        # ✅ NETTOYAGE: inf → NaN puis forward fill
+        features[~np.isfinite(features)] = np.nan
+        if self.last_features is not None:
+            missing = np.isnan(features)
+            features[missing] = self.last_features[missing]
+
+        self.last_features = features
+        return features
+
+    def _snapshot(self):
+        """Copie de l'état (taille bornée) pour pouvoir réviser la dernière bougie"""
+        state = {}
+        for name, value in self.__dict__.items():
+            if name == '_previous':
+                continue
+            if isinstance(value, (RollingWindow, Ema, deque, list)):
+                value = value.copy()
+            state[name] = value
+        return state
+
+    def _update_rsi(self, close):
+        period = self.rsi_period
+
+        if self.rsi_up is None:
+            self.rsi_warmup.append(close)
+            deltas = np.diff(self.rsi_warmup)
+            seed = deltas[:period+1]
+            up = seed[seed >= 0].sum() / period
+            down = -seed[seed < 0].sum() / period
+
+            if len(deltas) < period + 1:
+                # Pas encore assez d'historique: valeur provisoire
+                return self._rsi_value(up, down)
+
+            # Amorce complète: rattraper la récurrence de Wilder
+            for delta in deltas[period-1:]:
+                up = (up * (period - 1) + max(delta, 0.)) / period
+                down = (down * (period - 1) + max(-delta, 0.)) / period
+            self.rsi_up, self.rsi_down = up, down
+            self.rsi_warmup = None
+            return self._rsi_value(up, down)
+
+        delta = close - self.closes[-2]
+        self.rsi_up = (self.rsi_up * (period - 1) + max(delta, 0.)) / period
+        self.rsi_down = (self.rsi_down * (period - 1) + max(-delta, 0.)) / period
+        return self._rsi_value(self.rsi_up, self.rsi_down)
+
+    @staticmethod
+    def _rsi_value(up, down):
+        rs = up / down if down != 0 else 0
+        return 100. - 100. / (1. + rs)
+
+    def features(self):
+        """Features de la dernière bougie, au format X_predict (1, 20)"""
+        if self.last_features is None:
+            raise Exception("Moteur de features vide")
+        return self.last_features.reshape(1, -1)
+
+    def close_prices(self):
+        """30 derniers prix de clôture (volatilité et historique de make_prediction)"""
+        return np.array(self.closes)
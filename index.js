@@ -3,9 +3,39 @@ const cors = require('cors');
 const { spawn } = require('child_process');
 const fetch = require('node-fetch');
 const fs = require('fs');
+const os = require('os');
+const readline = require('readline');
 const app = express();
 const PORT = process.env.PORT || 3000;
 
+// Pool de workers Python persistants (imports numpy/pandas/sklearn payés une seule fois)
+const PREDICTION_WORKERS = parseInt(process.env.PREDICTION_WORKERS || '0', 10) || Math.max(1, Math.min(os.cpus().length, 4));
+const PREDICTION_TIMEOUT = 180000; // 3 minutes (collecte + entraînement)
+// Les workers joignent un instantané de leurs métriques à une réponse au plus toutes les 5s
+const METRICS_REFRESH = 5000;
+
+// Cache des prédictions: servies immédiatement (avec leur âge) tant qu'elles ont moins de PREDICTION_MAX_AGE
+// et que le prix n'a pas dérivé (même règle que le cache des workers, prix relevés en lot)
+const PREDICTION_MAX_AGE = parseInt(process.env.PREDICTION_MAX_AGE || '900', 10) * 1000; // 15 minutes
+const PREDICTION_CACHE_SIZE = 500;
+const PREDICTION_CACHE_DRIFT = parseFloat(process.env.PREDICTION_CACHE_DRIFT || '0.1');
+// Relevé des prix des cryptos en cache (un appel CoinGecko simple/price par lot)
+const PRICE_REFRESH = parseInt(process.env.PRICE_REFRESH || '60', 10) * 1000; // 1 minute
+
+// Pré-calcul périodique des prédictions du top N (PREWARM_TOP=0 pour désactiver)
+const PREWARM_TOP = parseInt(process.env.PREWARM_TOP || '20', 10);
+const PREWARM_INTERVAL = parseInt(process.env.PREWARM_INTERVAL || '600', 10) * 1000; // 10 minutes
+// Horizons supportés par ai_model_v3 (HORIZONS), normalisés comme ?horizons= pour partager la clé de cache
+const HORIZONS_SUPPORTES = [1, 3, 7, 14, 30];
+// 14 et 30 jours demandent plus d'historique que les 30 jours collectés par défaut
+const PREWARM_HORIZONS = lireHorizons(process.env.PREWARM_HORIZONS || '1,3,7');
+// Budget CPU: workers occupés au plus par le pré-calcul (les autres restent aux utilisateurs)
+const PREWARM_WORKERS = parseInt(process.env.PREWARM_WORKERS || '0', 10) || Math.max(1, Math.floor(PREDICTION_WORKERS / 2));
+// Budget fournisseurs: cryptos collectées par minute au plus
+const PREWARM_RATE = parseFloat(process.env.PREWARM_RATE || '6');
+// Une prédiction pré-calculée reste servie jusqu'au cycle suivant (intervalle + durée du cycle)
+const PREWARM_MAX_AGE = Math.max(PREDICTION_MAX_AGE, 2 * PREWARM_INTERVAL);
+
 // Middleware
 app.use(cors());
 app.use(express.json());
@@ -34,7 +64,7 @@ function nettoyerVieuxCache() {
         fichiers.forEach(fichier => {
             // Nettoyer SEULEMENT les caches de données crypto (pas la liste des 250)
             if ((fichier.startsWith('cache_') || fichier.startsWith('data_')) && 
-                fichier.endsWith('.json') && 
+                (fichier.endsWith('.json') || fichier.endsWith('.bin')) && 
                 fichier !== CRYPTO_LIST_CACHE_FILE) {
                 try {
                     const stats = fs.statSync(fichier);
@@ -288,127 +318,446 @@ app.post('/api/crypto-list/refresh', async (req, res) => {
     }
 });
 
+// ============================================================================
+// POOL DE WORKERS PYTHON
+// ============================================================================
+class PythonWorker {
+    constructor(index, pool) {
+        this.index = index;
+        this.pool = pool;
+        this.pending = null;
+        this.ready = false;
+        this.nextId = 1;
+        this.metrics = null;
+        this.metricsAt = 0;
+        this.spawn();
+    }
+
+    spawn() {
+        this.ready = false;
+        this.metrics = null;
+        this.metricsAt = 0;
+        this.process = spawn('python3', ['prediction_worker.py']);
+
+        const lines = readline.createInterface({ input: this.process.stdout });
+        lines.on('line', (line) => this.onMessage(line));
+
+        this.process.stderr.on('data', (data) => {
+            const text = data.toString().trim();
+            if (text) console.log(`   [worker ${this.index}] ${text.split('\n').join(`\n   [worker ${this.index}] `)}`);
+        });
+
+        this.process.on('exit', (code) => {
+            console.log(`⚠️  Worker ${this.index} arrêté (code ${code}), redémarrage...`);
+            // Plus aucun job ne doit partir vers le processus mort d'ici le redémarrage
+            this.ready = false;
+            this.fail(new Error(`Worker Python arrêté (code ${code})`));
+            setTimeout(() => this.spawn(), 1000);
+        });
+
+        this.process.on('error', (err) => {
+            console.log(`❌ Worker ${this.index}: ${err.message}`);
+        });
+
+        // Écriture vers un processus mort: le job est rejeté dans le callback de write()
+        this.process.stdin.on('error', (err) => {
+            console.log(`❌ Worker ${this.index} stdin: ${err.message}`);
+        });
+    }
+
+    onMessage(line) {
+        let message;
+        try {
+            message = JSON.parse(line);
+        } catch (e) {
+            console.log(`   [worker ${this.index}] ${line}`);
+            return;
+        }
+
+        if (message.ready) {
+            this.ready = true;
+            this.pid = message.pid;
+            console.log(`✅ Worker ${this.index} prêt (pid ${message.pid})`);
+            this.pool.dispatch();
+            return;
+        }
+
+        if (!this.pending || message.id !== this.pending.id) return;
+
+        const { resolve, reject, timer } = this.pending;
+        clearTimeout(timer);
+        this.pending = null;
+
+        if (message.metrics) {
+            this.metrics = message.metrics;
+            this.metricsAt = Date.now();
+        }
+
+        if (message.ok) {
+            resolve(message);
+        } else {
+            reject(new Error(message.error || 'Erreur worker'));
+        }
+        this.pool.dispatch();
+    }
+
+    // id: n'échoue que ce job-là (pas celui d'un processus redémarré entre-temps)
+    fail(error, id = null) {
+        if (!this.pending || (id !== null && this.pending.id !== id)) return;
+        clearTimeout(this.pending.timer);
+        this.pending.reject(error);
+        this.pending = null;
+    }
+
+    isIdle() {
+        return this.ready && !this.pending;
+    }
+
+    send(job) {
+        const id = this.nextId++;
+        const child = this.process;
+        const timer = setTimeout(() => {
+            console.error(`   ⏱️  TIMEOUT: worker ${this.index} a dépassé ${job.timeout / 1000} secondes!`);
+            this.fail(new Error(`Timeout worker (>${job.timeout / 1000}s)`), id);
+            // Seulement le processus auquel le job a été envoyé
+            if (child === this.process) this.ready = false;
+            child.kill('SIGTERM');
+        }, job.timeout);
+
+        this.pending = { id, resolve: job.resolve, reject: job.reject, timer };
+        const metrics = Date.now() - this.metricsAt > METRICS_REFRESH;
+        child.stdin.write(JSON.stringify({ id, ...job.payload, ...(metrics && { metrics }) }) + '\n', (err) => {
+            if (err) {
+                this.fail(err, id);
+                this.pool.dispatch();
+            }
+        });
+    }
+}
+
+class PythonWorkerPool {
+    constructor(size) {
+        this.queue = [];
+        this.workers = [];
+        for (let i = 0; i < size; i++) {
+            this.workers.push(new PythonWorker(i + 1, this));
+        }
+    }
+
+    request(payload, timeout = PREDICTION_TIMEOUT) {
+        return this.requestMessage(payload, timeout).then(message => message.result);
+    }
+
+    // Réponse complète du worker: result + timings par étape (+ profile)
+    requestMessage(payload, timeout = PREDICTION_TIMEOUT) {
+        return new Promise((resolve, reject) => {
+            this.queue.push({ payload, timeout, resolve, reject });
+            this.dispatch();
+        });
+    }
+
+    // Un worker libre et personne en attente (le pré-calcul passe après les utilisateurs)
+    hasCapacity() {
+        return this.queue.length === 0 && this.workers.some(w => w.isIdle());
+    }
+
+    dispatch() {
+        while (this.queue.length > 0) {
+            const worker = this.workers.find(w => w.isIdle());
+            if (!worker) return;
+            worker.send(this.queue.shift());
+        }
+    }
+
+    stats() {
+        return {
+            size: this.workers.length,
+            ready: this.workers.filter(w => w.ready).length,
+            busy: this.workers.filter(w => w.pending).length,
+            queued: this.queue.length
+        };
+    }
+
+    // Derniers instantanés de métriques des workers
+    metrics() {
+        return this.workers.map(w => ({
+            worker: w.index,
+            pid: w.pid || null,
+            age_ms: w.metricsAt ? Date.now() - w.metricsAt : null,
+            snapshot: w.metrics
+        }));
+    }
+}
+
+// Familles de métriques des workers (label worker) + métriques du serveur → texte Prometheus
+function renderPrometheus(workers, serverFamilies) {
+    const familles = new Map();
+    const ajouter = (family, labels) => {
+        if (!familles.has(family.name)) {
+            familles.set(family.name, { ...family, samples: [] });
+        }
+        for (const sample of family.samples) {
+            familles.get(family.name).samples.push({ ...sample, labels: { ...labels, ...sample.labels } });
+        }
+    };
+
+    for (const w of workers) {
+        for (const family of w.snapshot?.families || []) ajouter(family, { worker: String(w.worker) });
+    }
+    serverFamilies.forEach(family => ajouter(family, {}));
+
+    const echapper = v => String(v).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+    const lignes = [];
+    for (const family of familles.values()) {
+        lignes.push(`# HELP ${family.name} ${family.help}`);
+        lignes.push(`# TYPE ${family.name} ${family.type}`);
+        for (const sample of family.samples) {
+            const labels = Object.entries(sample.labels).map(([k, v]) => `${k}="${echapper(v)}"`).join(',');
+            lignes.push(`${family.name}${sample.suffix || ''}${labels ? `{${labels}}` : ''} ${sample.value}`);
+        }
+    }
+    return lignes.join('\n') + '\n';
+}
+
+let workerPool = null;
+
+// ✅ Single-flight: les requêtes simultanées pour la même crypto partagent un seul calcul
+const predictionsEnCours = new Map();
+let predictionsPartagees = 0;
+
+function clePrediction(coinId, horizons = []) {
+    const coin = coinId.toLowerCase();
+    return horizons.length ? `${coin}|${horizons.join(',')}` : coin;
+}
+
+// refresh: le worker recalcule sans lire son propre cache de prédictions
+function predireCoalesce(coinId, horizons = [], source = 'live', refresh = false) {
+    const coin = coinId.toLowerCase();
+    const key = clePrediction(coin, horizons);
+    const cleEnCours = refresh ? `${key}|refresh` : key;
+    const enCours = predictionsEnCours.get(cleEnCours);
+    if (enCours) {
+        predictionsPartagees++;
+        return { promise: enCours, shared: true };
+    }
+
+    const promise = workerPool.requestMessage({ action: 'predict', coin_id: coin, horizons, refresh })
+        .then(message => {
+            // Résultat resservi par le cache du worker: son âge réel, pas celui de la réponse
+            message.cached = ecrirePredictionCache(key, message.result, source, message.result.cache_age_seconds ?? null);
+            return message;
+        })
+        .finally(() => predictionsEnCours.delete(cleEnCours));
+    predictionsEnCours.set(cleEnCours, promise);
+    return { promise, shared: false };
+}
+
+// ✅ Cache des prédictions (LRU): clé crypto|horizons → { prediction, computedAt, source }
+const predictionCache = new Map();
+const predictionCacheStats = { hits: 0, misses: 0, drifted: 0 };
+
+// ✅ Prix relevés: coin → { price, at } (dérive des prédictions en cache)
+const prixReleves = new Map();
+
+// Prix actuel trop éloigné du prix de référence (relatif à la plage de contrainte à 7 jours)
+function aDerive(coin, prediction) {
+    const releve = prixReleves.get(coin);
+    if (!releve || Date.now() - releve.at > 3 * PRICE_REFRESH) return false;
+    const bande = (prediction.max_price ?? 0) - (prediction.min_price ?? 0);
+    if (!(bande > 0)) return false;
+    return Math.abs(releve.price - prediction.current_price) > PREDICTION_CACHE_DRIFT * bande;
+}
+
+function lirePredictionCache(key) {
+    const entry = predictionCache.get(key);
+    const maxAge = entry?.source === 'prewarm' ? PREWARM_MAX_AGE : PREDICTION_MAX_AGE;
+    if (!entry || Date.now() - entry.computedAt > maxAge) {
+        predictionCacheStats.misses++;
+        return null;
+    }
+    if (aDerive(key.split('|')[0], entry.prediction)) {
+        predictionCache.delete(key);
+        predictionCacheStats.drifted++;
+        predictionCacheStats.misses++;
+        return null;
+    }
+    predictionCache.delete(key);
+    predictionCache.set(key, entry);
+    predictionCacheStats.hits++;
+    return entry;
+}
+
+function ecrirePredictionCache(key, prediction, source, ageSeconds = null) {
+    const entry = { prediction, computedAt: Date.now() - (ageSeconds || 0) * 1000, source, fromCache: ageSeconds !== null };
+    predictionCache.delete(key);
+    predictionCache.set(key, entry);
+    while (predictionCache.size > PREDICTION_CACHE_SIZE) {
+        predictionCache.delete(predictionCache.keys().next().value);
+    }
+    return entry;
+}
+
+// Fraîcheur jointe à chaque prédiction servie: cached = current_price et timestamp datent de computed_at
+// (live_price: dernier prix relevé, s'il est connu)
+function fraicheur(entry, cached = entry.fromCache, coin = null) {
+    const releve = coin ? prixReleves.get(coin) : null;
+    return {
+        computed_at: new Date(entry.computedAt).toISOString(),
+        age_seconds: Math.round((Date.now() - entry.computedAt) / 1000),
+        source: entry.source,
+        cached,
+        ...(cached && releve && { live_price: releve.price, live_price_at: new Date(releve.at).toISOString() })
+    };
+}
+
+// Relevé en lot des prix des cryptos présentes dans le cache (CoinGecko, 250 ids par appel)
+async function releverPrix() {
+    const coins = [...new Set([...predictionCache.keys()].map(key => key.split('|')[0]))];
+    for (let i = 0; i < coins.length; i += 250) {
+        const lot = coins.slice(i, i + 250);
+        const response = await fetch(
+            `https://api.coingecko.com/api/v3/simple/price?ids=${encodeURIComponent(lot.join(','))}&vs_currencies=usd`,
+            { timeout: 10000 }
+        );
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const prix = await response.json();
+        const maintenant = Date.now();
+        for (const coin of lot) {
+            if (prix[coin]?.usd) prixReleves.set(coin, { price: prix[coin].usd, at: maintenant });
+        }
+    }
+}
+
+function demarrerRelevePrix() {
+    const cycle = () => releverPrix()
+        .catch(error => console.log(`⚠️  Relevé des prix: ${error.message}`))
+        .finally(() => setTimeout(cycle, PRICE_REFRESH));
+    setTimeout(cycle, PRICE_REFRESH);
+}
+
+// ============================================================================
+// PRÉ-CALCUL DU TOP N (prédictions prêtes avant la première demande)
+// ============================================================================
+const prechauffage = { runs: 0, warmed: 0, skipped: 0, errors: 0, running: false, last_run: null };
+
+async function prechaufferTop() {
+    if (prechauffage.running || !cryptoListCache || !workerPool) return;
+    prechauffage.running = true;
+
+    const debut = Date.now();
+    const coins = cryptoListCache.cryptos.slice(0, PREWARM_TOP).map(c => c.id);
+    const espacement = 60000 / PREWARM_RATE;
+    const enCours = new Set();
+    let calcules = 0;
+
+    try {
+        for (const coin of coins) {
+            // Déjà calculée récemment (demande d'un utilisateur): rien à refaire
+            const entry = predictionCache.get(clePrediction(coin, PREWARM_HORIZONS));
+            if (entry && Date.now() - entry.computedAt < PREWARM_INTERVAL / 2) {
+                prechauffage.skipped++;
+                continue;
+            }
+
+            // Budget CPU: au plus PREWARM_WORKERS en parallèle, et seulement sur un worker libre
+            while (enCours.size >= PREWARM_WORKERS || !workerPool.hasCapacity()) {
+                await sleep(500);
+            }
+
+            const job = predireCoalesce(coin, PREWARM_HORIZONS, 'prewarm').promise
+                .then(() => { prechauffage.warmed++; calcules++; })
+                .catch(error => {
+                    prechauffage.errors++;
+                    console.log(`⚠️  Pré-calcul ${coin}: ${error.message}`);
+                })
+                .finally(() => enCours.delete(job));
+            enCours.add(job);
+
+            // Budget fournisseurs: espacement minimal entre deux collectes
+            await sleep(espacement);
+        }
+        await Promise.all(enCours);
+    } finally {
+        prechauffage.runs++;
+        prechauffage.running = false;
+        prechauffage.last_run = {
+            at: new Date(debut).toISOString(),
+            coins: coins.length,
+            computed: calcules,
+            duration_ms: Date.now() - debut
+        };
+        console.log(`🔥 Pré-calcul: ${calcules}/${coins.length} prédictions du top ${PREWARM_TOP} en ${Math.round((Date.now() - debut) / 1000)}s`);
+    }
+}
+
+function demarrerPrechauffage() {
+    if (PREWARM_TOP <= 0) return;
+    console.log(`🔥 Pré-calcul du top ${PREWARM_TOP} toutes les ${PREWARM_INTERVAL / 1000}s (${PREWARM_WORKERS} worker(s), ${PREWARM_RATE} cryptos/min)\n`);
+
+    const cycle = () => prechaufferTop()
+        .catch(error => console.log(`⚠️  Pré-calcul: ${error.message}`))
+        .finally(() => setTimeout(cycle, PREWARM_INTERVAL));
+    cycle();
+}
+
+// ?horizons=1,3,7,14,30 → courbe de prévision (triée, sans doublons, horizons supportés uniquement)
+function lireHorizons(query) {
+    if (!query) return [];
+    const horizons = String(query).split(',').map(h => Number(h.trim()));
+    if (horizons.some(h => !HORIZONS_SUPPORTES.includes(h))) {
+        throw new Error(`Paramètre horizons invalide: ${query} (disponibles: ${HORIZONS_SUPPORTES.join(',')})`);
+    }
+    return [...new Set(horizons)].sort((a, b) => a - b);
+}
+
 // ============================================================================
 // ENDPOINT: Prédiction
 // ============================================================================
 app.get('/api/predict/:coinId', async (req, res) => {
     const { coinId } = req.params;
     const startTime = Date.now();
+
+    let horizons;
+    try {
+        horizons = lireHorizons(req.query.horizons);
+    } catch (error) {
+        return res.status(400).json({ error: error.message });
+    }
     
     console.log(`\n${'='.repeat(60)}`);
     console.log(`📊 PRÉDICTION: ${coinId.toUpperCase()}`);
     console.log(`${'='.repeat(60)}`);
 
-    let collectProcess = null;
-    let modelProcess = null;
+    // Prédiction récente (pré-calculée ou demandée): servie immédiatement, ?refresh=1 pour recalculer
+    const refresh = req.query.refresh === '1';
+    const cached = refresh ? null : lirePredictionCache(clePrediction(coinId, horizons));
+    if (cached) {
+        console.log(`⚡ Prédiction en cache (${fraicheur(cached).age_seconds}s, ${cached.source})`);
+        res.set('Age', String(fraicheur(cached).age_seconds));
+        return res.json({ ...cached.prediction, freshness: fraicheur(cached, true, coinId.toLowerCase()) });
+    }
 
     try {
-        // ====== ÉTAPE 1: COLLECTE DE DONNÉES ======
-        console.log(`\n📥 [1/2] COLLECTE DES DONNÉES`);
-        console.log(`⏱️  Timeout: 120 secondes`);
-
-        const collectOutput = await new Promise((resolve, reject) => {
-            collectProcess = spawn('python3', ['collect_data_v5.py', coinId], {
-                timeout: 120000
-            });
-            
-            let output = '';
-            let error = '';
-            
-            collectProcess.stdout.on('data', (data) => {
-                const text = data.toString().trim();
-                output += text + '\n';
-                if (text) console.log(`   ${text}`);
-            });
-            
-            collectProcess.stderr.on('data', (data) => {
-                const text = data.toString().trim();
-                error += text + '\n';
-                if (text) console.error(`   ❌ ${text}`);
-            });
-
-            const timeout = setTimeout(() => {
-                console.error('   ⏱️  TIMEOUT: La collecte a dépassé 120 secondes!');
-                collectProcess.kill('SIGTERM');
-                reject(new Error('Collecte timeout (>120s)'));
-            }, 125000);
-
-            collectProcess.on('close', (code) => {
-                clearTimeout(timeout);
-                if (code !== 0) {
-                    reject(new Error(`Collecte échouée (code ${code}): ${error}`));
-                } else {
-                    resolve(output);
-                }
-            });
-
-            collectProcess.on('error', (err) => {
-                clearTimeout(timeout);
-                reject(err);
-            });
-        });
-
-        console.log(`✅ Collecte réussie (${Date.now() - startTime}ms)`);
-
-        // ====== ÉTAPE 2: ENTRAÎNEMENT ET PRÉDICTION ======
-        console.log(`\n🤖 [2/2] ENTRAÎNEMENT IA + PRÉDICTION`);
-        console.log(`⏱️  Timeout: 60 secondes`);
-
-        const prediction = await new Promise((resolve, reject) => {
-            modelProcess = spawn('python3', ['ai_model_v3.py'], {
-                timeout: 60000
-            });
-            
-            let output = '';
-            let error = '';
-            
-            modelProcess.stdout.on('data', (data) => {
-                const text = data.toString().trim();
-                output += text + '\n';
-                if (text) console.log(`   ${text}`);
-            });
-            
-            modelProcess.stderr.on('data', (data) => {
-                const text = data.toString().trim();
-                error += text + '\n';
-                if (text) console.error(`   ❌ ${text}`);
-            });
-
-            const timeout = setTimeout(() => {
-                console.error('   ⏱️  TIMEOUT: Le modèle a dépassé 60 secondes!');
-                modelProcess.kill('SIGTERM');
-                reject(new Error('Modèle timeout (>60s)'));
-            }, 65000);
-
-            modelProcess.on('close', (code) => {
-                clearTimeout(timeout);
-                if (code !== 0) {
-                    reject(new Error(`Modèle échoué (code ${code}): ${error}`));
-                } else {
-                    try {
-                        const jsonMatch = output.match(/\{[\s\S]*\}/);
-                        if (!jsonMatch) {
-                            throw new Error('Aucun JSON trouvé en sortie');
-                        }
-                        const result = JSON.parse(jsonMatch[0]);
-                        resolve(result);
-                    } catch (e) {
-                        reject(new Error(`Erreur parsing JSON: ${e.message}`));
-                    }
-                }
-            });
+        // Collecte + entraînement + prédiction dans un worker Python persistant
+        const { promise, shared } = predireCoalesce(coinId, horizons, 'live', refresh);
+        if (shared) {
+            console.log(`\n🔗 Prédiction déjà en cours pour ${coinId}, résultat partagé`);
+        } else {
+            console.log(`\n🤖 COLLECTE + IA (worker pool: ${JSON.stringify(workerPool.stats())})`);
+        }
 
-            modelProcess.on('error', (err) => {
-                clearTimeout(timeout);
-                reject(err);
-            });
-        });
+        const { result: prediction, timings = [], cached: entry } = await promise;
 
         const totalTime = Date.now() - startTime;
         console.log(`\n✅ PRÉDICTION RÉUSSIE en ${totalTime}ms`);
         console.log(`${'='.repeat(60)}\n`);
 
-        res.json(prediction);
+        // Timings par étape du worker, hors du corps de la réponse
+        if (timings.length) {
+            res.set('Server-Timing', timings.map(t => `${t.stage};dur=${t.wall_ms}`).join(', '));
+        }
+        if (entry.fromCache) res.set('Age', String(fraicheur(entry).age_seconds));
+        res.json({ ...prediction, freshness: fraicheur(entry, entry.fromCache, coinId.toLowerCase()) });
 
     } catch (error) {
         const totalTime = Date.now() - startTime;
@@ -416,9 +765,6 @@ app.get('/api/predict/:coinId', async (req, res) => {
         console.error(`Temps écoulé: ${totalTime}ms`);
         console.log(`${'='.repeat(60)}\n`);
 
-        if (collectProcess) collectProcess.kill();
-        if (modelProcess) modelProcess.kill();
-
         res.status(500).json({
             error: 'Erreur lors de la prédiction',
             message: error.message,
@@ -427,6 +773,48 @@ app.get('/api/predict/:coinId', async (req, res) => {
     }
 });
 
+// ============================================================================
+// ENDPOINT: Prédictions par lot (leaderboard)
+// ============================================================================
+const BATCH_TIMEOUT = 30 * 60 * 1000; // 30 minutes pour le top 250
+const BATCH_MAX_COINS = 250;
+
+app.post('/api/predict/batch', async (req, res) => {
+    const startTime = Date.now();
+
+    try {
+        let coins = Array.isArray(req.body.coins) ? req.body.coins.map(String) : [];
+
+        // { top: N } → les N premières cryptos de la liste en mémoire
+        if (req.body.top && cryptoListCache) {
+            const top = cryptoListCache.cryptos.slice(0, parseInt(req.body.top, 10)).map(c => c.id);
+            coins = [...new Set([...coins, ...top])];
+        }
+
+        if (coins.length === 0) {
+            return res.status(400).json({ error: 'Paramètre coins (liste) ou top (nombre) requis' });
+        }
+        coins = coins.slice(0, BATCH_MAX_COINS);
+
+        console.log(`\n📊 PRÉDICTION PAR LOT: ${coins.length} cryptos${req.body.pooled ? ' (modèle mutualisé)' : ''}`);
+
+        // { pooled: true } → un seul modèle mutualisé pour tout le lot
+        const pooled = Boolean(req.body.pooled);
+        const result = await workerPool.request({ action: 'batch', coins, pooled }, BATCH_TIMEOUT);
+
+        console.log(`✅ Lot terminé en ${Date.now() - startTime}ms (${Object.keys(result.errors).length} erreurs)\n`);
+        res.json(result);
+
+    } catch (error) {
+        console.error(`\n❌ ERREUR LOT: ${error.message}`);
+        res.status(500).json({
+            error: 'Erreur lors de la prédiction par lot',
+            message: error.message,
+            timestamp: new Date().toISOString()
+        });
+    }
+});
+
 // ============================================================================
 // ENDPOINT: Santé du serveur
 // ============================================================================
@@ -436,10 +824,42 @@ app.get('/api/health', (req, res) => {
         timestamp: new Date().toISOString(),
         cache: cryptoListCache ? `${cryptoListCache.total} cryptos` : 'empty',
         fallback: cryptoListCache?.fallback || false,
+        workers: workerPool ? workerPool.stats() : null,
+        predictions: { in_flight: predictionsEnCours.size, shared: predictionsPartagees },
+        prediction_cache: { entries: predictionCache.size, ...predictionCacheStats },
+        prewarm: PREWARM_TOP > 0 ? { top: PREWARM_TOP, ...prechauffage } : null,
         version: '2.3 - Smart Retry System'
     });
 });
 
+// ============================================================================
+// ENDPOINT: Métriques (Prometheus, ou JSON avec ?format=json)
+// ============================================================================
+app.get('/api/metrics', (req, res) => {
+    const workers = workerPool ? workerPool.metrics() : [];
+    const pool = workerPool ? workerPool.stats() : { size: 0, ready: 0, busy: 0, queued: 0 };
+
+    const gauge = (name, help, value, type = 'gauge') => ({ name, help, type, samples: [{ suffix: '', labels: {}, value }] });
+    const serverFamilies = [
+        gauge('crypto_node_workers_ready', 'Workers Python prêts', pool.ready),
+        gauge('crypto_node_workers_busy', 'Workers Python occupés', pool.busy),
+        gauge('crypto_node_queue_length', "Requêtes en attente d'un worker", pool.queued),
+        gauge('crypto_node_predictions_in_flight', 'Prédictions en cours (single-flight)', predictionsEnCours.size),
+        gauge('crypto_node_predictions_shared_total', 'Requêtes servies par une prédiction déjà en cours', predictionsPartagees, 'counter'),
+        gauge('crypto_node_prediction_cache_entries', 'Prédictions en cache', predictionCache.size),
+        gauge('crypto_node_prediction_cache_hits_total', 'Prédictions servies depuis le cache', predictionCacheStats.hits, 'counter'),
+        gauge('crypto_node_prediction_cache_misses_total', 'Prédictions absentes ou trop anciennes', predictionCacheStats.misses, 'counter'),
+        gauge('crypto_node_prediction_cache_drifted_total', 'Prédictions invalidées par la dérive du prix', predictionCacheStats.drifted, 'counter'),
+        gauge('crypto_node_prewarm_computed_total', 'Prédictions pré-calculées', prechauffage.warmed, 'counter'),
+        gauge('crypto_node_prewarm_errors_total', 'Échecs du pré-calcul', prechauffage.errors, 'counter'),
+    ];
+
+    if (req.query.format === 'json') {
+        return res.json({ timestamp: new Date().toISOString(), pool, workers, server: serverFamilies });
+    }
+    res.type('text/plain; version=0.0.4').send(renderPrometheus(workers, serverFamilies));
+});
+
 // ============================================================================
 // Démarrage du serveur
 // ============================================================================
@@ -447,9 +867,18 @@ async function start() {
     // Nettoyer les vieux caches de prédiction
     nettoyerVieuxCache();
     
+    // Démarrer les workers Python (imports lourds une seule fois)
+    console.log(`🐍 Démarrage de ${PREDICTION_WORKERS} worker(s) Python...\n`);
+    workerPool = new PythonWorkerPool(PREDICTION_WORKERS);
+    
     // Initialiser les cryptos (cache 1h + retry)
     await initializeCryptos();
     
+    // Pré-calculer les prédictions du top N en arrière-plan
+    demarrerPrechauffage();
+    // Prix des cryptos en cache (invalidation des prédictions sur dérive)
+    demarrerRelevePrix();
+    
     // Démarrer le serveur
     app.listen(PORT, () => {
         console.log(`${'='.repeat(60)}`);
@@ -457,7 +886,9 @@ async function start() {
         console.log(`📊 Liste: GET /api/crypto-list`);
         console.log(`🔄 Refresh: POST /api/crypto-list/refresh`);
         console.log(`🔮 Prédire: GET /api/predict/bitcoin`);
+        console.log(`🏆 Lot: POST /api/predict/batch { coins: [...] | top: N, pooled: true }`);
         console.log(`❤️  Santé: GET /api/health`);
+        console.log(`📈 Métriques: GET /api/metrics`);
         console.log(`${'='.repeat(60)}\n`);
     });
 }
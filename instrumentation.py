@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentation du pipeline de prédiction
+Timers par étape (wall + CPU), histogrammes de latence des fournisseurs,
+compteurs et jauges (ratios de cache...), profilage optionnel.
+
+Export JSON (familles de métriques, séparé du résultat) et texte Prometheus:
+    with stage('prepare_data'): ...
+    @timed('train_model')
+    observe('provider_request_seconds', 0.21, provider='CoinCap', outcome='ok')
+    inc('collect_total', outcome='fresh')
+    print(prometheus())
+
+Le temps CPU est celui du processus (threads OpenMP du backend 'hist'
+compris): exact dans un worker qui traite une requête à la fois.
+"""
+
+import cProfile
+import functools
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PREFIX = 'crypto_'
+
+# Bornes (secondes) des histogrammes de latence
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.)
+
+HELP = {
+    'stage_seconds': "Durée (wall) des étapes du pipeline",
+    'stage_cpu_seconds_total': "Temps CPU cumulé des étapes du pipeline",
+    'stage_errors_total': "Étapes terminées par une exception",
+    'provider_request_seconds': "Latence des requêtes HTTP vers les fournisseurs",
+    'collect_total': "Collectes par issue (cache frais, périmé, rafraîchissement...)",
+}
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (format Prometheus)"""
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, borne in enumerate(BUCKETS):
+            if value <= borne:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Estimation par borne supérieure du bucket (comme histogram_quantile)"""
+        if not self.count:
+            return None
+        rang = q * self.count
+        for borne, cumul in zip(BUCKETS, self.counts):
+            if cumul >= rang:
+                return borne
+        return float('inf')
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+        self._local = threading.local()
+
+    # ----------------------------------------------------------------- mesures
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, name, fn):
+        """Jauges lues à l'export: fn() → dict de valeurs numériques (stats de cache...)"""
+        with self._lock:
+            self._collectors[name] = fn
+
+    @contextmanager
+    def stage(self, name):
+        """Mesure une étape: histogramme wall, CPU cumulé, erreurs, timings de la requête"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        except BaseException:
+            self.inc('stage_errors_total', stage=name)
+            raise
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self.observe('stage_seconds', wall, stage=name)
+            self.inc('stage_cpu_seconds_total', cpu, stage=name)
+
+            timings = getattr(self._local, 'timings', None)
+            if timings is not None:
+                timings.append({'stage': name, 'wall_ms': round(wall * 1000, 2), 'cpu_ms': round(cpu * 1000, 2)})
+
+    def timed(self, name=None):
+        """Décorateur: chaque appel est mesuré comme une étape"""
+        def decorateur(fn):
+            stage_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorateur
+
+    @contextmanager
+    def request_timings(self):
+        """Collecte les étapes exécutées par ce thread (timings d'une requête)"""
+        previous = getattr(self._local, 'timings', None)
+        timings = self._local.timings = []
+        try:
+            yield timings
+        finally:
+            self._local.timings = previous
+
+    # ------------------------------------------------------------------ export
+    def families(self):
+        """Familles de métriques: [{name, type, help, samples: [{labels, value}]}]"""
+        with self._lock:
+            histograms = {k: (list(h.counts), h.count, h.sum) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+            collectors = dict(self._collectors)
+
+        familles = {}
+
+        def famille(name, kind):
+            if name not in familles:
+                familles[name] = {'name': PREFIX + name, 'type': kind, 'help': HELP.get(name, name), 'samples': []}
+            return familles[name]['samples']
+
+        for (name, labels), (counts, count, total) in sorted(histograms.items()):
+            samples = famille(name, 'histogram')
+            labels = dict(labels)
+            for borne, cumul in zip(BUCKETS, counts):
+                samples.append({'suffix': '_bucket', 'labels': dict(labels, le=str(borne)), 'value': cumul})
+            samples.append({'suffix': '_bucket', 'labels': dict(labels, le='+Inf'), 'value': count})
+            samples.append({'suffix': '_sum', 'labels': labels, 'value': total})
+            samples.append({'suffix': '_count', 'labels': labels, 'value': count})
+
+        for (name, labels), value in sorted(counters.items()):
+            famille(name, 'counter').append({'suffix': '', 'labels': dict(labels), 'value': value})
+
+        for collector, fn in sorted(collectors.items()):
+            try:
+                stats = fn()
+            except Exception:
+                continue
+            for key, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                famille(f"{collector}_{key}", 'gauge').append({'suffix': '', 'labels': {}, 'value': value})
+
+        return list(familles.values())
+
+    def stages(self):
+        """Résumé lisible par étape: appels, wall moyen/p50/p95, CPU total"""
+        with self._lock:
+            resume = {}
+            for (name, labels), histogram in self._histograms.items():
+                if name != 'stage_seconds':
+                    continue
+                stage_name = dict(labels)['stage']
+                resume[stage_name] = {
+                    'count': histogram.count,
+                    'wall_avg_ms': round(histogram.sum / histogram.count * 1000, 2) if histogram.count else None,
+                    'wall_p50_le_s': histogram.quantile(0.5),
+                    'wall_p95_le_s': histogram.quantile(0.95),
+                    'cpu_total_s': round(self._counters.get(('stage_cpu_seconds_total', labels), 0.), 3),
+                }
+            return resume
+
+    def snapshot(self):
+        """Export JSON complet"""
+        return {'timestamp': time.time(), 'stages': self.stages(), 'families': self.families()}
+
+    def prometheus(self, **extra_labels):
+        return render_prometheus(self.families(), **extra_labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    contenu = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels.items()
+    )
+    return '{' + contenu + '}'
+
+
+def render_prometheus(families, **extra_labels):
+    """Familles (format de Registry.families) → texte d'exposition Prometheus"""
+    lignes = []
+    for family in families:
+        lignes.append(f"# HELP {family['name']} {family['help']}")
+        lignes.append(f"# TYPE {family['name']} {family['type']}")
+        for sample in family['samples']:
+            labels = dict(extra_labels, **sample['labels'])
+            lignes.append(f"{family['name']}{sample['suffix']}{_labels(labels)} {sample['value']}")
+    return '\n'.join(lignes) + '\n'
+
+
+# ============================================================================
+# PROFILAGE (optionnel, par requête)
+# ============================================================================
+class _Sampler(threading.Thread):
+    """Profileur par échantillonnage: pile du thread cible toutes les interval s"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stop = threading.Event()
+        self.inclusive = Counter()
+        self.exclusive = Counter()
+        self.samples = 0
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            vus = set()
+            feuille = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+                if feuille:
+                    self.exclusive[key] += 1
+                    feuille = False
+                if key not in vus:
+                    self.inclusive[key] += 1
+                    vus.add(key)
+                frame = frame.f_back
+
+    def report(self, top):
+        if not self.samples:
+            return []
+        return [
+            {'function': key, 'total_pct': round(100 * n / self.samples, 1),
+             'self_pct': round(100 * self.exclusive[key] / self.samples, 1)}
+            for key, n in self.inclusive.most_common(top)
+        ]
+
+
+class Profile:
+    """Résultat d'un profilage: report() → top des fonctions (JSON)"""
+
+    def __init__(self, mode, top):
+        self.mode = mode
+        self.top = top
+        self._profiler = None
+        self._sampler = None
+
+    def report(self):
+        if self._sampler is not None:
+            return {'mode': 'sample', 'samples': self._sampler.samples,
+                    'functions': self._sampler.report(self.top)}
+
+        stats = pstats.Stats(self._profiler).stats
+        lignes = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        return {'mode': 'cprofile', 'functions': [
+            {'function': f"{fichier}:{ligne}({nom})", 'calls': nc,
+             'self_s': round(tt, 6), 'cumulative_s': round(ct, 6)}
+            for (fichier, ligne, nom), (cc, nc, tt, ct, callers) in lignes
+        ]}
+
+
+@contextmanager
+def profile(mode='cprofile', top=25, interval=0.005):
+    """Profile le bloc: mode 'cprofile' (déterministe) ou 'sample' (faible surcoût)"""
+    if mode not in ('cprofile', 'sample'):
+        raise Exception(f"Mode de profilage inconnu: {mode} (cprofile, sample)")
+
+    result = Profile(mode, top)
+    if mode == 'sample':
+        result._sampler = _Sampler(threading.get_ident(), interval)
+        result._sampler.start()
+        try:
+            yield result
+        finally:
+            result._sampler.stop.set()
+            result._sampler.join()
+    else:
+        result._profiler = cProfile.Profile()
+        result._profiler.enable()
+        try:
+            yield result
+        finally:
+            result._profiler.disable()
+
+
+# Registre unique par processus
+REGISTRY = Registry()
+stage = REGISTRY.stage
+timed = REGISTRY.timed
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+add_collector = REGISTRY.add_collector
+request_timings = REGISTRY.request_timings
+snapshot = REGISTRY.snapshot
+prometheus = REGISTRY.prometheus
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache des données de marché collectées
+LRU en mémoire (avec âge) devant un store SQLite durable partagé entre
+processus: une seule lecture par hit, entrées expirées servies par le
+collecteur pendant qu'un rafraîchissement tourne en arrière-plan.
+Les entrées sont stockées au format binaire de payload_codec (OHLC colonnaires).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import payload_codec
+
+
+class MarketDataCache:
+    def __init__(self, path=None, max_entries=512):
+        self.path = path or os.environ.get('MARKET_CACHE_DB', 'market_cache.db')
+        self.max_entries = max_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.served_age_total = 0.
+
+        self._connexion().execute(
+            "CREATE TABLE IF NOT EXISTS market_data_v2 ("
+            "key TEXT PRIMARY KEY, payload BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connexion(self):
+        """Une connexion SQLite par thread (WAL: lectures concurrentes entre workers)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Retourne (payload, âge en secondes) ou (None, None)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                payload, updated = entry
+                return payload, time.time() - updated
+
+        row = self._connexion().execute(
+            "SELECT payload, updated FROM market_data_v2 WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        payload, updated = payload_codec.decoder(row[0]), row[1]
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(key, payload, updated)
+        return payload, time.time() - updated
+
+    def put(self, key, payload):
+        updated = time.time()
+        self._connexion().execute(
+            "INSERT OR REPLACE INTO market_data_v2 (key, payload, updated) VALUES (?, ?, ?)",
+            (key, payload_codec.encoder(payload), updated)
+        )
+        self._remember(key, payload, updated)
+
+    def _remember(self, key, payload, updated):
+        with self._lock:
+            self._memory[key] = (payload, updated)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def record_served(self, age, fresh):
+        """Comptabilise une entrée servie (fraîche ou périmée) et son âge"""
+        with self._lock:
+            if fresh:
+                self.fresh_hits += 1
+            else:
+                self.stale_hits += 1
+            self.served_age_total += age
+
+    def record_refresh(self):
+        with self._lock:
+            self.refreshes += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            served = self.fresh_hits + self.stale_hits
+            return {
+                'entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'fresh_hits': self.fresh_hits,
+                'stale_hits': self.stale_hits,
+                'refreshes': self.refreshes,
+                'hit_ratio': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                'avg_age_s': round(self.served_age_total / served, 1) if served else None,
+            }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def cache_partage():
+    """Instance de cache unique par processus"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = MarketDataCache()
+        return _shared_cache
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Store des modèles entraînés
+Garde le tuple (model, scaler, metrics) par crypto, indexé par une empreinte
+des OHLC (bougies clôturées, cf. prediction_cache.input_key) + hyperparamètres. LRU en mémoire + persistance disque bornée.
+
+Chaque modèle est aussi exporté au format compact (compact_model, .cmdl):
+l'inférence seule le relit par memmap sans importer scikit-learn
+(MODEL_STORE_COMPACT=0 pour désactiver).
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import compact_model
+
+
+def fingerprint(ohlc_data, params, version=''):
+    """Empreinte stable des données d'entrée et des hyperparamètres"""
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(ohlc_data, dtype=np.float64).tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    h.update(version.encode())
+    return h.hexdigest()
+
+
+class ModelStore:
+    def __init__(self, directory=None, max_entries=None, max_disk_entries=None):
+        self.directory = directory or os.environ.get('MODEL_STORE_DIR', 'models')
+        self.max_entries = max_entries or int(os.environ.get('MODEL_STORE_MAX', 64))
+        self.max_disk_entries = max_disk_entries or int(os.environ.get('MODEL_STORE_MAX_DISK', 500))
+        self.compact = os.environ.get('MODEL_STORE_COMPACT', '1') != '0'
+
+        self._memory = OrderedDict()
+        # Artefacts compacts mappés: coin_id → (chemin, mtime, entry)
+        self._compacts = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.compact_loads = 0
+
+    def _path(self, coin_id, key, extension='.pkl'):
+        return os.path.join(self.directory, f"{coin_id}_{key[:16]}{extension}")
+
+    def _fichiers(self, coin_id, extension):
+        prefix = f"{coin_id}_"
+        return [
+            os.path.join(self.directory, f) for f in os.listdir(self.directory)
+            if f.startswith(prefix) and f.endswith(extension) and len(f) == len(prefix) + 16 + len(extension)
+        ]
+
+    def get(self, coin_id, key):
+        """Retourne (model, scaler, metrics) ou None"""
+        with self._lock:
+            entry = self._memory.get((coin_id, key))
+            if entry is not None:
+                self._memory.move_to_end((coin_id, key))
+                self.hits += 1
+                return entry
+
+        path = self._path(coin_id, key)
+        try:
+            with open(path, 'rb') as f:
+                stored = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+
+        if stored.get('key') != key:
+            self.misses += 1
+            return None
+
+        entry = stored['entry']
+        os.utime(path)  # LRU disque basé sur mtime
+        self.disk_hits += 1
+        self._remember(coin_id, key, entry)
+        return entry
+
+    def latest(self, coin_id):
+        """Dernier modèle connu pour une crypto, quelles que soient les données
+
+        Retourne (key, entry) ou None: point de départ d'un réentraînement incrémental.
+        """
+        with self._lock:
+            for (coin, key), entry in reversed(self._memory.items()):
+                if coin == coin_id:
+                    return key, entry
+
+        try:
+            fichiers = self._fichiers(coin_id, '.pkl')
+        except OSError:
+            return None
+        if not fichiers:
+            return None
+
+        try:
+            with open(max(fichiers, key=os.path.getmtime), 'rb') as f:
+                stored = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        return stored['key'], stored['entry']
+
+    def latest_compact(self, coin_id):
+        """Dernier modèle de la crypto au format compact (memmap, sans scikit-learn)
+
+        Retourne (model, scaler, metrics) ou None (pas d'artefact compact).
+        """
+        try:
+            fichiers = self._fichiers(coin_id, '.cmdl')
+            path = max(fichiers, key=os.path.getmtime) if fichiers else None
+            mtime = os.path.getmtime(path) if path else None
+        except OSError:
+            return None
+        if path is None:
+            return None
+
+        with self._lock:
+            cached = self._compacts.get(coin_id)
+            if cached is not None and cached[:2] == (path, mtime):
+                return cached[2]
+
+        try:
+            entry = compact_model.load(path)
+        except Exception as e:
+            print(f"⚠️  Store modèles: artefact compact illisible ({e})")
+            return None
+        # Gros lots: le modèle picklé du même entraînement (chargé à la demande)
+        entry[0].fallback = lambda: self._modele_pickle(path[:-len('.cmdl')] + '.pkl')
+
+        with self._lock:
+            self._compacts[coin_id] = (path, mtime, entry)
+            self.compact_loads += 1
+        return entry
+
+    def _modele_pickle(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)['entry'][0]
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+            return None
+
+    def put(self, coin_id, key, entry):
+        """Enregistre un modèle entraîné (mémoire + disque)"""
+        self._remember(coin_id, key, entry)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # Une seule version par crypto sur disque: les anciennes données ne reviennent pas
+            # (_fichiers: nom exact, 'foo' ne supprime pas les modèles de 'foo_bar')
+            for fichier in self._fichiers(coin_id, '.pkl') + self._fichiers(coin_id, '.cmdl'):
+                os.remove(fichier)
+
+            path = self._path(coin_id, key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump({'key': key, 'entry': entry}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+            if self.compact:
+                try:
+                    if compact_model.supports(entry[0]):
+                        compact_model.save(self._path(coin_id, key, '.cmdl'), *entry)
+                except Exception as e:
+                    print(f"⚠️  Store modèles: export compact impossible ({e})")
+
+            self._evict_disk()
+        except OSError as e:
+            print(f"⚠️  Store modèles: sauvegarde impossible ({e})")
+
+    def _remember(self, coin_id, key, entry):
+        with self._lock:
+            # Une seule version par crypto en mémoire aussi
+            for cached in [k for k in self._memory if k[0] == coin_id and k[1] != key]:
+                del self._memory[cached]
+
+            self._memory[(coin_id, key)] = entry
+            self._memory.move_to_end((coin_id, key))
+
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        fichiers = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith('.pkl')]
+        if len(fichiers) <= self.max_disk_entries:
+            return
+
+        fichiers.sort(key=os.path.getmtime)
+        for fichier in fichiers[:len(fichiers) - self.max_disk_entries]:
+            for path in (fichier, fichier[:-len('.pkl')] + '.cmdl'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self._memory),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'compact_loads': self.compact_loads,
+            'hit_ratio': round((self.hits + self.disk_hits) / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage OHLC colonnaire binaire
+Un bloc = en-tête de 64 octets + une colonne par champ, à type fixe:
+    timestamp int64 | open, high, low, close float64   (little-endian)
+
+    b'COHL' | version (uint8) | 3 octets vides | length (uint64) | capacity (uint64) | ...
+    colonne i à l'offset 64 + i * capacity * 8
+
+La capacité réservée permet d'ajouter des bougies en place; les fichiers
+sont lus par np.memmap, sans parsing ni copie.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'COHL'
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct('<4sB3xQQ')
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close')
+DTYPES = ('<i8', '<f8', '<f8', '<f8', '<f8')
+
+
+class OhlcColumns:
+    """Vue colonnaire d'une série OHLC (tableaux numpy, éventuellement mmap)
+
+    Se comporte comme les listes [timestamp, o, h, l, c] là où elles étaient
+    attendues: len(), itération par bougie et np.array(...) → (n, 5) float64.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(self, timestamp, open, high, low, close):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 5)
+        return cls(rows[:, 0].astype(np.int64), *(np.ascontiguousarray(rows[:, i]) for i in range(1, 5)))
+
+    def columns(self):
+        return [getattr(self, name) for name in COLUMNS]
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("OhlcColumns ne supporte que le découpage par tranche")
+        return OhlcColumns(*(column[index] for column in self.columns()))
+
+    def __array__(self, dtype=None, copy=None):
+        rows = np.column_stack([column.astype(np.float64, copy=False) for column in self.columns()])
+        return rows if dtype is None else rows.astype(dtype, copy=False)
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+    def to_rows(self):
+        """Listes Python [timestamp, o, h, l, c] (sérialisation JSON)"""
+        rows = np.asarray(self).tolist()
+        for row in rows:
+            row[0] = int(row[0])
+        return rows
+
+
+def as_columns(ohlc_data):
+    """Accepte OhlcColumns, liste de bougies ou tableau (n, 5)"""
+    if isinstance(ohlc_data, OhlcColumns):
+        return ohlc_data
+    return OhlcColumns.from_rows(ohlc_data)
+
+
+def encoder(ohlc_data, capacity=None):
+    """Bloc colonnaire (bytes) pour une série, avec capacité réservée optionnelle"""
+    columns = as_columns(ohlc_data)
+    length = len(columns)
+    capacity = max(capacity or length, length)
+
+    buffer = bytearray(HEADER_SIZE + len(COLUMNS) * capacity * 8)
+    _HEADER.pack_into(buffer, 0, MAGIC, VERSION, length, capacity)
+
+    for i, (column, dtype) in enumerate(zip(columns.columns(), DTYPES)):
+        offset = HEADER_SIZE + i * capacity * 8
+        buffer[offset:offset + length * 8] = np.ascontiguousarray(column, dtype=dtype).tobytes()
+
+    return bytes(buffer)
+
+
+def lire_entete(buffer, offset=0):
+    magic, version, length, capacity = _HEADER.unpack_from(buffer, offset)
+    if magic != MAGIC:
+        raise Exception("Bloc OHLC colonnaire invalide")
+    if version != VERSION:
+        raise Exception(f"Version de bloc OHLC non supportée ({version})")
+    return length, capacity
+
+
+def taille_bloc(buffer, offset=0):
+    _, capacity = lire_entete(buffer, offset)
+    return HEADER_SIZE + len(COLUMNS) * capacity * 8
+
+
+def decoder(buffer, offset=0):
+    """Vues numpy sur un bloc (bytes, bytearray, mmap...), sans copie"""
+    length, capacity = lire_entete(buffer, offset)
+    return OhlcColumns(*(
+        np.frombuffer(buffer, dtype=dtype, count=length, offset=offset + HEADER_SIZE + i * capacity * 8)
+        for i, dtype in enumerate(DTYPES)
+    ))
+
+
+class OhlcFile:
+    """Fichier OHLC colonnaire: lecture par memmap, ajout en place"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def read(self):
+        """Colonnes mappées en mémoire (lecture seule, zéro copie)"""
+        if not self.exists() or os.path.getsize(self.path) < HEADER_SIZE:
+            return OhlcColumns.from_rows([])
+        return decoder(np.memmap(self.path, dtype=np.uint8, mode='r'))
+
+    def write(self, ohlc_data, capacity=None):
+        """Réécrit le fichier (écriture atomique)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(encoder(ohlc_data, capacity))
+        os.replace(tmp, self.path)
+
+    def append(self, ohlc_data):
+        """Ajoute des bougies en fin de fichier (capacité doublée si nécessaire)"""
+        self.write_from(None, ohlc_data)
+
+    def write_from(self, index, ohlc_data):
+        """Écrit des bougies à partir de la position index (None = fin), en place
+
+        Les bougies au-delà de index sont remplacées (ex: bougie du jour révisée).
+        """
+        new = as_columns(ohlc_data)
+
+        if not self.exists():
+            if len(new):
+                self.write(new, capacity=max(64, 2 * len(new)))
+            return
+
+        with open(self.path, 'r+b') as f:
+            length, capacity = lire_entete(f.read(HEADER_SIZE))
+            index = length if index is None else min(index, length)
+            total = index + len(new)
+
+            if total > capacity:
+                current = self.read()[:index]
+                merged = OhlcColumns(*(
+                    np.concatenate([old, added]) for old, added in zip(current.columns(), new.columns())
+                ))
+                self.write(merged, capacity=max(2 * capacity, total))
+                return
+
+            for i, (column, dtype) in enumerate(zip(new.columns(), DTYPES)):
+                f.seek(HEADER_SIZE + (i * capacity + index) * 8)
+                f.write(np.ascontiguousarray(column, dtype=dtype).tobytes())
+
+            # L'en-tête est mis à jour en dernier: un lecteur ne voit que des bougies complètes
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, total, capacity))
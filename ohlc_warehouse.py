@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Entrepôt local d'historiques OHLC (un fichier colonnaire par crypto)
+    ohlc/<coin_id>.ohlc   (format ohlc_store, bougies journalières triées)
+
+Le collecteur ne télécharge que les bougies plus récentes que la dernière
+stockée; les données des fournisseurs sont ramenées au jour UTC,
+dédupliquées et fusionnées par timestamp (la plus récente gagne).
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from ohlc_store import OhlcColumns, OhlcFile, as_columns
+
+try:
+    import fcntl
+except ImportError:  # Windows: verrou entre threads uniquement
+    fcntl = None
+
+JOUR_MS = 24 * 60 * 60 * 1000
+
+
+def normaliser_journalier(ohlc_data):
+    """Bougies triées, une par jour UTC (plusieurs bougies du même jour agrégées)
+
+    Ex: les bougies 4h de CoinGecko → open du premier, high max, low min, close du dernier.
+    """
+    data = as_columns(ohlc_data)
+    valides = np.isfinite(data.close) & (data.close > 0)
+    timestamp = np.asarray(data.timestamp, dtype=np.int64)[valides]
+    if not len(timestamp):
+        return OhlcColumns.from_rows([])
+
+    ordre = np.argsort(timestamp, kind='stable')
+    jours = timestamp[ordre] // JOUR_MS * JOUR_MS
+    open_, high, low, close = (np.asarray(c, dtype=np.float64)[valides][ordre]
+                               for c in (data.open, data.high, data.low, data.close))
+
+    debuts = np.flatnonzero(np.r_[True, jours[1:] != jours[:-1]])
+    fins = np.r_[debuts[1:], len(jours)] - 1
+
+    return OhlcColumns(
+        jours[debuts],
+        open_[debuts],
+        np.maximum.reduceat(high, debuts),
+        np.minimum.reduceat(low, debuts),
+        close[fins],
+    )
+
+
+def _fusion_complete(actuel, nouveau):
+    """Union triée par timestamp, le nouveau l'emporte en cas de doublon"""
+    colonnes = [np.concatenate([a, n]) for a, n in zip(actuel.columns(), nouveau.columns())]
+    ordre = np.argsort(colonnes[0], kind='stable')
+    colonnes = [c[ordre] for c in colonnes]
+    derniers = np.r_[colonnes[0][1:] != colonnes[0][:-1], True]
+    return OhlcColumns(*(c[derniers] for c in colonnes))
+
+
+class OhlcWarehouse:
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get('OHLC_WAREHOUSE_DIR', 'ohlc')
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._backfills = set()
+
+        self.appended = 0
+        self.revised = 0
+        self.rewrites = 0
+
+    def _fichier(self, coin_id):
+        return OhlcFile(os.path.join(self.directory, f"{coin_id}.ohlc"))
+
+    @contextmanager
+    def _verrou(self, coin_id):
+        """Un seul écrivain par crypto (threads, et processus via flock si disponible)"""
+        with self._lock:
+            lock = self._locks.setdefault(coin_id, threading.Lock())
+
+        with lock:
+            if fcntl is None:
+                yield
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{coin_id}.lock"), 'w') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def historique(self, coin_id, days=None, copy=True):
+        """Dernières bougies stockées (toutes si days=None)
+
+        copy=False retourne des vues mmap: la bougie du jour peut être révisée
+        en place par un écrivain concurrent.
+        """
+        data = self._fichier(coin_id).read()
+        if days is not None:
+            data = data[-days:] if days > 0 else data[:0]
+        if copy:
+            data = OhlcColumns(*(np.array(c) for c in data.columns()))
+        return data
+
+    def etendue(self, coin_id):
+        """(premier, dernier) timestamp stockés, (None, None) si vide"""
+        timestamps = self._fichier(coin_id).read().timestamp
+        if not len(timestamps):
+            return None, None
+        return int(timestamps[0]), int(timestamps[-1])
+
+    def premier_backfill(self, coin_id, days):
+        """True la première fois (par processus) qu'un historique de days jours est
+        rattrapé: une crypto récente n'a pas plus d'historique à redemander ensuite"""
+        with self._lock:
+            if (coin_id, days) in self._backfills:
+                return False
+            self._backfills.add((coin_id, days))
+            return True
+
+    def fusionner(self, coin_id, ohlc_data, depuis=None):
+        """Intègre des bougies téléchargées, retourne le nombre de bougies ajoutées
+
+        Cas courant (bougies qui prolongent la fin stockée): réécriture en place
+        de la queue révisée + ajout. Sinon (trou comblé, données plus anciennes):
+        fusion complète et réécriture atomique.
+
+        depuis (téléchargement incrémental): les bougies antérieures sont
+        ignorées, un jour clos déjà stocké n'est jamais révisé.
+        """
+        nouveau = normaliser_journalier(ohlc_data)
+        if depuis is not None:
+            nouveau = nouveau[int(np.searchsorted(nouveau.timestamp, depuis)):]
+        if not len(nouveau):
+            return 0
+
+        with self._verrou(coin_id):
+            fichier = self._fichier(coin_id)
+            actuel = fichier.read()
+
+            if not len(actuel):
+                fichier.write(nouveau, capacity=max(64, 2 * len(nouveau)))
+                with self._lock:
+                    self.appended += len(nouveau)
+                return len(nouveau)
+
+            index = int(np.searchsorted(actuel.timestamp, nouveau.timestamp[0]))
+            queue = actuel[index:]
+            k = len(queue)
+
+            if k <= len(nouveau) and np.array_equal(queue.timestamp, nouveau.timestamp[:k]):
+                inchangees = all(np.array_equal(a, n[:k]) for a, n in zip(queue.columns(), nouveau.columns()))
+                ajoutees = len(nouveau) - k
+                if inchangees:
+                    if not ajoutees:
+                        return 0
+                    fichier.write_from(len(actuel), nouveau[k:])
+                else:
+                    fichier.write_from(index, nouveau)
+                with self._lock:
+                    self.appended += ajoutees
+                    self.revised += 0 if inchangees else 1
+                return ajoutees
+
+            fusion = _fusion_complete(actuel, nouveau)
+            ajoutees = len(fusion) - len(actuel)
+            fichier.write(fusion, capacity=max(64, 2 * len(fusion)))
+            with self._lock:
+                self.appended += ajoutees
+                self.rewrites += 1
+            return ajoutees
+
+    def stats(self):
+        with self._lock:
+            return {
+                'appended': self.appended,
+                'revised': self.revised,
+                'rewrites': self.rewrites,
+            }
+
+
+_shared_warehouse = None
+_shared_lock = threading.Lock()
+
+
+def entrepot_partage():
+    """Instance d'entrepôt unique par processus"""
+    global _shared_warehouse
+    with _shared_lock:
+        if _shared_warehouse is None:
+            _shared_warehouse = OhlcWarehouse()
+        return _shared_warehouse
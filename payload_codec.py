@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Format binaire compact pour transmettre une collecte au modèle
+    b'CPAY' | version (1 octet) | taille de l'en-tête (uint32 LE)
+    | en-tête JSON (coin_id, market_data, source, timestamp...)
+    | bourrage jusqu'à un multiple de 8
+    | bloc OHLC colonnaire (voir ohlc_store)
+
+Le décodage ne parse que le petit en-tête: les OHLC sont des vues numpy
+directement sur le buffer (ou sur le fichier mappé en mémoire).
+"""
+
+import json
+import struct
+
+import numpy as np
+
+import ohlc_store
+
+MAGIC = b'CPAY'
+VERSION = 2
+_PREFIX = struct.Struct('<4sBI')
+
+
+def encoder(data):
+    """dict de collecte → bytes"""
+    header = {k: v for k, v in data.items() if k != 'ohlc'}
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    prefix = _PREFIX.pack(MAGIC, VERSION, len(header_bytes)) + header_bytes
+    padding = b'\0' * (-len(prefix) % 8)
+
+    return prefix + padding + ohlc_store.encoder(data.get('ohlc', []))
+
+
+def est_binaire(raw):
+    return raw[:4] == MAGIC
+
+
+def decoder(raw):
+    """bytes → dict de collecte ('ohlc' en OhlcColumns, sans copie)"""
+    magic, version, header_len = _PREFIX.unpack_from(raw, 0)
+    if magic != MAGIC:
+        raise Exception("Format binaire inconnu")
+
+    offset = _PREFIX.size
+    header = json.loads(bytes(raw[offset:offset + header_len]).decode('utf-8'))
+    offset += header_len
+
+    if version == 1:
+        # v1: OHLC en lignes float64 [timestamp, o, h, l, c]
+        rows = header.pop('rows')
+        header['ohlc'] = np.frombuffer(raw, dtype='<f8', count=rows * 5, offset=offset).reshape(rows, 5)
+        return header
+
+    if version != VERSION:
+        raise Exception(f"Version de format non supportée ({version})")
+
+    offset += -offset % 8
+    header['ohlc'] = ohlc_store.decoder(raw, offset)
+    return header
+
+
+def charger(path):
+    """Décode un fichier en le mappant en mémoire (OHLC lus sans copie)"""
+    return decoder(np.memmap(path, dtype=np.uint8, mode='r'))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèle mutualisé multi-cryptos
+Un seul entraînement pour tout un univers de cryptos au lieu d'un petit
+modèle par crypto (~23 paires sur 30 jours): les historiques sont empilés
+en un tenseur (cryptos × temps × features) calculé en une passe, avec des
+features normalisées par crypto (rendements, ratios au prix, RSI...) pour
+que des cryptos de prix très différents partagent le même modèle.
+
+Cible: log-rendement à horizon jours; le prix brut (dernière clôture ×
+exp(rendement prédit)) passe ensuite par les mêmes contraintes que
+ai_model_v3 (clip_prediction, signal, confiance).
+
+    predictions, errors, info = predict_universe({coin_id: collecte, ...}, store=ModelStore())
+"""
+
+import numpy as np
+
+import ai_model_v3
+import instrumentation
+from model_store import fingerprint
+from ohlc_store import as_columns
+from ohlc_warehouse import JOUR_MS
+
+POOLED_VERSION = f"{ai_model_v3.MODEL_VERSION}-pooled"
+# Identifiant du modèle mutualisé dans le ModelStore
+POOLED_ID = '_pooled'
+MIN_CANDLES = 30
+
+# Features sans unité de prix (comparables d'une crypto à l'autre)
+POOLED_FEATURES = [
+    'open_ratio', 'high_ratio', 'low_ratio',
+    'return_1', 'momentum_7', 'momentum_14',
+    'price_to_sma7', 'price_to_sma14', 'price_to_sma30',
+    'rsi', 'macd', 'macd_signal', 'macd_hist',
+    'bb_position', 'bb_width', 'volatility', 'atr',
+]
+
+
+def _par_jour(ohlc_data):
+    """(jours UTC triés, colonnes [open, high, low, close]) des bougies valides, une par jour"""
+    ohlc = as_columns(ohlc_data)
+    jours = np.asarray(ohlc.timestamp, dtype=np.int64) // JOUR_MS * JOUR_MS
+    colonnes = np.column_stack([np.asarray(c, dtype=np.float64) for c in (ohlc.open, ohlc.high, ohlc.low, ohlc.close)])
+    valides = (colonnes[:, 3] > 0) & np.isfinite(colonnes).all(axis=1)
+    jours, colonnes = jours[valides], colonnes[valides]
+
+    ordre = np.argsort(jours, kind='stable')
+    jours, colonnes = jours[ordre], colonnes[ordre]
+    derniers = np.r_[jours[1:] != jours[:-1], True]
+    return jours[derniers], colonnes[derniers]
+
+
+def build_tensor(donnees, window=None):
+    """Empile les OHLC des cryptos sur des dates communes (alignées par jour UTC)
+
+    Grille: jours présents chez au moins la moitié des cryptos. Chaque crypto
+    doit couvrir sans trou les derniers jours de la grille: une crypto en
+    retard, trouée ou amputée de bougies invalides sur moins de MIN_CANDLES
+    jours alignés est écartée (erreur), sinon la fenêtre commune s'arrête à son
+    premier trou. Une ligne de temps du tenseur = une même date pour toutes.
+
+    Retourne (coin_ids, dates (temps,), ohlc (cryptos, temps, 4) [open, high,
+    low, close], closes de chaque crypto jusqu'à la dernière date, {coin_id: erreur}).
+    """
+    series, erreurs = {}, {}
+    for coin_id, data in donnees.items():
+        jours, colonnes = _par_jour(data['ohlc'])
+        if len(colonnes) < MIN_CANDLES:
+            erreurs[coin_id] = f"Pas assez de données valides ({len(colonnes)}, minimum {MIN_CANDLES})"
+            continue
+        series[coin_id] = (jours, colonnes)
+
+    vide = [], np.empty(0, dtype=np.int64), np.empty((0, 0, 4)), {}, erreurs
+    if not series:
+        return vide
+
+    tous, comptes = np.unique(np.concatenate([jours for jours, _ in series.values()]), return_counts=True)
+    grille = tous[comptes * 2 >= len(series)]
+
+    # Jours de la grille couverts sans trou, en partant du plus récent
+    alignes = {}
+    for coin_id, (jours, _) in list(series.items()):
+        manquants = np.flatnonzero(~np.isin(grille, jours))
+        alignes[coin_id] = len(grille) - 1 - manquants[-1] if len(manquants) else len(grille)
+        if alignes[coin_id] < MIN_CANDLES:
+            erreurs[coin_id] = (f"Dates communes insuffisantes ({alignes[coin_id]} jours alignés "
+                                f"sur l'univers, minimum {MIN_CANDLES})")
+            del series[coin_id]
+    if not series:
+        return vide
+
+    longueur = min(alignes[c] for c in series)
+    if window:
+        longueur = min(longueur, max(window, MIN_CANDLES))
+    dates = grille[-longueur:]
+
+    coin_ids = list(series)
+    ohlc = np.stack([series[c][1][np.searchsorted(series[c][0], dates)] for c in coin_ids])
+    # Historique de chaque crypto jusqu'à la dernière date commune (volatilité de clip_prediction)
+    closes = {c: series[c][1][:np.searchsorted(series[c][0], dates[-1]) + 1, 3] for c in coin_ids}
+    return coin_ids, dates, ohlc, closes, erreurs
+
+
+def _par_crypto(values, fn):
+    """Applique une opération pandas colonne par colonne (une colonne = une crypto)"""
+    import pandas as pd
+    return fn(pd.DataFrame(values.T)).to_numpy(dtype=np.float64).T
+
+
+def _decale(values, k):
+    """values[t - k] (NaN avant le début)"""
+    out = np.full_like(values, np.nan)
+    out[:, k:] = values[:, :-k]
+    return out
+
+
+@instrumentation.timed()
+def pooled_features(ohlc):
+    """Tenseur (cryptos, temps, features) normalisé par crypto, en une passe vectorisée"""
+    o, h, l, c = (ohlc[..., i] for i in range(4))
+
+    def rolling_mean(values, window):
+        return _par_crypto(values, lambda df: df.rolling(window=window, min_periods=1).mean())
+
+    def rolling_std(values, window):
+        return _par_crypto(values, lambda df: df.rolling(window=window, min_periods=1).std())
+
+    def ema(values, span):
+        return _par_crypto(values, lambda df: df.ewm(span=span, adjust=False).mean())
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = c / _decale(c, 1) - 1
+        macd = ema(c, 12) - ema(c, 26)
+        macd_signal = ema(macd, 9)
+
+        sma_20, std_20 = rolling_mean(c, 20), rolling_std(c, 20)
+        bb_lower, bb_width = sma_20 - 2 * std_20, 4 * std_20
+
+        c_prev = _decale(c, 1)
+        tr = np.fmax(h - l, np.fmax(np.abs(h - c_prev), np.abs(l - c_prev)))
+
+        features = np.stack([
+            o / c - 1, h / c - 1, l / c - 1,
+            returns, c / _decale(c, 7) - 1, c / _decale(c, 14) - 1,
+            c / rolling_mean(c, 7), c / rolling_mean(c, 14), c / rolling_mean(c, 30),
+            ai_model_v3.calculate_rsi(c, 14) / 100.,
+            macd / c, macd_signal / c, (macd - macd_signal) / c,
+            (c - bb_lower) / bb_width, bb_width / c,
+            rolling_std(returns, 14), rolling_mean(tr, 14) / c,
+        ], axis=-1)
+
+    # ✅ NETTOYAGE: inf → NaN, ffill/bfill dans le temps (par crypto), puis 0
+    features[~np.isfinite(features)] = np.nan
+    for i in range(features.shape[-1]):
+        features[..., i] = _par_crypto(features[..., i], lambda df: df.ffill().bfill())
+    return np.nan_to_num(features, nan=0.)
+
+
+def pooled_supervised(features, closes, horizon):
+    """Paires (features[c, t], log(close[c, t + horizon] / close[c, t])) rangées par date
+
+    Lignes en ordre temporel (toutes les cryptos d'un jour, puis le jour suivant):
+    le split 80/20 de train_model reste temporel.
+    """
+    n = features.shape[1] - horizon
+    X = features[:, :n].transpose(1, 0, 2).reshape(-1, features.shape[-1])
+    y = np.log(closes[:, horizon:horizon + n] / closes[:, :n]).T.ravel()
+    return X, y
+
+
+def _metriques_par_crypto(model, scaler, X, y, closes, coin_ids, horizon):
+    """Métriques test en prix par crypto (même définition que ai_model_v3._evaluer)"""
+    n_coins = len(coin_ids)
+    # Premier jour entièrement hors de la partie train de train_model
+    debut = -(-int(len(X) * 0.80) // n_coins) * n_coins
+    predit = model.predict(scaler.transform(X[debut:])).reshape(-1, n_coins)
+    reel = y[debut:].reshape(-1, n_coins)
+
+    n = closes.shape[1] - horizon
+    base = closes[:, n - predit.shape[0]:n].T
+    prix_predit, prix_reel = base * np.exp(predit), base * np.exp(reel)
+
+    metriques = {}
+    for i, coin_id in enumerate(coin_ids):
+        p, r = prix_predit[:, i], prix_reel[:, i]
+        residus = np.sum((r - p) ** 2)
+        total = np.sum((r - r.mean()) ** 2)
+        r2 = 1 - residus / total if total > 0 else 0.
+        metriques[coin_id] = {
+            'r2_test': max(0., float(r2)),
+            'mae': float(np.mean(np.abs(r - p))),
+            'rmse': float(np.sqrt(np.mean((r - p) ** 2))),
+            'mape': float(np.mean(np.abs((r - p) / np.maximum(r, 1))) * 100),
+        }
+    return metriques
+
+
+@instrumentation.timed()
+def train_pooled(ohlc, features, coin_ids, store=None, backend=None, horizon=ai_model_v3.DEFAULT_HORIZON, dates=None):
+    """Un modèle pour toutes les cryptos: (model, scaler, metrics), depuis le store si inchangé
+
+    Clé sur les dates clôturées (comme prediction_cache.input_key): la bougie
+    du jour, encore en formation, ne déclenche pas de réentraînement.
+    """
+    backend, _ = ai_model_v3.get_backend(backend, load=False)
+    params = ai_model_v3.model_params(None, backend)
+    closes = ohlc[..., 3]
+
+    X, y = pooled_supervised(features, closes, horizon)
+    if len(X) // len(coin_ids) < ai_model_v3.MIN_HORIZON_SAMPLES:
+        raise Exception(f"Fenêtre commune trop courte pour l'horizon {horizon} jours")
+
+    store_id = POOLED_ID if horizon == ai_model_v3.DEFAULT_HORIZON else f"{POOLED_ID}.h{horizon}"
+    derniere = int(dates[-1]) if dates is not None and len(dates) else None
+    key = fingerprint(ohlc[:, :-1], dict(params, backend=backend, horizon=horizon, coins=coin_ids,
+                                         last_candle=derniere), POOLED_VERSION)
+    cached = store.get(store_id, key) if store is not None else None
+    if cached is not None:
+        print("⚡ Modèle mutualisé en cache (données inchangées), pas de réentraînement")
+        return cached
+
+    print(f"🧺 Modèle mutualisé: {len(coin_ids)} cryptos, {len(X)} paires")
+    model, scaler, metrics = ai_model_v3.train_model(X, y, backend, params)
+    # Métriques de train_model en log-rendement: MAPE sans objet (division par max(y, 1))
+    metrics.pop('mape', None)
+    metrics['training']['mode'] = 'pooled'
+    metrics['training']['coins'] = len(coin_ids)
+    metrics['per_coin'] = _metriques_par_crypto(model, scaler, X, y, closes, coin_ids, horizon)
+    ai_model_v3.training_stats['full'] += 1
+
+    if store is not None:
+        store.put(store_id, key, (model, scaler, metrics))
+    return model, scaler, metrics
+
+
+def predict_universe(donnees, store=None, backend=None, horizon=ai_model_v3.DEFAULT_HORIZON, window=None):
+    """Prédictions de toutes les cryptos depuis un seul entraînement
+
+    donnees: {coin_id: collecte (ohlc, market_data)}. Retourne
+    (predictions {coin_id: prédiction}, erreurs {coin_id: message}, infos du modèle).
+    """
+    coin_ids, dates, ohlc, closes_completes, erreurs = build_tensor(donnees, window)
+    if len(coin_ids) < 2:
+        raise Exception("Modèle mutualisé: au moins 2 cryptos avec assez de données requises")
+
+    features = pooled_features(ohlc)
+    closes = ohlc[..., 3]
+    model, scaler, metrics = train_pooled(ohlc, features, coin_ids, store, backend, horizon, dates=dates)
+
+    # ✅ Inférence en un seul appel pour toutes les cryptos (dernière bougie de chacune)
+    rendements = model.predict(scaler.transform(features[:, -1]))
+    model_type = ('Pooled Histogram Gradient Boosting V3'
+                  if getattr(model, 'estimator_name', type(model).__name__) == 'HistGradientBoostingRegressor'
+                  else 'Pooled Gradient Boosting V3')
+
+    predictions = {}
+    for i, coin_id in enumerate(coin_ids):
+        metriques = dict(metrics['per_coin'][coin_id], training=metrics['training'])
+        brut = float(closes[i, -1] * np.exp(rendements[i]))
+        try:
+            predictions[coin_id] = ai_model_v3.build_prediction(
+                brut, closes_completes[coin_id], donnees[coin_id].get('market_data', {}), coin_id,
+                metriques, horizon=horizon, model_type=model_type
+            )
+        except Exception as e:
+            erreurs[coin_id] = str(e)
+
+    infos = {
+        'coins': len(coin_ids),
+        'window': int(ohlc.shape[1]),
+        'features': len(POOLED_FEATURES),
+        'backend': metrics['training']['backend'],
+        # Moyenne des métriques en prix par crypto (comparables aux modèles par crypto)
+        'metrics': {k: float(np.mean([metrics['per_coin'][c][k] for c in coin_ids]))
+                    for k in ('r2_test', 'mae', 'rmse', 'mape')},
+        # Métriques de train_model sur la cible elle-même (log-rendement, pas de MAPE)
+        'log_return_metrics': {k: float(metrics[k]) for k in ('r2_test', 'mae', 'rmse')},
+    }
+    return predictions, erreurs, infos
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache des résultats de prédiction (JSON final de run_pipeline)
+Indexé par crypto + empreinte des entrées (bougies clôturées, hyperparamètres,
+horizons, version du modèle). La bougie du jour, encore en formation, est
+exclue de l'empreinte: ses variations sont couvertes par la dérive du prix.
+
+Une entrée est invalidée quand le prix actuel s'éloigne du prix de référence
+de plus de PREDICTION_CACHE_DRIFT × la largeur de la plage de contrainte
+(clip_prediction), ou après PREDICTION_CACHE_TTL secondes.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from model_store import fingerprint
+from ohlc_store import as_columns
+
+
+def input_key(ohlc_data, params, version=''):
+    """Empreinte des bougies clôturées et de l'horodatage de la bougie en cours"""
+    ohlc = as_columns(ohlc_data)
+    derniere = int(ohlc.timestamp[-1]) if len(ohlc) else None
+    return fingerprint(ohlc[:-1], dict(params, last_candle=derniere), version)
+
+
+class PredictionCache:
+    def __init__(self, max_entries=None, drift=None, ttl=None):
+        self.max_entries = max_entries or int(os.environ.get('PREDICTION_CACHE_MAX', 256))
+        self.drift = drift if drift is not None else float(os.environ.get('PREDICTION_CACHE_DRIFT', 0.1))
+        self.ttl = ttl if ttl is not None else float(os.environ.get('PREDICTION_CACHE_TTL', 900))
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.drifted = 0
+
+    def get(self, coin_id, key, current_price):
+        """Copie de la prédiction en cache, ou None (absente, expirée ou prix trop éloigné)
+
+        La copie porte cache_age_seconds: ses prix et son horodatage datent du calcul.
+        """
+        with self._lock:
+            entry = self._memory.get((coin_id, key))
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.time() - entry['stored'] > self.ttl:
+                del self._memory[(coin_id, key)]
+                self.expired += 1
+                return None
+
+            # ✅ Prix actuel trop éloigné du prix de référence (relatif à la plage de contrainte)
+            if abs(current_price - entry['current_price']) > self.drift * entry['band']:
+                del self._memory[(coin_id, key)]
+                self.drifted += 1
+                return None
+
+            self._memory.move_to_end((coin_id, key))
+            self.hits += 1
+            prediction = entry['prediction']
+            age = time.time() - entry['stored']
+
+        prediction = copy.deepcopy(prediction)
+        prediction['cache_age_seconds'] = round(age, 1)
+        return prediction
+
+    def put(self, coin_id, key, prediction, min_price, max_price):
+        entry = {
+            'prediction': copy.deepcopy(prediction),
+            'current_price': float(prediction['current_price']),
+            'band': float(max_price - min_price),
+            'stored': time.time(),
+        }
+        with self._lock:
+            self._memory[(coin_id, key)] = entry
+            self._memory.move_to_end((coin_id, key))
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.expired + self.drifted
+            return {
+                'entries': len(self._memory),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'drifted': self.drifted,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Worker de prédiction persistant
+Importe numpy/pandas/scikit-learn UNE SEULE FOIS (avant d'annoncer "ready",
+sauf WORKER_PRELOAD=0) puis traite des requêtes JSON encadrées (une par ligne)
+reçues sur stdin, réponses sur stdout.
+
+Protocole (JSON lines):
+    → {"id": 1, "action": "predict", "coin_id": "bitcoin"}
+    ← {"id": 1, "ok": true, "result": {...}}
+    ← {"id": 1, "ok": false, "error": "..."}
+
+Chaque réponse porte aussi les timings par étape de la requête ("timings"),
+à part du résultat. Options de requête: "profile": "cprofile"|"sample"
+(top des fonctions dans "profile"), "metrics": true (instantané JSON des
+métriques du worker dans "metrics", agrégé par le serveur Node).
+
+Action "infer": dernier modèle de la crypto au format compact (memmap,
+prédicteur numpy), sans entraînement: avec WORKER_PRELOAD=0, un worker
+dédié à l'inférence n'importe jamais pandas ni scikit-learn.
+
+Les logs (prints emoji) sont redirigés vers stderr pour ne pas polluer le protocole.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from collect_data_v5 import DataCollectorV5
+import ai_model_v3
+import batch_predict
+from model_store import ModelStore
+from prediction_cache import PredictionCache
+from market_cache import cache_partage
+from ohlc_warehouse import entrepot_partage
+from feature_engine import IncrementalFeatureEngine
+import instrumentation
+
+# Modèles entraînés partagés entre toutes les requêtes du worker
+model_store = ModelStore()
+# Résultats de prédiction resservis tant que les entrées et le prix n'ont pas bougé
+prediction_cache = PredictionCache()
+
+# Flux temps réel (LRU): coin_id → (moteur de features, clé du modèle, modèle, données marché, création)
+streams = OrderedDict()
+STREAM_MAX = int(os.environ.get('STREAM_MAX', 64))
+# Au-delà, le flux est réamorcé (nouvelle collecte, historique recalculé)
+STREAM_TTL = float(os.environ.get('STREAM_TTL', 3600))
+
+# Jauges exportées avec les métriques (ratios de cache...)
+instrumentation.add_collector('model_store', model_store.stats)
+instrumentation.add_collector('prediction_cache', prediction_cache.stats)
+instrumentation.add_collector('market_cache', lambda: cache_partage().stats())
+instrumentation.add_collector('ohlc_warehouse', lambda: entrepot_partage().stats())
+instrumentation.add_collector('training', lambda: dict(ai_model_v3.training_stats))
+instrumentation.add_collector('streams', lambda: {'active': len(streams)})
+
+
+def predire(coin_id, days=30, horizons=None, refresh=False):
+    """Collecte + préparation + entraînement + prédiction pour une crypto"""
+    collector = DataCollectorV5(coin_id, days=days)
+    data = collector.collecter_donnees()
+
+    return ai_model_v3.run_pipeline(
+        data['ohlc'],
+        data.get('market_data', {}),
+        data.get('coin_id', coin_id),
+        store=model_store,
+        horizons=horizons,
+        cache=prediction_cache,
+        refresh=refresh
+    )
+
+
+def action_predict(requete):
+    coin_id = requete.get('coin_id')
+    if not coin_id:
+        raise Exception("coin_id manquant")
+    horizons = [int(h) for h in requete.get('horizons') or []]
+    return predire(coin_id, days=int(requete.get('days', 30)), horizons=horizons,
+                   refresh=bool(requete.get('refresh')))
+
+
+def action_infer(requete):
+    coin_id = requete.get('coin_id')
+    if not coin_id:
+        raise Exception("coin_id manquant")
+    data = DataCollectorV5(coin_id, days=int(requete.get('days', 30))).collecter_donnees()
+    return ai_model_v3.infer(data['ohlc'], data.get('market_data', {}), data.get('coin_id', coin_id),
+                             store=model_store)
+
+
+def action_stream(requete):
+    """Ajoute une bougie au flux d'une crypto et prédit sans recalculer l'historique
+
+    Le premier appel amorce le moteur (collecte + modèle), les suivants ne
+    coûtent qu'une mise à jour O(1) des indicateurs et une inférence. Le
+    modèle suit le store (réentraînement par une autre requête), le flux est
+    réamorcé après STREAM_TTL et les flux les moins récents sont évincés.
+    """
+    coin_id = requete.get('coin_id')
+    candle = requete.get('candle')
+    if not coin_id or not candle:
+        raise Exception("coin_id et candle requis")
+
+    stream = streams.get(coin_id)
+    if stream is None or time.time() - stream[4] > STREAM_TTL:
+        collector = DataCollectorV5(coin_id, days=int(requete.get('days', 30)))
+        data = collector.collecter_donnees()
+        ohlc_data = data['ohlc']
+
+        X_train, y_train, _, _, _, _ = ai_model_v3.prepare_data(ohlc_data)
+        model = ai_model_v3.get_model(X_train, y_train, ohlc_data, coin_id, model_store)
+        latest = model_store.latest(coin_id)
+        engine = IncrementalFeatureEngine.from_history(ohlc_data)
+        stream = (engine, latest[0] if latest else None, model, dict(data.get('market_data', {})), time.time())
+    else:
+        # Modèle réentraîné depuis l'amorçage: le flux passe au nouveau
+        latest = model_store.latest(coin_id)
+        if latest is not None and latest[0] != stream[1]:
+            stream = (stream[0], latest[0], latest[1]) + stream[3:]
+
+    streams[coin_id] = stream
+    streams.move_to_end(coin_id)
+    while len(streams) > STREAM_MAX:
+        streams.popitem(last=False)
+
+    engine, _, (model, scaler, metrics), market_data, _ = stream
+    engine.update(candle)
+    market_data['current_price'] = float(requete.get('current_price', candle[4]))
+
+    return ai_model_v3.make_prediction(
+        model, scaler, engine.features(), engine.close_prices(),
+        market_data, coin_id, metrics
+    )
+
+
+def action_batch(requete):
+    coin_ids = list(requete.get('coins') or [])
+    if requete.get('top'):
+        coin_ids += [c for c in batch_predict.charger_top_coins(int(requete['top'])) if c not in coin_ids]
+    if not coin_ids:
+        raise Exception("coins ou top requis")
+
+    return batch_predict.predire_lot(
+        coin_ids,
+        days=int(requete.get('days', 30)),
+        workers=requete.get('workers'),
+        pooled=bool(requete.get('pooled'))
+    )
+
+
+def action_ping(requete):
+    return {'pid': os.getpid(), 'timestamp': datetime.now().isoformat(),
+            'model_store': model_store.stats(),
+            'prediction_cache': prediction_cache.stats(),
+            'training': dict(ai_model_v3.training_stats),
+            'providers': DataCollectorV5.etat_fournisseurs(),
+            'market_cache': cache_partage().stats(),
+            'ohlc_warehouse': entrepot_partage().stats()}
+
+
+def action_metrics(requete):
+    """Métriques du worker: JSON et texte Prometheus"""
+    return {'pid': os.getpid(), 'json': instrumentation.snapshot(),
+            'prometheus': instrumentation.prometheus(worker=os.getpid())}
+
+
+ACTIONS = {
+    'predict': action_predict,
+    'infer': action_infer,
+    'stream': action_stream,
+    'batch': action_batch,
+    'ping': action_ping,
+    'metrics': action_metrics,
+}
+
+
+def traiter_requete(requete):
+    """Exécute une requête et construit la réponse encadrée"""
+    request_id = requete.get('id')
+    action = ACTIONS.get(requete.get('action', 'predict'))
+
+    if action is None:
+        return {'id': request_id, 'ok': False, 'error': f"Action inconnue: {requete.get('action')}"}
+
+    mode = requete.get('profile') or os.environ.get('PIPELINE_PROFILE')
+    start = time.time()
+    with instrumentation.request_timings() as timings:
+        try:
+            with instrumentation.profile(mode) if mode else contextlib.nullcontext() as profil:
+                result = action(requete)
+            reponse = {'id': request_id, 'ok': True, 'result': result}
+        except Exception as e:
+            profil = None
+            reponse = {'id': request_id, 'ok': False, 'error': str(e)}
+
+    reponse['duration_ms'] = int((time.time() - start) * 1000)
+    reponse['timings'] = timings
+    if profil is not None:
+        reponse['profile'] = profil.report()
+    if requete.get('metrics'):
+        reponse['metrics'] = instrumentation.snapshot()
+    return reponse
+
+
+def main():
+    # stdout est réservé au protocole, tout le reste part sur stderr
+    protocole = sys.stdout
+    sys.stdout = sys.stderr
+
+    def envoyer(message):
+        protocole.write(json.dumps(message) + '\n')
+        protocole.flush()
+
+    # Pile d'entraînement importée d'avance (imports différés dans ai_model_v3)
+    if os.environ.get('WORKER_PRELOAD', '1') != '0':
+        ai_model_v3.preload()
+
+    envoyer({'ready': True, 'pid': os.getpid()})
+
+    for ligne in sys.stdin:
+        ligne = ligne.strip()
+        if not ligne:
+            continue
+
+        try:
+            requete = json.loads(ligne)
+        except ValueError as e:
+            envoyer({'id': None, 'ok': False, 'error': f"JSON invalide: {e}"})
+            continue
+
+        envoyer(traiter_requete(requete))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recherche d'hyperparamètres (aléatoire + successive halving)
+Par crypto, ou par groupe de cryptos de volatilité proche (--clusters K).
+
+Les matrices de features de prepare_data sont calculées une fois par crypto
+et partagées par tous les essais; les évaluations (config × crypto ×
+nombre d'arbres) tournent sur tous les coeurs. Score: MAPE moyenne en
+validation temporelle (TimeSeriesSplit). La configuration actuelle est
+toujours candidate: le réglage retenu ne fait jamais moins bien qu'elle.
+
+Les meilleurs réglages sont écrits dans model_params.json, relu par
+ai_model_v3.model_params pour les prédictions de production:
+    {backend: {"default": {...}, "coins": {coin_id: {"params": {...}, ...}}}}
+
+Usage:
+    python tuning.py bitcoin ethereum --trials 27
+    python tuning.py --top 250 --clusters 8 --backend hist --default
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import RobustScaler
+
+import ai_model_v3
+from backtest import charger_historique
+
+# Espaces de recherche: (échelle, min, max); le nombre d'arbres est la ressource du halving
+SEARCH_SPACES = {
+    'gbr': {
+        'learning_rate': ('log', 0.01, 0.2),
+        'max_depth': ('int', 2, 6),
+        'min_samples_leaf': ('int', 2, 20),
+        'min_samples_split': ('int', 2, 30),
+        'subsample': ('float', 0.6, 1.0),
+    },
+    'hist': {
+        'learning_rate': ('log', 0.01, 0.2),
+        'max_depth': ('int', 2, 8),
+        'min_samples_leaf': ('int', 2, 30),
+        'l2_regularization': ('log', 1e-4, 1.0),
+    },
+}
+
+# Matrices (X, y) par crypto, transmises une fois à chaque processus
+_matrices = {}
+
+
+def _init_processus(matrices, threads):
+    global _matrices
+    _matrices = matrices
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=threads)
+
+
+def tirer(space, rng):
+    """Une configuration aléatoire de l'espace de recherche"""
+    config = {}
+    for name, (echelle, bas, haut) in space.items():
+        if echelle == 'int':
+            config[name] = int(rng.integers(bas, haut + 1))
+        elif echelle == 'log':
+            config[name] = float(math.exp(rng.uniform(math.log(bas), math.log(haut))))
+        else:
+            config[name] = float(rng.uniform(bas, haut))
+    return config
+
+
+def score_cv(X, y, backend, params, n_splits=3):
+    """MAPE moyenne (%) en validation temporelle, même prétraitement que train_model"""
+    _, (estimator, _, _, _) = ai_model_v3.get_backend(backend)
+    erreurs = []
+    for train, test in TimeSeriesSplit(n_splits=n_splits).split(X):
+        scaler = RobustScaler()
+        model = estimator(**params)
+        model.fit(scaler.fit_transform(X[train]), y[train])
+        pred = model.predict(scaler.transform(X[test]))
+        erreurs.append(np.mean(np.abs((y[test] - pred) / np.maximum(y[test], 1))) * 100)
+    return float(np.mean(erreurs))
+
+
+def _evaluer(tache):
+    """Exécuté dans un processus du pool: (config, crypto) → score"""
+    index, coin_id, backend, params = tache
+    X, y = _matrices[coin_id]
+    return index, coin_id, score_cv(X, y, backend, params)
+
+
+def matrices(coin_ids):
+    """(X, y) de prepare_data par crypto, et volatilité quotidienne (regroupement)"""
+    resultat, volatilites, erreurs = {}, {}, {}
+    for coin_id in coin_ids:
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                X, y, _, _, closes, _ = ai_model_v3.prepare_data(charger_historique(coin_id))
+        except Exception as e:
+            erreurs[coin_id] = str(e)
+            continue
+        resultat[coin_id] = (X, y)
+        volatilites[coin_id] = float(np.std(np.diff(np.log(closes[-365:]))))
+    return resultat, volatilites, erreurs
+
+
+def grouper(volatilites, k):
+    """k groupes de cryptos de volatilité proche (0 → une crypto par groupe)"""
+    ordre = sorted(volatilites, key=volatilites.get)
+    if k <= 0:
+        return [[coin_id] for coin_id in ordre]
+    return [list(groupe) for groupe in np.array_split(ordre, min(k, len(ordre))) if len(groupe)]
+
+
+def successive_halving(pool, groupe, backend, trials, eta, min_resource, max_resource, rng):
+    """Retourne (meilleurs params, score, score de la config actuelle, rungs)"""
+    _, (_, default_params, resource, _) = ai_model_v3.get_backend(backend)
+    space = SEARCH_SPACES[backend]
+
+    base = {name: default_params[name] for name in space if name in default_params}
+    configs = [base] + [tirer(space, rng) for _ in range(trials - 1)]
+    candidats = list(range(len(configs)))
+    n_arbres = min_resource
+    rungs = []
+
+    def evaluer(indices, n):
+        taches = [(i, coin_id, backend, dict(default_params, **configs[i], **{resource: n}))
+                  for i in indices for coin_id in groupe]
+        scores = {i: [] for i in indices}
+        for i, _, score in pool.map(_evaluer, taches):
+            scores[i].append(score)
+        return {i: float(np.mean(s)) for i, s in scores.items()}
+
+    while True:
+        scores = evaluer(candidats, n_arbres)
+        candidats.sort(key=scores.get)
+        rungs.append({'resource': n_arbres, 'configs': len(scores), 'best_mape': scores[candidats[0]]})
+        print(f"   🔎 {resource}={n_arbres}: {len(scores)} configs, meilleure MAPE {scores[candidats[0]]:.3f}%")
+
+        if n_arbres >= max_resource:
+            break
+        candidats = candidats[:max(1, len(candidats) // eta)]
+        n_arbres = min(max_resource, n_arbres * eta)
+
+    meilleur = candidats[0]
+    actuelle = evaluer([0], default_params[resource])[0]
+    params = dict(configs[meilleur], **{resource: n_arbres})
+
+    # La configuration actuelle reste si elle fait au moins aussi bien
+    if actuelle <= scores[meilleur]:
+        params = dict(base, **{resource: default_params[resource]})
+        return params, actuelle, actuelle, rungs
+    return params, scores[meilleur], actuelle, rungs
+
+
+def sauvegarder(path, backend, reglages, defaut=None):
+    """Fusionne les réglages dans model_params.json (écriture atomique)"""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+
+    section = data.setdefault(backend, {})
+    section.setdefault('coins', {}).update(reglages)
+    if defaut is not None:
+        section['default'] = defaut
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def tuner(coin_ids, backend=None, clusters=0, trials=27, eta=3, min_resource=50,
+          max_resource=400, workers=None, seed=42, default=False, output=None):
+    """Recherche par crypto ou par groupe, réglages persistés dans output"""
+    start = time.time()
+    backend, _ = ai_model_v3.get_backend(backend)
+    workers = workers or os.cpu_count() or 1
+    output = output or ai_model_v3.MODEL_PARAMS_FILE
+    rng = np.random.default_rng(seed)
+
+    print(f"📊 Features de {len(coin_ids)} cryptos (une fois pour tous les essais)...")
+    donnees, volatilites, erreurs = matrices(coin_ids)
+
+    groupes = grouper(volatilites, clusters)
+    if default and donnees:
+        groupes.append(sorted(donnees))
+
+    if workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_processus,
+                                       initargs=(donnees, threads))
+    else:
+        _init_processus(donnees, 1)
+        executor = ThreadPoolExecutor(max_workers=1)
+
+    reglages, defaut, resultats = {}, None, []
+    with executor as pool:
+        for n, groupe in enumerate(groupes):
+            est_defaut = default and n == len(groupes) - 1
+            print(f"🎛️  {'défaut' if est_defaut else ', '.join(groupe)} ({backend}, {trials} essais)")
+            params, score, actuelle, rungs = successive_halving(
+                pool, groupe, backend, trials, eta, min_resource, max_resource, rng
+            )
+            print(f"   ✅ MAPE {score:.3f}% (actuelle {actuelle:.3f}%)")
+
+            entree = {
+                'params': params,
+                'cv_mape': score,
+                'baseline_mape': actuelle,
+                'group': groupe,
+                'tuned_at': datetime.now().isoformat(),
+            }
+            resultats.append(dict(entree, rungs=rungs))
+            if est_defaut:
+                defaut = entree
+            else:
+                reglages.update({coin_id: entree for coin_id in groupe})
+
+    sauvegarder(output, backend, reglages, defaut)
+    print(f"💾 Réglages: {output}")
+
+    return {
+        'backend': backend,
+        'groups': resultats,
+        'errors': erreurs,
+        'output': output,
+        'duration_ms': int((time.time() - start) * 1000),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche d'hyperparamètres")
+    parser.add_argument('coins', nargs='*', help="ids CoinGecko")
+    parser.add_argument('--top', type=int, help="Top N par market cap")
+    parser.add_argument('--backend', choices=list(ai_model_v3.MODEL_BACKENDS))
+    parser.add_argument('--clusters', type=int, default=0,
+                        help="Groupes de volatilité proche (0 = réglage par crypto)")
+    parser.add_argument('--trials', type=int, default=27)
+    parser.add_argument('--eta', type=int, default=3, help="Facteur de réduction du halving")
+    parser.add_argument('--min-resource', type=int, default=50, help="Arbres au premier tour")
+    parser.add_argument('--max-resource', type=int, default=400, help="Arbres au dernier tour")
+    parser.add_argument('--workers', type=int, help="Processus (défaut: nb CPU)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--default', action='store_true', help="Régler aussi les paramètres par défaut")
+    parser.add_argument('--output', help="Fichier de réglages (défaut: MODEL_PARAMS_FILE)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🎛️  TUNING DES HYPERPARAMÈTRES")
+    print("=" * 60)
+    print()
+
+    try:
+        coin_ids = list(args.coins)
+        if args.top:
+            from batch_predict import charger_top_coins
+            coin_ids += [c for c in charger_top_coins(args.top) if c not in coin_ids]
+        if not coin_ids:
+            raise Exception("Aucune crypto demandée (ids ou --top N)")
+
+        result = tuner(coin_ids, backend=args.backend, clusters=args.clusters, trials=args.trials,
+                       eta=args.eta, min_resource=args.min_resource, max_resource=args.max_resource,
+                       workers=args.workers, seed=args.seed, default=args.default, output=args.output)
+
+        print(json.dumps(result))
+        sys.exit(0)
+
+    except Exception as e:
+        print(f"❌ Erreur: {str(e)}")
+        print(json.dumps({
+            'error': True,
+            'message': str(e),
+            'timestamp': datetime.now().isoformat()
+        }))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()